@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Benchmark the detectors on deterministic synthetic corpora and compare the results with a saved baseline.
+Every detector runs on every size and profile of input, each case in a fresh worker process so imports, caches and
+the memory high-water mark of one case never leak into the next. Reports throughput, p50/p99 latency and peak
+resident memory per case, and exits non-zero when a case is slower or larger than its baseline beyond a tolerance.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from synthetic_corpus import DEFAULT_PROFILE, GENERATOR_VERSION, PROFILES, write_corpus
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for script_dir in (
+    "keyword_stuffing_detection",
+    "hidden_text_detection",
+    "cloaking_detection",
+    "sneaky_redirect_detection",
+):
+    script_path = os.path.join(SCRIPTS_DIR, script_dir)
+    if script_path not in sys.path:
+        sys.path.insert(0, script_path)
+
+# Detector entry points benchmarked and the corpus kind each one reads
+TARGETS = {
+    "keyword": "page",
+    "hidden": "page",
+    "cloaking": "page",
+    "redirect": "redirects",
+}
+PRESETS = {
+    "quick": [10, 100, 1000],
+    "full": [10, 100, 1000, 10000, 50000],
+}
+DEFAULT_PRESET = "quick"
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_RUNS = 20
+DEFAULT_MIN_RUNS = 3
+DEFAULT_MAX_SECONDS = 10.0
+# A case regresses when it is this much slower (p50) or larger (peak memory) than its baseline
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_MEMORY_TOLERANCE = 0.25
+# Slowdowns smaller than this are timer and scheduler noise on the smallest inputs
+MIN_REGRESSION_MS = 2.0
+# Share of the words of the page swapped out of the reference view the cloaking target compares against
+CLOAKED_SHARE = 0.1
+WARMUP_SIZE_KB = 10
+
+
+def current_rss_mb():
+    """Return the resident memory of this process in MB, where /proc is available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_mb():
+    """Return the peak resident memory of this process in MB, if the platform reports it."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def prepare_target(target, content):
+    """Return a zero-argument callable running a detector's entry point on one corpus input."""
+    if target == "keyword":
+        from keyword_stuffing_detection import analyze_html_for_keyword_stuffing
+
+        return lambda: analyze_html_for_keyword_stuffing(content)
+
+    if target == "hidden":
+        from hidden_text_detection import analyze_html_for_hidden_text
+
+        return lambda: analyze_html_for_hidden_text(content)
+
+    if target == "cloaking":
+        from cloaking_detection import CloakingDetector
+
+        detector = CloakingDetector()
+        # The other view of the page: the same words, a share of them replaced
+        reference = list(detector.extract_visible_text(content)["words"])
+        for position in range(0, len(reference), round(1 / CLOAKED_SHARE)):
+            reference[position] = f"cloaked{position}"
+
+        def run():
+            words = detector.extract_visible_text(content)["words"]
+            return detector.calculate_jaccard_similarity(words, reference)
+
+        return run
+
+    if target == "redirect":
+        from sneaky_redirect_detection import analyze_redirect_differences
+
+        pairs = json.loads(content)
+        return lambda: [analyze_redirect_differences(regular, googlebot) for regular, googlebot in pairs]
+
+    raise ValueError(f"Unknown benchmark target: {target}")
+
+
+def run_worker(case):
+    """Time one case in this process and return its samples and memory; the entry point of the worker processes."""
+    with open(case["warmup"], "r", encoding="utf-8") as f:
+        warmup = f.read()
+    # Lazy imports and first-use caches are paid on a small input before anything is measured
+    prepare_target(case["target"], warmup)()
+
+    with open(case["path"], "r", encoding="utf-8") as f:
+        content = f.read()
+    run = prepare_target(case["target"], content)
+    idle_rss = current_rss_mb()
+
+    samples = []
+    started_at = time.perf_counter()
+    while len(samples) < case["runs"]:
+        run_started_at = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - run_started_at)
+        if len(samples) >= case["min_runs"] and time.perf_counter() - started_at >= case["max_seconds"]:
+            break
+
+    return {"samples": samples, "idle_rss_mb": idle_rss, "peak_rss_mb": peak_rss_mb()}
+
+
+def percentile(samples, percent):
+    """Return the nearest-rank percentile of the samples."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+def run_case(case):
+    """Run one case in a fresh worker process and summarize its samples."""
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", json.dumps(case)], capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        last_line = (completed.stderr.strip().splitlines() or ["no output"])[-1]
+        raise RuntimeError(f"{case_id(case)} failed: {last_line}")
+    measured = json.loads(completed.stdout.splitlines()[-1])
+
+    samples = measured["samples"]
+    input_bytes = os.path.getsize(case["path"])
+    return {
+        "case": case_id(case),
+        "target": case["target"],
+        "profile": case["profile"],
+        "size_kb": case["size_kb"],
+        "input_bytes": input_bytes,
+        "runs": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+        "throughput_mb_s": round(input_bytes * len(samples) / sum(samples) / (1024 * 1024), 3),
+        "idle_rss_mb": round(measured["idle_rss_mb"], 1) if measured["idle_rss_mb"] is not None else None,
+        "peak_rss_mb": round(measured["peak_rss_mb"], 1) if measured["peak_rss_mb"] is not None else None,
+    }
+
+
+def case_id(case):
+    return f"{case['target']}/{case['profile']}/{case['size_kb']}kb"
+
+
+def environment():
+    """Describe the machine and interpreter, which a baseline is only comparable on."""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "generator_version": GENERATOR_VERSION,
+    }
+
+
+def compare_with_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE, memory_tolerance=DEFAULT_MEMORY_TOLERANCE):
+    """Return the comparison of each case with its baseline, flagging the regressions."""
+    baseline_cases = {case["case"]: case for case in baseline["cases"]}
+    comparisons = []
+    for case in results["cases"]:
+        previous = baseline_cases.get(case["case"])
+        if previous is None:
+            continue
+
+        comparison = {
+            "case": case["case"],
+            "p50_ratio": round(case["p50_ms"] / previous["p50_ms"], 3) if previous["p50_ms"] else None,
+            "throughput_ratio": (
+                round(case["throughput_mb_s"] / previous["throughput_mb_s"], 3) if previous["throughput_mb_s"] else None
+            ),
+            "peak_rss_ratio": None,
+            "regressions": [],
+        }
+        if (
+            case["p50_ms"] > previous["p50_ms"] * (1 + tolerance)
+            and case["p50_ms"] - previous["p50_ms"] >= MIN_REGRESSION_MS
+        ):
+            comparison["regressions"].append(f"p50 {previous['p50_ms']:.1f} -> {case['p50_ms']:.1f} ms")
+        if case["peak_rss_mb"] and previous.get("peak_rss_mb"):
+            comparison["peak_rss_ratio"] = round(case["peak_rss_mb"] / previous["peak_rss_mb"], 3)
+            if case["peak_rss_mb"] > previous["peak_rss_mb"] * (1 + memory_tolerance):
+                comparison["regressions"].append(
+                    f"peak RSS {previous['peak_rss_mb']:.1f} -> {case['peak_rss_mb']:.1f} MB"
+                )
+        comparisons.append(comparison)
+    return comparisons
+
+
+def run_suite(
+    targets,
+    sizes_kb,
+    profiles,
+    corpus_dir,
+    runs=DEFAULT_RUNS,
+    min_runs=DEFAULT_MIN_RUNS,
+    max_seconds=DEFAULT_MAX_SECONDS,
+    seed=0,
+):
+    """Run every target on every size and profile of corpus input, generating missing inputs into `corpus_dir`."""
+    results = {"environment": environment(), "seed": seed, "cases": []}
+    warmups = {
+        kind: write_corpus(corpus_dir, kind, WARMUP_SIZE_KB, DEFAULT_PROFILE, seed) for kind in ("page", "redirects")
+    }
+
+    for size_kb in sizes_kb:
+        for profile in profiles:
+            for target in targets:
+                kind = TARGETS[target]
+                case = {
+                    "target": target,
+                    "profile": profile,
+                    "size_kb": size_kb,
+                    "path": write_corpus(corpus_dir, kind, size_kb, profile, seed),
+                    "warmup": warmups[kind],
+                    "runs": runs,
+                    "min_runs": min_runs,
+                    "max_seconds": max_seconds,
+                }
+                print(f"running {case_id(case)}", file=sys.stderr)
+                results["cases"].append(run_case(case))
+
+    return results
+
+
+def print_table(results, comparisons):
+    ratios = {comparison["case"]: comparison for comparison in comparisons}
+    print(f"{'case':<32}  {'runs':>4}  {'p50 ms':>10}  {'p99 ms':>10}  {'MB/s':>8}  {'peak MB':>8}  {'vs base':>8}")
+    for case in results["cases"]:
+        comparison = ratios.get(case["case"])
+        versus = f"{comparison['p50_ratio']:.2f}x" if comparison and comparison["p50_ratio"] else "-"
+        peak = f"{case['peak_rss_mb']:.1f}" if case["peak_rss_mb"] is not None else "-"
+        print(
+            f"{case['case']:<32}  {case['runs']:>4}  {case['p50_ms']:>10.2f}  {case['p99_ms']:>10.2f}  "
+            f"{case['throughput_mb_s']:>8.2f}  {peak:>8}  {versus:>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the detectors on synthetic corpora against a baseline")
+    parser.add_argument(
+        "--targets", nargs="+", choices=list(TARGETS), default=list(TARGETS), help="Detectors to run (default: all)"
+    )
+    parser.add_argument(
+        "--preset",
+        choices=list(PRESETS),
+        default=DEFAULT_PRESET,
+        help=f"Input sizes: quick is {PRESETS['quick']} KB, full adds 10 MB and 50 MB (default: {DEFAULT_PRESET})",
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", help="Input sizes in KB, instead of the preset's")
+    parser.add_argument(
+        "--profiles", nargs="+", choices=list(PROFILES), default=list(PROFILES), help="Input shapes (default: all)"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the corpus generator (default: 0)")
+    parser.add_argument(
+        "--corpus-dir", help="Directory to keep the generated inputs in and reuse them from (default: a temporary one)"
+    )
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help=f"Timed runs per case (default: {DEFAULT_RUNS})")
+    parser.add_argument(
+        "--min-runs",
+        type=int,
+        default=DEFAULT_MIN_RUNS,
+        help=f"Timed runs per case even past --max-seconds (default: {DEFAULT_MIN_RUNS})",
+    )
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=DEFAULT_MAX_SECONDS,
+        help=f"Stop timing a case after this long once it has --min-runs (default: {DEFAULT_MAX_SECONDS})",
+    )
+    parser.add_argument(
+        "--baseline", default=DEFAULT_BASELINE_PATH, help="Baseline results to compare with (default: baseline.json)"
+    )
+    parser.add_argument("--save-baseline", action="store_true", help="Save these results as the new baseline")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help=f"Allowed p50 slowdown over the baseline, as a fraction (default: {DEFAULT_TOLERANCE})",
+    )
+    parser.add_argument(
+        "--memory-tolerance",
+        type=float,
+        default=DEFAULT_MEMORY_TOLERANCE,
+        help=f"Allowed peak memory growth over the baseline, as a fraction (default: {DEFAULT_MEMORY_TOLERANCE})",
+    )
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON instead of a table")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(json.loads(args.worker))))
+        return
+
+    sizes_kb = args.sizes or PRESETS[args.preset]
+    try:
+        if args.corpus_dir:
+            results = run_suite(
+                args.targets,
+                sizes_kb,
+                args.profiles,
+                args.corpus_dir,
+                args.runs,
+                args.min_runs,
+                args.max_seconds,
+                args.seed,
+            )
+        else:
+            with tempfile.TemporaryDirectory() as corpus_dir:
+                results = run_suite(
+                    args.targets,
+                    sizes_kb,
+                    args.profiles,
+                    corpus_dir,
+                    args.runs,
+                    args.min_runs,
+                    args.max_seconds,
+                    args.seed,
+                )
+    except RuntimeError as e:
+        print(f"Error running benchmarks: {e}")
+        sys.exit(1)
+
+    comparisons = []
+    notes = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["environment"].get("generator_version") != GENERATOR_VERSION or baseline.get("seed") != args.seed:
+            notes.append(f"Baseline {args.baseline} was taken on other inputs, not compared")
+        else:
+            if baseline["environment"] != results["environment"]:
+                notes.append(f"Baseline {args.baseline} was taken on another machine or interpreter")
+            comparisons = compare_with_baseline(results, baseline, args.tolerance, args.memory_tolerance)
+    elif not args.save_baseline:
+        notes.append(f"No baseline at {args.baseline}, run with --save-baseline to record one")
+
+    regressions = [comparison for comparison in comparisons if comparison["regressions"]]
+    results["baseline"] = {
+        "path": args.baseline,
+        "compared_cases": len(comparisons),
+        "regressions": regressions,
+        "notes": notes,
+    }
+    results["passed"] = not regressions
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({key: results[key] for key in ("environment", "seed", "cases")}, f, indent=2)
+        notes.append(f"Saved these results as the baseline {args.baseline}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results, comparisons)
+        for note in notes:
+            print(note)
+        for comparison in regressions:
+            print(f"REGRESSION {comparison['case']}: {'; '.join(comparison['regressions'])}")
+
+    sys.exit(0 if results["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
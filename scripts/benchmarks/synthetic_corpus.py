@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Synthetic Corpus
+Deterministic synthetic inputs for the detector benchmarks: HTML pages of a given size and shape, and redirect
+result pairs as compared by the sneaky redirect detector. The same size, profile and seed always give the same
+bytes, so timings of different commits are taken on identical input.
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+from collections import namedtuple
+from itertools import accumulate
+
+# Bump whenever the generated output changes, baselines recorded on another version are not compared
+GENERATOR_VERSION = 1
+
+# Page shape: nesting of each content block, share of the page bytes that is visible text, share of blocks carrying
+# a hidden element, Zipf exponent of the word frequencies and share of words replaced by the stuffed keyword phrase
+CorpusProfile = namedtuple("CorpusProfile", "depth text_density hidden_ratio zipf stuffing")
+
+PROFILES = {
+    "typical": CorpusProfile(depth=6, text_density=0.35, hidden_ratio=0.02, zipf=1.0, stuffing=0.0),
+    "deep": CorpusProfile(depth=48, text_density=0.35, hidden_ratio=0.02, zipf=1.0, stuffing=0.0),
+    "markup_heavy": CorpusProfile(depth=6, text_density=0.1, hidden_ratio=0.02, zipf=1.0, stuffing=0.0),
+    "text_heavy": CorpusProfile(depth=3, text_density=0.75, hidden_ratio=0.02, zipf=1.0, stuffing=0.0),
+    "hidden": CorpusProfile(depth=6, text_density=0.35, hidden_ratio=0.25, zipf=1.0, stuffing=0.0),
+    "stuffed": CorpusProfile(depth=6, text_density=0.35, hidden_ratio=0.02, zipf=1.3, stuffing=0.06),
+}
+DEFAULT_PROFILE = "typical"
+
+KINDS = {"page": ".html", "redirects": ".json"}
+
+COMMON_WORDS = (
+    "the of and to in is for on with that this are from your our you can more about all will new how page site "
+    "search engine ranking content website keyword optimization link quality crawler index visitor article guide "
+    "product review price shipping support contact blog news update service local business team customer"
+).split()
+STUFFED_PHRASE = ["cheap", "seo", "services", "online"]
+SYLLABLES = ["ka", "lo", "mi", "ren", "tas", "vel", "dor", "pin", "sul", "ther", "an", "bro", "cet", "fi", "gu", "ho"]
+VOCABULARY_SIZE = 4000
+
+# Hiding techniques cycled through by hidden blocks: inline styles and the rules of the page stylesheet
+HIDDEN_STYLES = [
+    'style="display:none"',
+    'class="sr-hidden"',
+    'style="visibility:hidden"',
+    'class="seo-block"',
+    'style="font-size:0"',
+    'style="text-indent:-9999px"',
+    'style="color:#fff;background-color:#fff"',
+    'style="position:absolute;left:-5000px"',
+]
+STYLESHEET = (
+    ".sr-hidden{display:none}.seo-block{position:absolute;top:-3000px}"
+    "body{font-family:sans-serif;color:#222;background:#fff}header nav a{margin:0 8px}"
+    + "".join(f".b{i} h2{{font-size:{18 + i % 6}px}}.d{i}{{padding:{i % 4}px}}" for i in range(40))
+    + "@media (max-width:600px){.b1{margin:0}}"
+)
+
+
+def vocabulary():
+    """Return the fixed vocabulary, most frequent words first; it does not depend on the seed."""
+    rng = random.Random(GENERATOR_VERSION)
+    words = list(COMMON_WORDS)
+    seen = set(words)
+    while len(words) < VOCABULARY_SIZE:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+class WordSource:
+    """Draws words with Zipf-distributed frequencies, replacing a share of them with the stuffed phrase."""
+
+    def __init__(self, rng, profile):
+        self.rng = rng
+        self.words = vocabulary()
+        self.cum_weights = list(accumulate(1 / rank**profile.zipf for rank in range(1, len(self.words) + 1)))
+        self.stuffing = profile.stuffing
+
+    def draw(self, count):
+        words = self.rng.choices(self.words, cum_weights=self.cum_weights, k=count)
+        for _ in range(int(count * self.stuffing / len(STUFFED_PHRASE) + self.rng.random())):
+            start = self.rng.randrange(max(1, count - len(STUFFED_PHRASE) + 1))
+            words[start : start + len(STUFFED_PHRASE)] = STUFFED_PHRASE[: count - start]
+        return words
+
+    def sentence(self, count):
+        return " ".join(self.draw(count)).capitalize() + "."
+
+
+def page_block(rng, words, profile, index, padding):
+    """Return one content section nested `profile.depth` levels deep, padded with markup to the text density."""
+    opening = "".join(f'<div class="d{(index + level) % 40}">' for level in range(profile.depth - 1))
+    closing = "</div>" * (profile.depth - 1)
+    text = [
+        f"<h2>{words.sentence(rng.randint(4, 9))}</h2>",
+        f"<p>{words.sentence(rng.randint(25, 45))}</p>",
+        f'<p>{words.sentence(rng.randint(15, 30))} <a href="/p/{index}">{words.sentence(3)}</a></p>',
+        "<ul>" + "".join(f"<li>{words.sentence(rng.randint(2, 6))}</li>" for _ in range(3)) + "</ul>",
+    ]
+    if rng.random() < profile.hidden_ratio:
+        style = HIDDEN_STYLES[index % len(HIDDEN_STYLES)]
+        text.append(f"<div {style}>{words.sentence(rng.randint(20, 40))} <a href='/h/{index}'>more</a></div>")
+    body = "".join(text)
+
+    block = f'<section class="block b{index % 40}" id="s{index}">{opening}{body}{closing}</section>\n'
+    # Visible text is roughly the block minus its tags; pad with an attribute up to the profile's text density
+    text_length = sum(len(part) for part in body.replace(">", "<").split("<")[::2])
+    pad = int(text_length / profile.text_density) - len(block) - len(' data-meta=""')
+    if pad > 0:
+        start = rng.randrange(len(padding) - pad) if pad < len(padding) else 0
+        block = block.replace(">", f' data-meta="{padding[start : start + pad]}">', 1)
+    return block
+
+
+def generate_page(size_kb, profile=DEFAULT_PROFILE, seed=0):
+    """Return an HTML page of roughly `size_kb` kilobytes shaped by a profile name or CorpusProfile."""
+    profile = PROFILES[profile] if isinstance(profile, str) else profile
+    rng = random.Random(f"page-{seed}")
+    words = WordSource(rng, profile)
+    padding = "".join(rng.choice("0123456789abcdef") for _ in range(256 * 1024))
+
+    head = (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+        f"<title>{words.sentence(6)}</title>"
+        f'<meta name="description" content="{words.sentence(20)}">'
+        f"<style>{STYLESHEET}</style>"
+        '<script>window.dataLayer = window.dataLayer || []; dataLayer.push({page: "<p>"});</script>'
+        "</head><body>\n"
+        '<header><nav><a href="/">Home</a><a href="/blog">Blog</a><a href="/contact">Contact</a></nav></header>'
+        "<main>\n"
+    )
+    tail = f"</main><footer><p>{words.sentence(12)}</p></footer></body></html>\n"
+
+    blocks = []
+    size = len(head) + len(tail)
+    while size < size_kb * 1024:
+        block = page_block(rng, words, profile, len(blocks), padding)
+        blocks.append(block)
+        size += len(block)
+    return head + "".join(blocks) + tail
+
+
+def redirect_result(chain, user_agent):
+    """Return a follow-redirects result, as the sneaky redirect detector records it, for a chain of hops."""
+    return {
+        "final_url": chain[-1]["url"],
+        "final_status_code": chain[-1]["status_code"],
+        "redirect_count": len(chain) - 1,
+        "redirect_chain": chain,
+        "total_time": round(sum(hop["response_time"] for hop in chain), 3),
+        "user_agent": user_agent,
+        "success": chain[-1]["status_code"] == 200,
+    }
+
+
+def generate_redirect_pairs(size_kb, profile=DEFAULT_PROFILE, seed=0):
+    """
+    Return (regular, googlebot) redirect result pairs, roughly `size_kb` kilobytes of JSON in all.
+    Chains are up to `profile.depth` hops long, capped at 10, and a `profile.hidden_ratio` share of the pairs
+    send Googlebot somewhere else.
+    """
+    profile = PROFILES[profile] if isinstance(profile, str) else profile
+    rng = random.Random(f"redirects-{seed}")
+    words = vocabulary()
+
+    pairs = []
+    size = 0
+    while size < size_kb * 1024:
+        host = f"https://{rng.choice(words)}{len(pairs)}.example"
+        paths = [f"/{rng.choice(words)}/{rng.choice(words)}" for _ in range(1 + rng.randrange(min(profile.depth, 10)))]
+        chain = []
+        for step, path in enumerate(paths):
+            last = step == len(paths) - 1
+            status_code = 200 if last else rng.choice([301, 302, 307, 308])
+            chain.append(
+                {
+                    "step": step,
+                    "url": host + path,
+                    "status_code": status_code,
+                    "location": "" if last else host + paths[step + 1],
+                    "response_time": round(rng.uniform(0.02, 0.4), 3),
+                    "headers": {"server": "nginx", "cache-control": "max-age=3600"},
+                }
+            )
+
+        googlebot_chain = [dict(hop) for hop in chain]
+        if rng.random() < profile.hidden_ratio:
+            googlebot_chain[-1]["url"] = f"{host}/{rng.choice(words)}-for-crawlers"
+            if len(googlebot_chain) > 1:
+                googlebot_chain[-2]["location"] = googlebot_chain[-1]["url"]
+
+        pair = [redirect_result(chain, "regular"), redirect_result(googlebot_chain, "googlebot")]
+        pairs.append(pair)
+        size += len(json.dumps(pair))
+    return pairs
+
+
+def corpus_path(directory, kind, size_kb, profile, seed=0):
+    """Return the file a corpus input is kept in; the name identifies its content."""
+    return os.path.join(directory, f"{kind}-{profile}-{size_kb}kb-s{seed}-v{GENERATOR_VERSION}{KINDS[kind]}")
+
+
+def write_corpus(directory, kind, size_kb, profile=DEFAULT_PROFILE, seed=0):
+    """Generate a corpus input into `directory` unless it is already there, and return its path."""
+    path = corpus_path(directory, kind, size_kb, profile, seed)
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(directory, exist_ok=True)
+    if kind == "page":
+        content = generate_page(size_kb, profile, seed)
+    else:
+        content = json.dumps(generate_redirect_pairs(size_kb, profile, seed))
+
+    # Written under a temporary name, so an interrupted run never leaves a truncated input to be reused
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(temporary, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic benchmark input")
+    parser.add_argument("--kind", choices=sorted(KINDS), default="page", help="Input to generate (default: page)")
+    parser.add_argument("--size", type=int, default=100, help="Approximate size in KB (default: 100)")
+    parser.add_argument(
+        "--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE, help=f"Shape (default: {DEFAULT_PROFILE})"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generator (default: 0)")
+    parser.add_argument("--output", help="File to write (default: stdout)")
+
+    args = parser.parse_args()
+
+    if args.kind == "page":
+        content = generate_page(args.size, args.profile, args.seed)
+    else:
+        content = json.dumps(generate_redirect_pairs(args.size, args.profile, args.seed), indent=2)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(content)
+        print(f"Wrote {len(content.encode('utf-8')) / 1024:.0f} KB to {args.output}", file=sys.stderr)
+    else:
+        sys.stdout.write(content)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Benchmark MinHash similarity against exact shingle Jaccard on synthetic page pairs.
+Each pair is a page and a copy with a share of its words replaced, from near-identical views to fully cloaked
+ones. Reports the estimation error for each signature size and the time to build and compare signatures.
+With --calibrate, finds for each shingle size the threshold whose verdicts best match word-set similarity at 0.9.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from cloaking_detection import (
+    DEFAULT_SHINGLE_SIZE,
+    SIMILARITY_THRESHOLDS,
+    CloakingDetector,
+    minhash_signature,
+    signature_similarity,
+    similarity_error_bound,
+    word_shingles,
+)
+
+DEFAULT_SIGNATURE_SIZES = [64, 128, 256, 512]
+EDIT_RATES = [0.0, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0]
+CALIBRATION_SHINGLE_SIZES = [2, 3, 4, 5]
+CALIBRATION_MAX_EDIT_RATE = 0.3
+
+
+def random_words(rng, count, vocabulary):
+    """Return `count` random words drawn from `vocabulary`."""
+    return [rng.choice(vocabulary) for _ in range(count)]
+
+
+def generate_pairs(pair_count, page_words, seed=0):
+    """Generate (regular, googlebot) word lists whose similarity ranges from identical to unrelated."""
+    rng = random.Random(seed)
+    vocabulary = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 10)))
+                  for _ in range(5000)]
+
+    pairs = []
+    for index in range(pair_count):
+        regular = random_words(rng, page_words, vocabulary)
+        googlebot = list(regular)
+        edit_rate = EDIT_RATES[index % len(EDIT_RATES)]
+        for position in rng.sample(range(page_words), int(page_words * edit_rate)):
+            googlebot[position] = rng.choice(vocabulary)
+        pairs.append((regular, googlebot))
+
+    return pairs
+
+
+def calibration_pairs(pair_count, page_words, seed=0):
+    """
+    Generate (regular, googlebot) word lists with edit rates spread evenly up to CALIBRATION_MAX_EDIT_RATE, around
+    the verdict boundary. Words are drawn with Zipf frequencies, so that they repeat as in real text.
+    """
+    rng = random.Random(seed)
+    vocabulary = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 10)))
+                  for _ in range(5000)]
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+
+    pairs = []
+    for _ in range(pair_count):
+        regular = rng.choices(vocabulary, weights, k=page_words)
+        googlebot = list(regular)
+        edit_rate = rng.uniform(0, CALIBRATION_MAX_EDIT_RATE)
+        for position in rng.sample(range(page_words), int(page_words * edit_rate)):
+            googlebot[position] = rng.choices(vocabulary, weights)[0]
+        pairs.append((regular, googlebot))
+
+    return pairs
+
+
+def jaccard(set1, set2):
+    """Return the Jaccard similarity of two sets."""
+    union = set1 | set2
+    return len(set1 & set2) / len(union) if union else 1.0
+
+
+def run_calibration(shingle_sizes, pair_count=400, page_words=2000, word_set_threshold=SIMILARITY_THRESHOLDS[1]):
+    """
+    For each shingle size, find the threshold whose verdicts agree most often with word-set similarity at
+    `word_set_threshold` on the same page pairs, and how often the configured default agrees.
+    """
+    pairs = calibration_pairs(pair_count, page_words)
+    expected = [jaccard(set(regular), set(googlebot)) >= word_set_threshold for regular, googlebot in pairs]
+    candidates = [value / 100 for value in range(30, 100)]
+
+    results = {'pairs': pair_count, 'page_words': page_words, 'word_set_threshold': word_set_threshold,
+               'shingle_sizes': []}
+    for shingle_size in shingle_sizes:
+        scores = [jaccard(word_shingles(regular, shingle_size), word_shingles(googlebot, shingle_size))
+                  for regular, googlebot in pairs]
+
+        def agreement(threshold):
+            return sum((score >= threshold) == verdict for score, verdict in zip(scores, expected)) / len(scores)
+
+        best = max(candidates, key=agreement)
+        default = SIMILARITY_THRESHOLDS.get(shingle_size)
+        results['shingle_sizes'].append({
+            'shingle_size': shingle_size,
+            'best_threshold': best,
+            'best_agreement': round(agreement(best), 3),
+            'default_threshold': default,
+            'default_agreement': None if default is None else round(agreement(default), 3)
+        })
+
+    return results
+
+
+def timed(function, *args):
+    """Return the result of `function(*args)` and the seconds it took."""
+    started_at = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started_at
+
+
+def run_benchmark(signature_sizes, pair_count=80, page_words=2000, shingle_size=DEFAULT_SHINGLE_SIZE):
+    """Compare MinHash estimates for each signature size with the exact shingle Jaccard similarity."""
+    pairs = generate_pairs(pair_count, page_words)
+    detector = CloakingDetector(similarity_method='exact', shingle_size=shingle_size)
+
+    exact = []
+    exact_seconds = 0.0
+    word_set_seconds = 0.0
+    for regular, googlebot in pairs:
+        similarity, seconds = timed(detector.calculate_similarity, regular, googlebot)
+        exact.append(similarity[0])
+        exact_seconds += seconds
+        # The word-set comparison used before shingles, for reference
+        word_set_seconds += timed(detector.calculate_jaccard_similarity, regular, googlebot)[1]
+
+    results = {
+        'pairs': pair_count,
+        'page_words': page_words,
+        'shingle_size': shingle_size,
+        'exact_ms_per_pair': round(exact_seconds / pair_count * 1000, 3),
+        'word_set_ms_per_pair': round(word_set_seconds / pair_count * 1000, 3),
+        'signature_sizes': []
+    }
+
+    for signature_size in signature_sizes:
+        signatures = []
+        signature_seconds = 0.0
+        for regular, googlebot in pairs:
+            signature1, seconds1 = timed(minhash_signature, regular, shingle_size, signature_size)
+            signature2, seconds2 = timed(minhash_signature, googlebot, shingle_size, signature_size)
+            signatures.append((signature1, signature2))
+            signature_seconds += seconds1 + seconds2
+
+        errors = []
+        within_bound = 0
+        compare_seconds = 0.0
+        for (signature1, signature2), true_similarity in zip(signatures, exact):
+            estimate, seconds = timed(signature_similarity, signature1, signature2, signature_size)
+            compare_seconds += seconds
+            error = abs(estimate - true_similarity)
+            errors.append(error)
+            # The bound is computed from the true similarity, as the estimate's bound would be
+            within_bound += error <= similarity_error_bound(true_similarity, signature_size) + 1e-12
+
+        results['signature_sizes'].append({
+            'signature_size': signature_size,
+            'signature_bytes': signature_size * 8,
+            'mean_abs_error': round(sum(errors) / len(errors), 4),
+            'max_abs_error': round(max(errors), 4),
+            'within_95_bound': round(within_bound / len(errors), 3),
+            'signature_ms_per_page': round(signature_seconds / (2 * pair_count) * 1000, 3),
+            'compare_ms_per_pair': round(compare_seconds / pair_count * 1000, 4)
+        })
+
+    # Size of the full shingle sets the exact method keeps for one view, for comparison with signatures
+    results['exact_shingles_per_page'] = len(word_shingles(pairs[0][0], shingle_size))
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MinHash cloaking similarity against exact Jaccard")
+    parser.add_argument(
+        "--signature-sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIGNATURE_SIZES,
+        help=f"Signature sizes to benchmark (default: {' '.join(map(str, DEFAULT_SIGNATURE_SIZES))})"
+    )
+    parser.add_argument("--pairs", type=int, default=80, help="Number of page pairs (default: 80)")
+    parser.add_argument("--page-words", type=int, default=2000, help="Words per page (default: 2000)")
+    parser.add_argument(
+        "--shingle-size",
+        type=int,
+        default=DEFAULT_SHINGLE_SIZE,
+        help=f"Words per shingle (default: {DEFAULT_SHINGLE_SIZE})"
+    )
+    parser.add_argument(
+        "--calibrate",
+        action="store_true",
+        help="Calibrate the similarity threshold of each shingle size against word-set similarity instead"
+    )
+    parser.add_argument("--json", action="store_true", help="Print results as JSON instead of a table")
+
+    args = parser.parse_args()
+
+    if args.calibrate:
+        results = run_calibration(CALIBRATION_SHINGLE_SIZES, args.pairs, args.page_words)
+        if args.json:
+            print(json.dumps(results, indent=2))
+            return
+
+        print(f"{results['pairs']} page pairs of {results['page_words']} words, "
+              f"verdicts of word-set similarity at {results['word_set_threshold']}")
+        print()
+        print(f"{'shingles':>8}  {'best':>5}  {'agrees':>6}  {'default':>7}  {'agrees':>6}")
+        for r in results['shingle_sizes']:
+            default = '-' if r['default_threshold'] is None else f"{r['default_threshold']:.2f}"
+            default_agreement = '-' if r['default_agreement'] is None else f"{r['default_agreement']:.1%}"
+            print(f"{r['shingle_size']:>8}  {r['best_threshold']:>5.2f}  {r['best_agreement']:>6.1%}  "
+                  f"{default:>7}  {default_agreement:>6}")
+        sys.exit(0)
+
+    results = run_benchmark(args.signature_sizes, args.pairs, args.page_words, args.shingle_size)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{results['pairs']} page pairs of {results['page_words']} words, {results['shingle_size']}-word shingles")
+    print(f"exact shingle Jaccard: {results['exact_ms_per_pair']:.3f} ms/pair "
+          f"({results['exact_shingles_per_page']} shingles per page kept in memory)")
+    print(f"word-set Jaccard:      {results['word_set_ms_per_pair']:.3f} ms/pair")
+    print()
+    print(f"{'signature':>9}  {'bytes':>6}  {'mean err':>8}  {'max err':>8}  {'in 95%':>6}  "
+          f"{'sign ms/page':>12}  {'compare ms':>10}")
+    for r in results['signature_sizes']:
+        print(f"{r['signature_size']:>9}  {r['signature_bytes']:>6}  {r['mean_abs_error']:>8.4f}  "
+              f"{r['max_abs_error']:>8.4f}  {r['within_95_bound']:>6.1%}  {r['signature_ms_per_page']:>12.3f}  "
+              f"{r['compare_ms_per_pair']:>10.4f}")
+
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,22 +7,346 @@ This script detects cloaking by comparing content served to different user agent
 """
 
 import argparse
+import asyncio
+import hashlib
+import heapq
 import json
+import math
+import os
 import re
 import requests
+import sqlite3
+import threading
 import time
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from urllib.parse import urlparse
 import sys
 
+# The shared HTTP cache lives in the sibling http_cache script directory and is optional
+HTTP_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'http_cache')
+if HTTP_CACHE_DIR not in sys.path:
+    sys.path.append(HTTP_CACHE_DIR)
+try:
+    from http_cache import CachingAdapter, HttpCache
+except ImportError:
+    CachingAdapter = HttpCache = None
+
+# Per-phase timings and counters come from the sibling metrics script directory, put first on the path so that
+# no installed "metrics" module is picked up instead
+METRICS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'metrics')
+if METRICS_DIR not in sys.path:
+    sys.path.insert(0, METRICS_DIR)
+from metrics import EXPORT_FORMATS, NULL_METRICS, Metrics, add_timings, export_metrics
+
+# Text extraction backends live in the sibling text_extraction script directory; without it, text is extracted
+# with html.parser only
+TEXT_EXTRACTION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'text_extraction')
+if TEXT_EXTRACTION_DIR not in sys.path:
+    sys.path.insert(0, TEXT_EXTRACTION_DIR)
+try:
+    from text_extraction import DEFAULT_PARSER_BACKEND, PARSER_BACKENDS, extract_raw_text
+except ImportError:
+    PARSER_BACKENDS = ('html.parser',)
+    DEFAULT_PARSER_BACKEND = 'html.parser'
+    
+    def extract_raw_text(html_content, drop_tags, body_only=True, parser_backend=DEFAULT_PARSER_BACKEND):
+        """Return the text of `html_content` without `drop_tags` elements, before whitespace normalization."""
+        if parser_backend not in PARSER_BACKENDS:
+            raise ValueError(f'Unknown parser backend: {parser_backend}')
+        
+        soup = BeautifulSoup(html_content, 'html.parser')
+        for element in soup(drop_tags):
+            element.decompose()
+        
+        body = soup.find('body') if body_only else None
+        return body.get_text() if body else soup.get_text()
+
+
+DEFAULT_USER_AGENT_REGULAR = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+DEFAULT_USER_AGENT_GOOGLEBOT = "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)"
+
+
+# Similarity. Each view is reduced to its set of word shingles (runs of `shingle_size` consecutive words), so
+# word order counts. The default "minhash" method keeps a bottom-k MinHash signature of each set: the
+# `signature_size` smallest 64-bit shingle hashes. Signatures have a fixed size whatever the page length and
+# estimate the Jaccard similarity with a standard error of sqrt(J * (1 - J) / signature_size). The "exact"
+# method compares the full shingle sets and is kept to verify the estimates.
+SIMILARITY_METHODS = ('minhash', 'exact')
+DEFAULT_SIMILARITY_METHOD = 'minhash'
+DEFAULT_SHINGLE_SIZE = 3
+DEFAULT_SIGNATURE_SIZE = 256
+
+# Default similarity threshold for each shingle size. Shingle scores are lower than word-set scores for the same
+# edit, so 0.9, the threshold for word sets (shingle size 1), is mapped to the shingle threshold giving the same
+# verdicts on the page pairs of `benchmark_similarity.py --calibrate`
+SIMILARITY_THRESHOLDS = {1: 0.9, 2: 0.78, 3: 0.67, 4: 0.6, 5: 0.53}
+
+
+def word_shingles(words, shingle_size=DEFAULT_SHINGLE_SIZE):
+    """Return the set of word shingles of `words`. Texts shorter than a shingle form a single shingle."""
+    if len(words) <= shingle_size:
+        return {' '.join(words)} if words else set()
+    
+    return {' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+
+
+def shingle_hash(shingle):
+    """Stable 64-bit hash of a shingle, so signatures stay comparable across runs and machines."""
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def minhash_signature(words, shingle_size=DEFAULT_SHINGLE_SIZE, signature_size=DEFAULT_SIGNATURE_SIZE):
+    """Return the bottom-k MinHash signature of a text: its `signature_size` smallest shingle hashes, sorted."""
+    return heapq.nsmallest(signature_size, map(shingle_hash, word_shingles(words, shingle_size)))
+
+
+def signature_similarity(signature1, signature2, signature_size=DEFAULT_SIGNATURE_SIZE):
+    """
+    Estimate the Jaccard similarity of two texts from their MinHash signatures.
+    The estimate is exact when the two texts have fewer than `signature_size` distinct shingles between them.
+    """
+    if not signature1 and not signature2:
+        return 1.0  # Both empty, considered identical
+    
+    # The k smallest hashes of the union are a uniform sample of it, and a sampled hash is in both texts
+    # exactly when it is in both signatures
+    set1, set2 = set(signature1), set(signature2)
+    sample = heapq.nsmallest(signature_size, set1 | set2)
+    shared = sum(1 for value in sample if value in set1 and value in set2)
+    
+    return shared / len(sample)
+
+
+def similarity_error_bound(similarity, signature_size=DEFAULT_SIGNATURE_SIZE):
+    """Return the 95% error bound of a MinHash similarity estimate."""
+    return 1.96 * math.sqrt(similarity * (1 - similarity) / signature_size)
+
+
+def signature_to_hex(signature):
+    """Encode a signature as a compact hex string for storage."""
+    return ''.join(f'{value:016x}' for value in signature)
+
+
+def signature_from_hex(encoded):
+    """Decode a signature stored with signature_to_hex()."""
+    return [int(encoded[i:i + 16], 16) for i in range(0, len(encoded), 16)]
+
+
+def setup_session(pool_connections=100, pool_maxsize=2, max_retries=3, backoff_factor=1, http_cache=None):
+    """
+    Setup a pooled keep-alive session with a retry strategy.
+    `pool_connections` is the number of hosts kept in the pool, `pool_maxsize` the connections kept per host.
+    With an `http_cache`, GET requests go through the shared on-disk HTTP cache.
+    """
+    session = requests.Session()
+    
+    retry_strategy = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=[429, 500, 502, 503, 504],
+        raise_on_status=False,
+    )
+    
+    adapter_options = dict(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry_strategy,
+        pool_block=True,
+    )
+    if http_cache is not None:
+        adapter = CachingAdapter(http_cache, **adapter_options)
+    else:
+        adapter = HTTPAdapter(**adapter_options)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    
+    return session
+
+
+# Number of hosts HostPolicy tracks before it first forgets idle ones
+HOST_PRUNE_THRESHOLD = 1024
+
+
+class HostPolicy:
+    """
+    Per-host politeness policy for concurrent fetching.
+    At most `max_concurrent` requests are in flight per host, and request starts are paced by a
+    token bucket that refills one token every `min_interval` seconds with a burst of `max_concurrent`.
+    Hosts with no request in flight or waiting and a full bucket are forgotten once many hosts are tracked,
+    since a new state for them would be the same.
+    """
+
+    def __init__(self, max_concurrent=2, min_interval=2):
+        self.max_concurrent = max(1, max_concurrent)
+        self.min_interval = min_interval
+        self._hosts = {}
+        self._prune_at = HOST_PRUNE_THRESHOLD
+
+    @asynccontextmanager
+    async def slot(self, url):
+        """Hold a request slot for the host of `url`."""
+        host = urlparse(url).netloc
+        state = self._hosts.get(host)
+        if state is None:
+            if len(self._hosts) >= self._prune_at:
+                self._prune()
+            state = self._hosts[host] = {
+                'semaphore': asyncio.Semaphore(self.max_concurrent),
+                'lock': asyncio.Lock(),
+                'tokens': float(self.max_concurrent),
+                'updated': time.monotonic(),
+                'users': 0,
+            }
+
+        state['users'] += 1
+        try:
+            async with state['semaphore']:
+                await self._take_token(state)
+                yield
+        finally:
+            state['users'] -= 1
+
+    def _prune(self):
+        """Forget idle hosts whose bucket has refilled, and prune again once the number of hosts doubles."""
+        now = time.monotonic()
+        for host, state in list(self._hosts.items()):
+            refilled = (not self.min_interval
+                        or state['tokens'] + (now - state['updated']) / self.min_interval >= self.max_concurrent)
+            if state['users'] == 0 and refilled:
+                del self._hosts[host]
+        self._prune_at = max(HOST_PRUNE_THRESHOLD, 2 * len(self._hosts))
+
+    async def _take_token(self, state):
+        if not self.min_interval:
+            return
+
+        async with state['lock']:
+            now = time.monotonic()
+            state['tokens'] = min(self.max_concurrent, state['tokens'] + (now - state['updated']) / self.min_interval)
+            state['updated'] = now
+
+            if state['tokens'] >= 1:
+                state['tokens'] -= 1
+                return
+
+            await asyncio.sleep((1 - state['tokens']) * self.min_interval)
+            state['tokens'] = 0.0
+            state['updated'] = time.monotonic()
+
+
+class FingerprintStore:
+    """
+    SQLite store of the last fetched fingerprint of each view of a URL, for re-audits.
+    A view is stored with its MinHash signature, word count, sample text and the validators (ETag, Last-Modified)
+    needed to revalidate it with a conditional request.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS views (
+            url TEXT NOT NULL,
+            view TEXT NOT NULL,
+            user_agent TEXT NOT NULL,
+            status_code INTEGER NOT NULL,
+            final_url TEXT NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            shingle_size INTEGER NOT NULL,
+            signature_size INTEGER NOT NULL,
+            signature TEXT NOT NULL,
+            word_count INTEGER NOT NULL,
+            sample_text TEXT NOT NULL,
+            fetched_at REAL NOT NULL,
+            checked_at REAL NOT NULL,
+            PRIMARY KEY (url, view)
+        ) WITHOUT ROWID
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # Views are loaded and saved from executor threads, the lock serializes the shared connection
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(self.SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        """Close the underlying database connection."""
+        self._conn.close()
+
+    def load(self, url):
+        """Return the stored views of `url` as {view: record}."""
+        with self._lock:
+            rows = self._conn.execute('SELECT * FROM views WHERE url = ?', (url,)).fetchall()
+        return {row['view']: dict(row) for row in rows}
+
+    def save(self, url, view, record):
+        """Store a freshly fetched view of `url`."""
+        now = time.time()
+        record = dict(record, url=url, view=view, fetched_at=now, checked_at=now)
+        columns = ', '.join(record)
+        placeholders = ', '.join(f':{column}' for column in record)
+        with self._lock, self._conn:
+            self._conn.execute(f'INSERT OR REPLACE INTO views ({columns}) VALUES ({placeholders})', record)
+
+    def touch(self, url, view):
+        """Record that a stored view was revalidated and is still current."""
+        with self._lock, self._conn:
+            self._conn.execute('UPDATE views SET checked_at = ? WHERE url = ? AND view = ?', (time.time(), url, view))
+
 
 class CloakingDetector:
-    def __init__(self, similarity_threshold=0.9, request_delay=2):
+    def __init__(self, similarity_threshold=None, request_delay=2, max_concurrency=20, per_host_concurrency=2,
+                 max_retries=3, backoff_factor=1, parser_backend=DEFAULT_PARSER_BACKEND,
+                 similarity_method=DEFAULT_SIMILARITY_METHOD, shingle_size=DEFAULT_SHINGLE_SIZE,
+                 signature_size=DEFAULT_SIGNATURE_SIZE, include_signatures=False, fingerprint_store=None,
+                 fingerprint_max_age=0, http_cache=None, timeout=30, metrics=NULL_METRICS):
+        if similarity_method not in SIMILARITY_METHODS:
+            raise ValueError(f'Unknown similarity method: {similarity_method}')
+        
+        self.parser_backend = parser_backend
+        self.similarity_method = similarity_method
+        self.shingle_size = max(1, shingle_size)
+        if similarity_threshold is None:
+            similarity_threshold = SIMILARITY_THRESHOLDS.get(self.shingle_size)
+        if similarity_threshold is None:
+            raise ValueError(f'No default similarity threshold for shingle size {self.shingle_size}')
         self.similarity_threshold = similarity_threshold
+        self.signature_size = max(1, signature_size)
+        self.include_signatures = include_signatures
+        # Stored views are reused by signature, which only the MinHash method compares
+        self.fingerprint_store = fingerprint_store if similarity_method == 'minhash' else None
+        self.fingerprint_max_age = fingerprint_max_age
         self.request_delay = request_delay
+        self.timeout = timeout
+        # Timings of every URL checked, each URL's own are added to its results
+        self.metrics = metrics
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_host_concurrency = max(1, per_host_concurrency)
         
-    def fetch_content(self, url, user_agent):
-        """Fetch HTML content from URL using specified user agent."""
+        # One pooled session for every URL checked by this detector, so same-origin checks reuse connections
+        self.session = setup_session(
+            pool_connections=max(100, self.max_concurrency),
+            pool_maxsize=self.per_host_concurrency,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+            http_cache=http_cache,
+        )
+    
+    def close(self):
+        """Close the pooled connections held by the detector."""
+        self.session.close()
+        
+    def fetch_content(self, url, user_agent, record=None, metrics=NULL_METRICS):
+        """
+        Fetch HTML content from URL using specified user agent.
+        With a stored `record` of the view the request is conditional, and a 304 response has no content.
+        """
         headers = {
             'User-Agent': user_agent,
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
@@ -30,14 +354,24 @@ class CloakingDetector:
             'Accept-Encoding': 'gzip, deflate',
             'Connection': 'keep-alive',
         }
+        if record is not None:
+            if record['etag']:
+                headers['If-None-Match'] = record['etag']
+            if record['last_modified']:
+                headers['If-Modified-Since'] = record['last_modified']
         
         try:
-            response = requests.get(url, headers=headers, timeout=30, allow_redirects=True)
+            with metrics.span('fetch'):
+                response = self.session.get(url, headers=headers, timeout=self.timeout, allow_redirects=True)
+            metrics.count('requests')
+            metrics.count('bytes_fetched', len(response.content))
             response.raise_for_status()
             return {
                 'status_code': response.status_code,
                 'content': response.text,
                 'final_url': response.url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
                 'error': None
             }
         except requests.exceptions.Timeout:
@@ -52,28 +386,11 @@ class CloakingDetector:
     def extract_visible_text(self, html_content):
         """Extract visible text content from HTML, removing scripts, styles, etc."""
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style", "meta", "link", "noscript"]):
-                script.decompose()
-            
-            # Get text and clean it up
-            text = soup.get_text()
-            
-            # Normalize whitespace
-            text = re.sub(r'\s+', ' ', text)
-            text = text.strip().lower()
-            
-            # Remove very short words and common stop words that might cause noise
-            words = text.split()
-            meaningful_words = [word for word in words if len(word) >= 3]
-            
-            return {
-                'text': text,
-                'words': meaningful_words,
-                'word_count': len(meaningful_words)
-            }
+            # Remove script and style elements, and get the text of the whole document
+            text = extract_raw_text(
+                html_content, ["script", "style", "meta", "link", "noscript"], False, self.parser_backend
+            )
+            return self.summarize_text(text)
             
         except Exception as e:
             return {
@@ -83,6 +400,22 @@ class CloakingDetector:
                 'error': f'Text extraction error: {e}'
             }
     
+    def summarize_text(self, text):
+        """Normalize raw document text and split it into the words used for comparison."""
+        # Normalize whitespace
+        text = re.sub(r'\s+', ' ', text)
+        text = text.strip().lower()
+        
+        # Remove very short words and common stop words that might cause noise
+        words = text.split()
+        meaningful_words = [word for word in words if len(word) >= 3]
+        
+        return {
+            'text': text,
+            'words': meaningful_words,
+            'word_count': len(meaningful_words)
+        }
+    
     def calculate_jaccard_similarity(self, words1, words2):
         """Calculate Jaccard similarity between two word sets."""
         if not words1 and not words2:
@@ -102,17 +435,197 @@ class CloakingDetector:
             
         return intersection / union
     
+    def view_text(self, response):
+        """Extract the text of a fetched view, or rebuild it from the stored fingerprint of an unchanged view."""
+        record = response.get('fingerprint')
+        if record is None:
+            return self.extract_visible_text(response['content'])
+        
+        return {
+            'text': record['sample_text'],
+            'words': None,
+            'word_count': record['word_count'],
+            'signature': signature_from_hex(record['signature'])
+        }
+    
+    def minhash_signature(self, words):
+        """Return the MinHash signature of a view's words with the detector's shingle and signature sizes."""
+        return minhash_signature(words, self.shingle_size, self.signature_size)
+    
+    def calculate_similarity(self, words1, words2, signature1=None, signature2=None):
+        """
+        Calculate the shingle similarity of two views with the detector's similarity method.
+        Returns the similarity and the details added to the analysis, including both signatures for MinHash.
+        Already known signatures, such as stored ones, are used instead of hashing the words again.
+        """
+        if self.similarity_method == 'exact':
+            similarity = self.calculate_jaccard_similarity(
+                word_shingles(words1, self.shingle_size),
+                word_shingles(words2, self.shingle_size)
+            )
+            return similarity, {'similarity_method': 'exact', 'shingle_size': self.shingle_size}
+        
+        if signature1 is None:
+            signature1 = self.minhash_signature(words1)
+        if signature2 is None:
+            signature2 = self.minhash_signature(words2)
+        similarity = signature_similarity(signature1, signature2, self.signature_size)
+        
+        # Fewer distinct shingles than the signature size means every shingle was compared
+        sampled = len(set(signature1) | set(signature2)) >= self.signature_size
+        details = {
+            'similarity_method': 'minhash',
+            'shingle_size': self.shingle_size,
+            'signature_size': self.signature_size,
+            'error_bound': round(similarity_error_bound(similarity, self.signature_size), 4) if sampled else 0.0,
+            'signatures': (signature1, signature2)
+        }
+        return similarity, details
+    
     def detect_cloaking(self, url, user_agent_regular=None, user_agent_googlebot=None):
         """
         Main cloaking detection function.
         Returns detailed analysis results.
+        Runs its own event loop with asyncio.run(), so it raises RuntimeError when called from a running event
+        loop; await detect_cloaking_async() there instead.
+        """
+        return self._run_batch_sync([url], user_agent_regular, user_agent_googlebot)[0]
+    
+    def detect_cloaking_many(self, urls, user_agent_regular=None, user_agent_googlebot=None):
+        """
+        Run cloaking detection for many URLs concurrently.
+        Returns a list of results in the same order as `urls`.
+        Like detect_cloaking(), it cannot be called from a running event loop.
+        """
+        return self._run_batch_sync(urls, user_agent_regular, user_agent_googlebot)
+    
+    def _run_batch_sync(self, urls, user_agent_regular, user_agent_googlebot):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self._run_batch(urls, user_agent_regular, user_agent_googlebot))
+        raise RuntimeError('Cannot run cloaking detection from a running event loop, await detect_cloaking_async()')
+    
+    async def _run_batch(self, urls, user_agent_regular, user_agent_googlebot):
+        policy = HostPolicy(self.per_host_concurrency, self.request_delay)
+        limit = asyncio.Semaphore(self.max_concurrency)
+        
+        # Each URL fetches two views at once, so size the pool for both
+        with ThreadPoolExecutor(max_workers=self.max_concurrency * 2) as executor:
+            async def run_one(url):
+                async with limit:
+                    return await self.detect_cloaking_async(
+                        url, user_agent_regular, user_agent_googlebot, policy=policy, executor=executor
+                    )
+            
+            return await asyncio.gather(*(run_one(url) for url in urls))
+    
+    async def fetch_content_async(self, url, user_agent, policy=None, executor=None, record=None,
+                                  metrics=NULL_METRICS):
+        """Fetch HTML content without blocking the event loop, honouring the per-host policy."""
+        loop = asyncio.get_running_loop()
+        
+        if policy is None:
+            return await loop.run_in_executor(executor, self.fetch_content, url, user_agent, record, metrics)
+        
+        started_at = time.perf_counter()
+        async with policy.slot(url):
+            # Time spent waiting for a free slot and the request pacing of the host
+            metrics.record('host_policy_wait', time.perf_counter() - started_at)
+            return await loop.run_in_executor(executor, self.fetch_content, url, user_agent, record, metrics)
+    
+    async def fetch_view_async(self, url, user_agent, record=None, policy=None, executor=None, reuse_fresh=False,
+                               metrics=NULL_METRICS):
+        """
+        Fetch one view of `url`, revalidating its stored `record` when there is one.
+        With `reuse_fresh` a record checked less than `fingerprint_max_age` seconds ago is reused without a request.
+        """
+        if record is not None and reuse_fresh and time.time() - record['checked_at'] < self.fingerprint_max_age:
+            metrics.count('views_reused')
+            return self.stored_response(record, 'reused')
+        
+        response = await self.fetch_content_async(url, user_agent, policy, executor, record, metrics)
+        if record is not None and response.get('status_code') == 304:
+            metrics.count('views_not_modified')
+            return self.stored_response(record, 'not_modified')
+        
+        response['fetch'] = 'fetched'
+        return response
+    
+    def stored_response(self, record, fetch):
+        """Stand in for the response of a view whose stored fingerprint is reused."""
+        return {
+            'status_code': record['status_code'],
+            'content': None,
+            'final_url': record['final_url'],
+            'error': None,
+            'fetch': fetch,
+            'fingerprint': record
+        }
+    
+    def stored_views(self, url, user_agent_regular, user_agent_googlebot):
+        """Return the stored views of `url` that can stand in for a fetch with the current settings."""
+        if self.fingerprint_store is None:
+            return {}
+        
+        user_agents = {'regular': user_agent_regular, 'googlebot': user_agent_googlebot}
+        return {
+            view: record for view, record in self.fingerprint_store.load(url).items()
+            if record['user_agent'] == user_agents.get(view)
+            and record['shingle_size'] == self.shingle_size
+            and record['signature_size'] == self.signature_size
+        }
+    
+    def store_views(self, results, responses, texts, signatures):
+        """Save the fingerprints of freshly fetched views and mark revalidated ones as checked."""
+        for view, response, text, signature in zip(('regular', 'googlebot'), responses, texts, signatures):
+            if response.get('fetch') == 'not_modified':
+                self.fingerprint_store.touch(results['url'], view)
+            elif response.get('fetch') == 'fetched':
+                self.fingerprint_store.save(results['url'], view, {
+                    'user_agent': results['user_agents'][view],
+                    'status_code': response['status_code'],
+                    'final_url': response['final_url'],
+                    'etag': response.get('etag'),
+                    'last_modified': response.get('last_modified'),
+                    'shingle_size': self.shingle_size,
+                    'signature_size': self.signature_size,
+                    'signature': signature_to_hex(signature),
+                    'word_count': text['word_count'],
+                    'sample_text': text['text'][:200] + '...' if len(text['text']) > 200 else text['text']
+                })
+    
+    async def detect_cloaking_async(self, url, user_agent_regular=None, user_agent_googlebot=None, policy=None, executor=None):
+        """
+        Cloaking detection that fetches the regular and Googlebot views concurrently.
+        Returns detailed analysis results, with the timings of this URL when the detector records them.
+        """
+        metrics = self.metrics.child()
+        results, regular_response, googlebot_response = await self.fetch_views_async(
+            url, user_agent_regular, user_agent_googlebot, policy=policy, executor=executor, metrics=metrics
+        )
+        
+        if not results.get('error'):
+            # Parsing and similarity are CPU-bound, so they run in the executor to keep other fetches going
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(
+                executor, self.compare_views, results, regular_response, googlebot_response, None, None, metrics
+            )
+        
+        return add_timings(results, metrics, self.metrics)
+    
+    async def fetch_views_async(self, url, user_agent_regular=None, user_agent_googlebot=None, policy=None,
+                                executor=None, metrics=NULL_METRICS):
+        """
+        Fetch the regular and Googlebot views of `url` concurrently.
+        Returns the results skeleton and both responses, with `results['error']` set when a fetch failed.
         """
         # Default user agents
         if not user_agent_regular:
-            user_agent_regular = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+            user_agent_regular = DEFAULT_USER_AGENT_REGULAR
         
         if not user_agent_googlebot:
-            user_agent_googlebot = "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)"
+            user_agent_googlebot = DEFAULT_USER_AGENT_GOOGLEBOT
         
         results = {
             'url': url,
@@ -124,28 +637,41 @@ class CloakingDetector:
             'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
         }
         
-        # Fetch content for regular user
-        print(f"Fetching content as regular user...", file=sys.stderr)
-        regular_response = self.fetch_content(url, user_agent_regular)
+        stored = {}
+        if self.fingerprint_store is not None:
+            # SQLite lookups block, so they run in the executor with the fetches instead of on the event loop
+            loop = asyncio.get_running_loop()
+            stored = await loop.run_in_executor(
+                executor, self.stored_views, url, user_agent_regular, user_agent_googlebot
+            )
+        
+        # Fetch content for regular user and Googlebot at the same time
+        print(f"Fetching content as regular user and Googlebot: {url}", file=sys.stderr)
+        regular_response, googlebot_response = await asyncio.gather(
+            self.fetch_view_async(url, user_agent_regular, stored.get('regular'), policy, executor, metrics=metrics),
+            self.fetch_view_async(url, user_agent_googlebot, stored.get('googlebot'), policy, executor,
+                                  reuse_fresh=True, metrics=metrics),
+        )
         
         if regular_response.get('error'):
             results['error'] = f"Failed to fetch content as regular user: {regular_response['error']}"
-            return results
-        
-        # Wait between requests to be respectful
-        time.sleep(self.request_delay)
-        
-        # Fetch content for Googlebot
-        print(f"Fetching content as Googlebot...", file=sys.stderr)
-        googlebot_response = self.fetch_content(url, user_agent_googlebot)
-        
-        if googlebot_response.get('error'):
+        elif googlebot_response.get('error'):
             results['error'] = f"Failed to fetch content as Googlebot: {googlebot_response['error']}"
-            return results
         
+        return results, regular_response, googlebot_response
+    
+    def compare_views(self, results, regular_response, googlebot_response, regular_text=None, googlebot_text=None,
+                      metrics=NULL_METRICS):
+        """
+        Compare the fetched regular and Googlebot views and add the analysis to `results`.
+        `regular_text` and `googlebot_text` may carry already extracted text from `summarize_text`.
+        """
         # Extract text from both responses
-        regular_text = self.extract_visible_text(regular_response['content'])
-        googlebot_text = self.extract_visible_text(googlebot_response['content'])
+        with metrics.span('extract_text'):
+            if regular_text is None:
+                regular_text = self.view_text(regular_response)
+            if googlebot_text is None:
+                googlebot_text = self.view_text(googlebot_response)
         
         if regular_text.get('error'):
             results['error'] = f"Regular user content extraction error: {regular_text['error']}"
@@ -156,10 +682,19 @@ class CloakingDetector:
             return results
         
         # Calculate similarity
-        similarity = self.calculate_jaccard_similarity(
-            regular_text['words'], 
-            googlebot_text['words']
-        )
+        metrics.count('words', regular_text['word_count'] + googlebot_text['word_count'])
+        with metrics.span('similarity'):
+            similarity, method_details = self.calculate_similarity(
+                regular_text['words'], googlebot_text['words'],
+                regular_text.get('signature'), googlebot_text.get('signature')
+            )
+        signatures = method_details.pop('signatures', None)
+        
+        if self.fingerprint_store is not None:
+            with metrics.span('fingerprint_store'):
+                self.store_views(
+                    results, (regular_response, googlebot_response), (regular_text, googlebot_text), signatures
+                )
         
         # Determine if cloaking is detected
         is_cloaking = similarity < self.similarity_threshold
@@ -182,10 +717,21 @@ class CloakingDetector:
                 'similarity_percentage': round(similarity * 100, 2),
                 'threshold_percentage': round(self.similarity_threshold * 100, 2),
                 'cloaking_detected': is_cloaking,
-                'status': 'fail' if is_cloaking else 'pass'
+                'status': 'fail' if is_cloaking else 'pass',
+                **method_details
             }
         })
         
+        if self.fingerprint_store is not None:
+            results['fetch'] = {
+                'regular': regular_response.get('fetch', 'fetched'),
+                'googlebot': googlebot_response.get('fetch', 'fetched')
+            }
+        
+        if self.include_signatures and signatures is not None:
+            results['regular_user']['signature'] = signature_to_hex(signatures[0])
+            results['googlebot']['signature'] = signature_to_hex(signatures[1])
+        
         if is_cloaking:
             results['analysis']['details'] = (
                 f"Cloaking detected: Content similarity between regular user "
@@ -205,36 +751,141 @@ class CloakingDetector:
         return results
 
 
+def summarize_results(results):
+    """Reduce full detection results to the summary output format."""
+    if 'analysis' not in results:
+        return results
+    
+    summary = {
+        "url": results["url"],
+        "status": results["analysis"]["status"],
+        "cloaking_detected": results["analysis"]["cloaking_detected"],
+        "similarity_score": results["analysis"]["similarity_score"],
+        "similarity_percentage": results["analysis"]["similarity_percentage"],
+        "details": results["analysis"]["details"]
+    }
+    if 'timings' in results:
+        summary['timings'] = results['timings']
+    return summary
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Detect cloaking by comparing content served to different user agents"
     )
     parser.add_argument(
         "--url", 
-        required=True, 
         help="URL to check for cloaking"
     )
+    parser.add_argument(
+        "--urls-file",
+        help="Path to a file with one URL per line to check concurrently"
+    )
     parser.add_argument(
         "--user-agent-regular",
-        default="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+        default=DEFAULT_USER_AGENT_REGULAR,
         help="User agent string for regular browser simulation"
     )
     parser.add_argument(
         "--user-agent-googlebot",
-        default="Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)",
+        default=DEFAULT_USER_AGENT_GOOGLEBOT,
         help="User agent string for Googlebot simulation"
     )
     parser.add_argument(
         "--similarity-threshold",
         type=float,
-        default=0.9,
-        help="Minimum content similarity threshold (0-1) to pass the test"
+        help="Minimum content similarity threshold (0-1) to pass the test, by default calibrated for the shingle size"
     )
     parser.add_argument(
         "--request-delay",
+        type=float,
+        default=2,
+        help="Minimum average delay in seconds between requests to the same host, after an initial burst"
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=20,
+        help="Maximum number of URLs checked at the same time"
+    )
+    parser.add_argument(
+        "--per-host-concurrency",
         type=int,
         default=2,
-        help="Delay in seconds between requests"
+        help="Maximum number of requests in flight to a single host"
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=3,
+        help="Retries for connection errors and 429/5xx responses"
+    )
+    parser.add_argument(
+        "--retry-backoff",
+        type=float,
+        default=1,
+        help="Exponential backoff factor in seconds between retries"
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=30,
+        help="Request timeout in seconds (default: 30)"
+    )
+    parser.add_argument(
+        "--parser",
+        choices=PARSER_BACKENDS,
+        default=DEFAULT_PARSER_BACKEND,
+        help="HTML parser used for text extraction"
+    )
+    parser.add_argument(
+        "--similarity-method",
+        choices=SIMILARITY_METHODS,
+        default=DEFAULT_SIMILARITY_METHOD,
+        help="Compare views with fixed-size MinHash signatures, or exactly over the full shingle sets"
+    )
+    parser.add_argument(
+        "--shingle-size",
+        type=int,
+        default=DEFAULT_SHINGLE_SIZE,
+        help="Number of consecutive words per shingle, 1 compares word sets"
+    )
+    parser.add_argument(
+        "--signature-size",
+        type=int,
+        default=DEFAULT_SIGNATURE_SIZE,
+        help="Hashes kept per MinHash signature, larger is more accurate"
+    )
+    parser.add_argument(
+        "--include-signatures",
+        action="store_true",
+        help="Add the hex-encoded MinHash signature of each view to the results"
+    )
+    parser.add_argument(
+        "--fingerprint-store",
+        help="SQLite file keeping each view's fingerprint, so re-audits revalidate views with conditional requests"
+    )
+    parser.add_argument(
+        "--fingerprint-max-age",
+        type=float,
+        default=0,
+        help="Reuse a stored Googlebot view checked less than this many seconds ago without fetching it; without it "
+             "re-audits still request both views conditionally (default: 0)"
+    )
+    parser.add_argument(
+        "--http-cache",
+        help="Shared on-disk HTTP cache file; cached responses are revalidated with conditional requests"
+    )
+    parser.add_argument(
+        "--http-cache-size-mb",
+        type=float,
+        default=512,
+        help="Size limit of the HTTP cache in MB of compressed bodies (default: 512)"
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Replay responses from --http-cache without network access"
     )
     parser.add_argument(
         "--output-format",
@@ -242,51 +893,141 @@ def main():
         default='json',
         help="Output format: full json or summary"
     )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Add per-phase durations and counts to the results under timings"
+    )
+    parser.add_argument(
+        "--metrics-file",
+        help="Export the timings of the run to this file (implies --timings)"
+    )
+    parser.add_argument(
+        "--metrics-format",
+        choices=EXPORT_FORMATS,
+        default='jsonl',
+        help="Format of --metrics-file: jsonl appends a record per run, prometheus replaces the file (default: jsonl)"
+    )
     
     args = parser.parse_args()
     
-    # Validate URL
-    parsed_url = urlparse(args.url)
-    if not parsed_url.scheme or not parsed_url.netloc:
+    if args.url:
+        urls = [args.url]
+    elif args.urls_file:
+        try:
+            with open(args.urls_file, 'r', encoding='utf-8') as f:
+                urls = [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+        except Exception as e:
+            print(json.dumps({"error": f"Error reading URLs file: {e}"}, indent=2))
+            return
+    else:
+        print(json.dumps({"error": "Must provide either --url or --urls-file"}, indent=2))
+        return
+    
+    # Validate URLs
+    invalid_urls = [url for url in urls if not urlparse(url).scheme or not urlparse(url).netloc]
+    if invalid_urls:
         print(json.dumps({
-            "error": f"Invalid URL: {args.url}. Please provide a complete URL with http:// or https://"
-        }), indent=2)
+            "error": f"Invalid URL: {invalid_urls[0]}. Please provide a complete URL with http:// or https://"
+        }, indent=2))
         return
     
     # Validate threshold
+    if args.similarity_threshold is None:
+        args.similarity_threshold = SIMILARITY_THRESHOLDS.get(max(1, args.shingle_size))
+        if args.similarity_threshold is None:
+            print(json.dumps({
+                "error": f"No default similarity threshold for --shingle-size {args.shingle_size}, "
+                         "pass --similarity-threshold"
+            }, indent=2))
+            return
     if not 0 <= args.similarity_threshold <= 1:
         print(json.dumps({
             "error": "Similarity threshold must be between 0 and 1"
-        }), indent=2)
+        }, indent=2))
+        return
+    
+    if args.offline and not args.http_cache:
+        print(json.dumps({"error": "--offline requires --http-cache"}, indent=2))
         return
     
+    http_cache = None
+    if args.http_cache:
+        if HttpCache is None:
+            print(json.dumps({"error": "--http-cache requires the http_cache script directory next to this one"}, indent=2))
+            return
+        try:
+            http_cache = HttpCache(args.http_cache, args.http_cache_size_mb, offline=args.offline)
+        except Exception as e:
+            print(json.dumps({"error": f"Error opening HTTP cache: {e}"}, indent=2))
+            return
+    
+    fingerprint_store = None
+    if args.fingerprint_store:
+        try:
+            fingerprint_store = FingerprintStore(args.fingerprint_store)
+        except Exception as e:
+            print(json.dumps({"error": f"Error opening fingerprint store: {e}"}, indent=2))
+            return
+    
+    metrics = Metrics() if args.timings or args.metrics_file else NULL_METRICS
+    
     # Run detection
     detector = CloakingDetector(
         similarity_threshold=args.similarity_threshold,
-        request_delay=args.request_delay
+        request_delay=args.request_delay,
+        max_concurrency=args.max_concurrency,
+        per_host_concurrency=args.per_host_concurrency,
+        max_retries=args.max_retries,
+        backoff_factor=args.retry_backoff,
+        parser_backend=args.parser,
+        similarity_method=args.similarity_method,
+        shingle_size=args.shingle_size,
+        signature_size=args.signature_size,
+        include_signatures=args.include_signatures,
+        fingerprint_store=fingerprint_store,
+        fingerprint_max_age=args.fingerprint_max_age,
+        http_cache=http_cache,
+        timeout=args.timeout,
+        metrics=metrics
     )
     
-    results = detector.detect_cloaking(
-        url=args.url,
-        user_agent_regular=args.user_agent_regular,
-        user_agent_googlebot=args.user_agent_googlebot
-    )
+    try:
+        all_results = detector.detect_cloaking_many(
+            urls,
+            user_agent_regular=args.user_agent_regular,
+            user_agent_googlebot=args.user_agent_googlebot
+        )
+    finally:
+        detector.close()
+        if fingerprint_store is not None:
+            fingerprint_store.close()
+        if http_cache is not None:
+            print(f"HTTP cache: {http_cache.stats()}", file=sys.stderr)
+            http_cache.close()
     
-    if args.output_format == 'summary' and 'analysis' in results:
+    detected_count = len([r for r in all_results if r.get('analysis', {}).get('cloaking_detected')])
+    errors_count = len([r for r in all_results if r.get('error')])
+    
+    if args.output_format == 'summary':
         # Output simplified summary
-        summary = {
-            "url": results["url"],
-            "status": results["analysis"]["status"],
-            "cloaking_detected": results["analysis"]["cloaking_detected"],
-            "similarity_score": results["analysis"]["similarity_score"],
-            "similarity_percentage": results["analysis"]["similarity_percentage"],
-            "details": results["analysis"]["details"]
-        }
-        print(json.dumps(summary, indent=2))
+        all_results = [summarize_results(results) for results in all_results]
+    
+    if args.url:
+        print(json.dumps(all_results[0], indent=2))
     else:
-        # Output full results
-        print(json.dumps(results, indent=2))
-
+        print(json.dumps(add_timings({
+            "urls_count": len(all_results),
+            "cloaking_detected_count": detected_count,
+            "errors_count": errors_count,
+            "results": all_results
+        }, metrics), indent=2))
+    
+    if args.metrics_file:
+        try:
+            export_metrics(metrics.snapshot(), args.metrics_file, args.metrics_format, {"detector": "cloaking"})
+        except OSError as e:
+            print(json.dumps({"error": f"Error writing metrics file: {e}"}, indent=2))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
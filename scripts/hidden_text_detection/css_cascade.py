@@ -0,0 +1,1090 @@
+#!/usr/bin/env python3
+"""
+Static CSS Cascade
+Resolves, without a browser, the styles that decide whether an element's text is visible: display, visibility,
+opacity, font-size, text-indent, color and background, and off-screen positioning. Rules come from the page's
+stylesheets, are indexed by the id, class, tag or attribute of their rightmost compound selector and are applied
+by specificity and source order over the inline style. Whatever cannot be decided statically (media queries on
+unknown features, unloaded stylesheets, values depending on layout) is reported as a reason to render the page.
+"""
+
+import re
+import colorsys
+from collections import defaultdict, namedtuple
+
+import soupsieve as sv
+from bs4 import NavigableString
+
+# Viewport of the headless Chrome window used by the browser path, for media queries and viewport units
+VIEWPORT_WIDTH = 1920
+VIEWPORT_HEIGHT = 1080
+ROOT_FONT_SIZE = 16.0
+# Text moved this far out of its box, by text-indent or by left/top on a positioned element, is off-screen
+OFFSCREEN_DISTANCE = 100
+# Elements whose content is never rendered as page text
+UNRENDERED_TAGS = {"head", "script", "style", "template", "noscript", "title", "meta", "link"}
+
+TRACKED_PROPERTIES = {
+    "display",
+    "visibility",
+    "opacity",
+    "font-size",
+    "text-indent",
+    "color",
+    "background-color",
+    "background-image",
+    "position",
+    "left",
+    "top",
+}
+INHERITED_PROPERTIES = {"visibility", "font-size", "text-indent", "color"}
+# Hiding by these properties can be undone by a descendant, hiding by any other property covers the whole subtree
+OVERRIDABLE_PROPERTIES = INHERITED_PROPERTIES | {"background-color"}
+CSS_WIDE_KEYWORDS = {"inherit", "initial", "unset", "revert", "revert-layer"}
+
+FONT_SIZE_KEYWORDS = {
+    "xx-small": 9.0,
+    "x-small": 10.0,
+    "small": 13.0,
+    "medium": 16.0,
+    "large": 18.0,
+    "x-large": 24.0,
+    "xx-large": 32.0,
+    "xxx-large": 48.0,
+}
+ABSOLUTE_UNITS = {"px": 1.0, "pt": 96 / 72, "pc": 16.0, "in": 96.0, "cm": 96 / 2.54, "mm": 96 / 25.4, "q": 96 / 101.6}
+
+NAMED_COLORS = {
+    "transparent": (0, 0, 0, 0.0),
+    "black": (0, 0, 0, 1.0),
+    "white": (255, 255, 255, 1.0),
+    "red": (255, 0, 0, 1.0),
+    "green": (0, 128, 0, 1.0),
+    "blue": (0, 0, 255, 1.0),
+    "yellow": (255, 255, 0, 1.0),
+    "orange": (255, 165, 0, 1.0),
+    "gray": (128, 128, 128, 1.0),
+    "grey": (128, 128, 128, 1.0),
+    "silver": (192, 192, 192, 1.0),
+    "maroon": (128, 0, 0, 1.0),
+    "purple": (128, 0, 128, 1.0),
+    "fuchsia": (255, 0, 255, 1.0),
+    "magenta": (255, 0, 255, 1.0),
+    "lime": (0, 255, 0, 1.0),
+    "olive": (128, 128, 0, 1.0),
+    "navy": (0, 0, 128, 1.0),
+    "teal": (0, 128, 128, 1.0),
+    "aqua": (0, 255, 255, 1.0),
+    "cyan": (0, 255, 255, 1.0),
+    "whitesmoke": (245, 245, 245, 1.0),
+    "lightgray": (211, 211, 211, 1.0),
+    "lightgrey": (211, 211, 211, 1.0),
+    "darkgray": (169, 169, 169, 1.0),
+    "darkgrey": (169, 169, 169, 1.0),
+}
+CANVAS_COLOR = NAMED_COLORS["white"]
+DEFAULT_TEXT_COLOR = NAMED_COLORS["black"]
+
+# Stands for a background whose color cannot be known statically (an image or a translucent layer)
+UNKNOWN_BACKGROUND = "unknown"
+INLINE_SOURCE = "style attribute"
+
+# Pseudo-elements style generated content, not the element's own text
+PSEUDO_ELEMENT_RE = re.compile(r"::|:(?:before|after|first-line|first-letter)\b", re.IGNORECASE)
+IMPORTANT_RE = re.compile(r"!\s*important\s*$", re.IGNORECASE)
+COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+IMPORT_RE = re.compile(r"""@import\s+(?:url\(\s*)?["']?([^"')\s;]+)["']?\s*\)?\s*(.*)$""", re.IGNORECASE | re.DOTALL)
+MEDIA_FEATURE_RE = re.compile(r"\(\s*([a-z-]+)\s*(?::\s*([^)]+?))?\s*\)")
+LENGTH_TOKEN_RE = re.compile(
+    r"\s*(?:(?P<number>[+-]?(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?)(?P<unit>%|[a-z]+)?"
+    r"|(?P<function>calc|min|max|clamp)\("
+    r"|(?P<operator>[-+*/(),]))",
+    re.IGNORECASE,
+)
+HEX_COLOR_RE = re.compile(r"#([0-9a-f]{3,8})")
+FUNCTION_COLOR_RE = re.compile(r"(rgba?|hsla?)\(([^)]*)\)")
+PSEUDO_ARGUMENTS_RE = re.compile(r"\((?:[^()]|\([^()]*\))*\)")
+ATTRIBUTE_RE = re.compile(r"\[\s*([\w-]+)[^\]]*\]")
+MEDIA_RANGE_RE = re.compile(r"\(\s*(width|height)\s*(<=|>=|<|>|=)\s*([^)]+?)\s*\)")
+ESCAPE_RE = re.compile(r"\\([0-9a-fA-F]{1,6}\s?|.)")
+
+# One selector of a rule: its specificity and position order the cascade, `conditional` marks rules under a media
+# query that cannot be evaluated statically
+RuleEntry = namedtuple("RuleEntry", "specificity order selector compiled declarations conditional media ancestors")
+
+
+def skip_string(text, start):
+    """Return the index just past the quoted string starting at `start`."""
+    quote = text[start]
+    index = start + 1
+    while index < len(text):
+        if text[index] == "\\":
+            index += 2
+            continue
+        if text[index] == quote:
+            return index + 1
+        index += 1
+    return index
+
+
+def split_top_level(text, separator):
+    """Split `text` on `separator` outside strings, parentheses and brackets."""
+    parts = []
+    depth = 0
+    start = 0
+    index = 0
+    while index < len(text):
+        char = text[index]
+        if char in "\"'":
+            index = skip_string(text, index)
+            continue
+        if char == "\\":
+            index += 2
+            continue
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth = max(depth - 1, 0)
+        elif char == separator and depth == 0:
+            parts.append(text[start:index])
+            start = index + 1
+        index += 1
+    parts.append(text[start:])
+    return parts
+
+
+def iter_blocks(text):
+    """Yield (prelude, body) for each top-level rule of a stylesheet; body is None for statement at-rules."""
+    start = 0
+    index = 0
+    while index < len(text):
+        char = text[index]
+        if char in "\"'":
+            index = skip_string(text, index)
+            continue
+        if char == ";":
+            prelude = text[start:index].strip()
+            if prelude:
+                yield prelude, None
+            start = index + 1
+        elif char == "}":
+            # Unbalanced closing brace, browsers drop it
+            start = index + 1
+        elif char == "{":
+            depth = 1
+            end = index + 1
+            while end < len(text) and depth:
+                if text[end] in "\"'":
+                    end = skip_string(text, end)
+                    continue
+                depth += text[end] == "{"
+                depth -= text[end] == "}"
+                end += 1
+            yield text[start:index].strip(), text[index + 1 : end - 1]
+            start = index = end
+            continue
+        index += 1
+
+
+def unescape_identifier(identifier):
+    """Resolve CSS escapes in an identifier, as in `.md\\:hidden`."""
+
+    def replace(match):
+        escaped = match.group(1)
+        if len(escaped.strip()) > 1 or re.fullmatch(r"[0-9a-fA-F]", escaped.strip()):
+            return chr(int(escaped.strip(), 16))
+        return escaped
+
+    return ESCAPE_RE.sub(replace, identifier)
+
+
+def media_query_applies(query):
+    """Whether one media query matches the browser path's screen: True, False, or None when undecidable."""
+    query = query.strip().lower()
+    negated = query.startswith("not ")
+    query = re.sub(r"^(?:not|only)\s+", "", query)
+
+    media_type, _, _ = query.partition("(")
+    media_type = media_type.replace(" and", " ").split()
+    result = True
+    if media_type and media_type[0] not in ("all", "screen"):
+        result = False
+
+    features = MEDIA_FEATURE_RE.findall(query)
+    ranges = MEDIA_RANGE_RE.findall(query)
+    if len(features) + len(ranges) < query.count("("):
+        # Syntax the checks below do not read, such as nested conditions or two-sided ranges
+        if result:
+            result = None
+
+    for feature, comparison, value in ranges:
+        length = length_px(value, ROOT_FONT_SIZE, ROOT_FONT_SIZE)
+        if length is None:
+            if result:
+                result = None
+            continue
+        dimension = VIEWPORT_WIDTH if feature == "width" else VIEWPORT_HEIGHT
+        holds = {"<=": dimension <= length, ">=": dimension >= length, "<": dimension < length, ">": dimension > length}
+        if not holds.get(comparison, dimension == length):
+            result = False
+
+    for feature, value in features:
+        if result is False:
+            break
+        value = (value or "").strip()
+        feature_result = None
+        dimension = {"width": VIEWPORT_WIDTH, "height": VIEWPORT_HEIGHT}.get(feature.split("-")[-1])
+        if dimension is not None and feature.split("-")[0] in ("min", "max", "width", "height") and value:
+            length = length_px(value, ROOT_FONT_SIZE, ROOT_FONT_SIZE)
+            if length is not None:
+                if feature.startswith("min-"):
+                    feature_result = dimension >= length
+                elif feature.startswith("max-"):
+                    feature_result = dimension <= length
+                else:
+                    feature_result = dimension == length
+        elif feature == "orientation":
+            feature_result = value == "landscape"
+        elif feature in ("hover", "pointer", "any-hover", "any-pointer") and value:
+            feature_result = value in ("hover", "fine")
+        elif feature == "prefers-reduced-motion":
+            feature_result = value == "no-preference"
+        elif feature == "prefers-color-scheme":
+            feature_result = value == "light"
+
+        if feature_result is False:
+            result = False
+        elif feature_result is None:
+            result = None
+
+    if negated and result is not None:
+        return not result
+    return result
+
+
+def media_applies(media):
+    """Whether a media query list applies: True, False, or None when it cannot be decided statically."""
+    if not media or not media.strip():
+        return True
+    results = [media_query_applies(query) for query in split_top_level(media, ",") if query.strip()]
+    if True in results:
+        return True
+    if None in results:
+        return None
+    return False
+
+
+def selector_specificity(selector):
+    """Return the (ids, classes, types) specificity of a single complex selector."""
+    ids = classes = types = 0
+    index = 0
+    length = len(selector)
+
+    def identifier_end(position):
+        while position < length and (
+            selector[position].isalnum() or selector[position] in "-_\\" or ord(selector[position]) > 127
+        ):
+            position += 2 if selector[position] == "\\" else 1
+        return position
+
+    def arguments_end(position):
+        depth = 1
+        position += 1
+        while position < length and depth:
+            depth += selector[position] == "("
+            depth -= selector[position] == ")"
+            position += 1
+        return position
+
+    while index < length:
+        char = selector[index]
+        if char == "#":
+            ids += 1
+            index = identifier_end(index + 1)
+        elif char == ".":
+            classes += 1
+            index = identifier_end(index + 1)
+        elif char == "[":
+            classes += 1
+            index = selector.find("]", index) + 1 or length
+        elif char == ":":
+            pseudo_element = selector.startswith("::", index)
+            start = index + (2 if pseudo_element else 1)
+            end = identifier_end(start)
+            name = selector[start:end].lower()
+            arguments = None
+            if end < length and selector[end] == "(":
+                close = arguments_end(end)
+                arguments = selector[end + 1 : close - 1]
+                end = close
+
+            if pseudo_element or name in ("before", "after", "first-line", "first-letter"):
+                types += 1
+            elif name == "where":
+                pass
+            elif name in ("is", "not", "has", "matches", "any") and arguments is not None:
+                nested = [selector_specificity(part) for part in split_top_level(arguments, ",") if part.strip()]
+                if nested:
+                    best = max(nested)
+                    ids, classes, types = ids + best[0], classes + best[1], types + best[2]
+            elif name in ("nth-child", "nth-last-child") and arguments and " of " in arguments:
+                nested = [selector_specificity(part) for part in split_top_level(arguments.split(" of ", 1)[1], ",")]
+                best = max(nested)
+                ids, classes, types = ids + best[0], classes + best[1] + 1, types + best[2]
+            else:
+                classes += 1
+            index = end
+        elif char.isalpha() or char == "_" or ord(char) > 127:
+            types += 1
+            index = identifier_end(index)
+        elif char in "\"'":
+            index = skip_string(selector, index)
+        else:
+            index += 1
+
+    return ids, classes, types
+
+
+def split_compounds(selector):
+    """Split a complex selector into its compound selectors, as (compound, combinator to its right) pairs."""
+    compounds = []
+    depth = 0
+    start = 0
+    index = 0
+    while index < len(selector):
+        char = selector[index]
+        if char == "\\":
+            index += 2
+            continue
+        if char in "\"'":
+            index = skip_string(selector, index)
+            continue
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif depth == 0 and (char.isspace() or char in ">+~"):
+            if selector[start:index]:
+                compounds.append([selector[start:index], None])
+            if compounds and (compounds[-1][1] is None or compounds[-1][1] == " "):
+                compounds[-1][1] = " " if char.isspace() else char
+            start = index + 1
+        index += 1
+    compounds.append([selector[start:], None])
+    return [tuple(compound) for compound in compounds]
+
+
+def compound_keys(compound):
+    """Return the ids, classes and tag a compound selector requires of an element, as "#id", ".class" and "tag"."""
+    # Arguments of pseudo-classes and attribute values never say what the element itself must carry
+    compound = PSEUDO_ARGUMENTS_RE.sub("", compound)
+    compound = ATTRIBUTE_RE.sub(r"[\1]", compound)
+    if "|" in compound:
+        return set()
+    keys = {"#" + unescape_identifier(value) for value in re.findall(r"#((?:\\.|[\w-])+)", compound)}
+    keys.update("." + unescape_identifier(value) for value in re.findall(r"\.((?:\\.|[\w-])+)", compound))
+    match = re.match(r"([a-zA-Z][\w-]*)", compound)
+    if match:
+        keys.add(match.group(1).lower())
+    return keys
+
+
+def group_key(keys):
+    """Return the most selective of a selector's ancestor keys, an id before a class before a tag, or None."""
+    if not keys:
+        return None
+    return min(keys, key=lambda key: ({"#": 0, ".": 1}.get(key[0], 2), key))
+
+
+def element_keys(element):
+    """Return the keys of compound_keys() an element carries."""
+    keys = {element.name}
+    if element.get("id"):
+        keys.add("#" + element["id"])
+    classes = element.get("class") or ()
+    if isinstance(classes, str):
+        classes = classes.split()
+    keys.update("." + class_name for class_name in classes)
+    return keys
+
+
+def ancestor_keys(selector):
+    """Return the keys that some ancestor of a matching element must carry, from the compounds before a descendant or
+    child combinator."""
+    keys = set()
+    for compound, combinator in split_compounds(selector):
+        if combinator in (" ", ">"):
+            keys |= compound_keys(compound)
+    return frozenset(keys)
+
+
+def bucket_key(selector):
+    """Return the (kind, value) bucket of a selector, from its rightmost compound's id, class, tag or attribute."""
+    compound = split_compounds(selector)[-1][0]
+    # Arguments of pseudo-classes and attribute values never say what the element itself must carry
+    compound = PSEUDO_ARGUMENTS_RE.sub("", compound)
+    compound = ATTRIBUTE_RE.sub(r"[\1]", compound)
+    if "|" in compound:
+        return "universal", None
+    match = re.search(r"#((?:\\.|[\w-])+)", compound)
+    if match:
+        return "id", unescape_identifier(match.group(1))
+    match = re.search(r"\.((?:\\.|[\w-])+)", compound)
+    if match:
+        return "class", unescape_identifier(match.group(1))
+    match = re.match(r"([a-zA-Z][\w-]*)", compound)
+    if match:
+        return "tag", match.group(1).lower()
+    match = re.match(r"\*?\[([\w-]+)\]", compound)
+    if match:
+        return "attribute", match.group(1).lower()
+    return "universal", None
+
+
+def expand_declaration(name, value):
+    """Return the tracked (property, value) pairs a declaration sets, expanding the background and font shorthands."""
+    if name in TRACKED_PROPERTIES or name.startswith("--"):
+        return [(name, value)]
+
+    if name == "background":
+        if value in CSS_WIDE_KEYWORDS:
+            return [("background-color", value), ("background-image", value)]
+        layers = split_top_level(value, ",")
+        color = "transparent"
+        for token in split_top_level(layers[-1].strip(), " "):
+            if parse_color(token.strip()) is not None or token.strip().startswith("var("):
+                color = token.strip()
+        has_image = any(re.search(r"url\(|gradient\(|image\(", layer) for layer in layers)
+        return [("background-color", color), ("background-image", "url()" if has_image else "none")]
+
+    if name == "font":
+        if value in CSS_WIDE_KEYWORDS:
+            return [("font-size", value)]
+        for token in split_top_level(value, " "):
+            size = token.split("/", 1)[0].strip()
+            if size in FONT_SIZE_KEYWORDS or size in ("smaller", "larger") or re.match(r"[+-]?[\d.]", size):
+                if re.fullmatch(r"\d+", size) and size != "0":
+                    # A bare number is a font-weight
+                    continue
+                return [("font-size", size)]
+    return []
+
+
+def parse_declarations(text):
+    """Return [(property, value, important)] for the tracked properties and custom properties of a declaration block."""
+    declarations = []
+    for part in split_top_level(COMMENT_RE.sub("", text), ";"):
+        name, separator, value = part.partition(":")
+        if not separator:
+            continue
+        name = name.strip()
+        if not name.startswith("--"):
+            name = name.lower()
+            value = value.lower()
+        value = value.strip()
+        match = IMPORTANT_RE.search(value)
+        important = match is not None
+        if important:
+            value = value[: match.start()].strip()
+        for prop, prop_value in expand_declaration(name, value):
+            declarations.append((prop, prop_value, important))
+    return declarations
+
+
+def parse_color(value):
+    """Parse a CSS color into an (r, g, b, alpha) tuple, or None."""
+    value = value.strip().lower()
+    if value in NAMED_COLORS:
+        return NAMED_COLORS[value]
+
+    match = HEX_COLOR_RE.fullmatch(value)
+    if match:
+        digits = match.group(1)
+        if len(digits) in (3, 4):
+            digits = "".join(digit * 2 for digit in digits)
+        if len(digits) not in (6, 8):
+            return None
+        alpha = int(digits[6:8], 16) / 255 if len(digits) == 8 else 1.0
+        return int(digits[0:2], 16), int(digits[2:4], 16), int(digits[4:6], 16), round(alpha, 3)
+
+    match = FUNCTION_COLOR_RE.fullmatch(value)
+    if not match:
+        return None
+    parts = [part for part in re.split(r"[\s,/]+", match.group(2).strip()) if part]
+    if len(parts) not in (3, 4):
+        return None
+    try:
+        alpha = 1.0
+        if len(parts) == 4:
+            alpha = float(parts[3][:-1]) / 100 if parts[3].endswith("%") else float(parts[3])
+        if match.group(1).startswith("rgb"):
+            channels = [float(part[:-1]) * 2.55 if part.endswith("%") else float(part) for part in parts[:3]]
+        else:
+            hue = float(re.sub(r"deg$", "", parts[0])) / 360
+            lightness, saturation = float(parts[2].rstrip("%")) / 100, float(parts[1].rstrip("%")) / 100
+            channels = [channel * 255 for channel in colorsys.hls_to_rgb(hue % 1, lightness, saturation)]
+    except ValueError:
+        return None
+    r, g, b = (int(round(min(max(channel, 0), 255))) for channel in channels)
+    return r, g, b, round(min(max(alpha, 0.0), 1.0), 3)
+
+
+def format_color(color):
+    """Format an (r, g, b, alpha) tuple as the rgba() string the browser path reports."""
+    return f"rgba({color[0]}, {color[1]}, {color[2]}, {color[3]:g})"
+
+
+def length_px(value, font_size, root_font_size, percent_base=None):
+    """
+    Convert a CSS length, including calc(), min(), max() and clamp(), to px.
+    Returns None when the value cannot be resolved statically.
+    """
+    tokens = []
+    position = 0
+    value = value.strip().lower()
+    while position < len(value):
+        match = LENGTH_TOKEN_RE.match(value, position)
+        if not match or match.end() == position:
+            return None
+        tokens.append(match)
+        position = match.end()
+        while position < len(value) and value[position].isspace():
+            position += 1
+
+    def unit_px(number, unit):
+        if not unit:
+            return number
+        if unit in ABSOLUTE_UNITS:
+            return number * ABSOLUTE_UNITS[unit]
+        if unit == "em":
+            return number * font_size
+        if unit == "rem":
+            return number * root_font_size
+        if unit in ("ex", "ch"):
+            return number * font_size / 2
+        if unit == "vw":
+            return number * VIEWPORT_WIDTH / 100
+        if unit == "vh":
+            return number * VIEWPORT_HEIGHT / 100
+        if unit == "%" and percent_base is not None:
+            return number * percent_base / 100
+        raise ValueError(unit)
+
+    index = 0
+
+    def peek(kind):
+        return index < len(tokens) and tokens[index].group(kind) is not None
+
+    def operator(symbols):
+        return peek("operator") and tokens[index].group("operator") in symbols
+
+    def expression():
+        nonlocal index
+        result = term()
+        while operator("+-"):
+            symbol = tokens[index].group("operator")
+            index += 1
+            result = result + term() if symbol == "+" else result - term()
+        return result
+
+    def term():
+        nonlocal index
+        result = factor()
+        while operator("*/"):
+            symbol = tokens[index].group("operator")
+            index += 1
+            right = factor()
+            result = result * right if symbol == "*" else result / right
+        return result
+
+    def factor():
+        nonlocal index
+        if index >= len(tokens):
+            raise ValueError("unexpected end")
+        token = tokens[index]
+        index += 1
+        if token.group("number") is not None:
+            return unit_px(float(token.group("number")), token.group("unit"))
+        if token.group("operator") == "-":
+            return -factor()
+        if token.group("operator") == "(":
+            result = expression()
+            close()
+            return result
+        if token.group("function"):
+            arguments = [expression()]
+            while operator(","):
+                index += 1
+                arguments.append(expression())
+            close()
+            function = token.group("function").lower()
+            if function == "calc" and len(arguments) == 1:
+                return arguments[0]
+            if function == "min":
+                return min(arguments)
+            if function == "max":
+                return max(arguments)
+            if function == "clamp" and len(arguments) == 3:
+                return max(arguments[0], min(arguments[1], arguments[2]))
+        raise ValueError(token.group(0))
+
+    def close():
+        nonlocal index
+        if not operator(")"):
+            raise ValueError("missing )")
+        index += 1
+
+    try:
+        result = expression()
+    except (ValueError, ZeroDivisionError):
+        return None
+    if index != len(tokens):
+        return None
+    # Only a single unitless zero is a valid length
+    if len(tokens) == 1 and tokens[0].group("number") is not None and not tokens[0].group("unit") and result != 0:
+        return None
+    return result
+
+
+def substitute_variables(value, custom, depth=0):
+    """Replace var() references with custom property values; None when a reference has no value or fallback."""
+    if "var(" not in value:
+        return value
+    if depth > 10:
+        return None
+
+    start = value.find("var(")
+    depth_count = 1
+    end = start + 4
+    while end < len(value) and depth_count:
+        depth_count += value[end] == "("
+        depth_count -= value[end] == ")"
+        end += 1
+    name, _, fallback = value[start + 4 : end - 1].partition(",")
+    replacement = custom.get(name.strip())
+    if replacement is None:
+        if not _:
+            return None
+        replacement = fallback.strip()
+    replacement = substitute_variables(replacement, custom, depth + 1)
+    if replacement is None:
+        return None
+    return substitute_variables(value[:start] + replacement + value[end:], custom, depth + 1)
+
+
+def declaration_may_hide(prop, value):
+    """Whether a declaration, wherever it applies, could hide text by one of the tracked techniques."""
+    if prop == "display":
+        return value == "none"
+    if prop == "visibility":
+        return value in ("hidden", "collapse")
+    if prop == "opacity":
+        return value.strip() in ("0", "0.0", "0%") or value.startswith("var(")
+    if prop == "font-size":
+        return re.match(r"0(?:\.0+)?(?:[a-z%]+)?$", value) is not None or value.startswith("var(")
+    if prop in ("text-indent", "left", "top"):
+        return "-" in value
+    return False
+
+
+class StyleIndex:
+    """
+    Rules of a document's stylesheets, each selector of a rule stored once in a bucket keyed by the id, first class,
+    tag or attribute of its rightmost compound selector, and within it by one of the keys it requires of an ancestor.
+    Finding the rules of an element only tests the selectors of the buckets it belongs to whose ancestor key is among
+    its ancestors'.
+    """
+
+    def __init__(self):
+        self._buckets = {kind: {} for kind in ("id", "class", "tag", "attribute")}
+        self._universal = defaultdict(list)
+        self._compiled = {}
+        self._order = 0
+        self.rules = 0
+        self.unsupported_selectors = 0
+        # Elements whose matching rules were looked up
+        self.elements_matched = 0
+
+    def add_stylesheet(self, text, media=None, load_import=None):
+        """
+        Add the rules of a stylesheet that applies to `media`.
+        Each @import is handed to `load_import(href, media)` where it appears, so imported rules come first in
+        source order as they do in the browser.
+        """
+        applies = media_applies(media)
+        if applies is False:
+            return
+        self._add_blocks(COMMENT_RE.sub("", text), applies is None, media, load_import)
+
+    def _add_blocks(self, text, conditional, media, load_import):
+        for prelude, body in iter_blocks(text):
+            if not prelude.startswith("@"):
+                if body is not None:
+                    self.add_rule(prelude, parse_declarations(body), conditional, media)
+                continue
+
+            name = re.match(r"@([\w-]+)", prelude)
+            name = name.group(1).lower() if name else ""
+            if name == "import" and body is None:
+                match = IMPORT_RE.match(prelude)
+                if match and load_import is not None:
+                    load_import(match.group(1), match.group(2).strip() or media)
+            elif name == "media" and body is not None:
+                query = prelude[len("@media") :].strip()
+                applies = media_applies(query)
+                if applies is not False:
+                    self._add_blocks(
+                        body, conditional or applies is None, query if applies is None else media, load_import
+                    )
+            elif name in ("supports", "layer", "document", "scope") and body is not None:
+                self._add_blocks(body, conditional, media, load_import)
+            elif name == "container" and body is not None:
+                # Container queries depend on layout
+                self._add_blocks(body, True, prelude, load_import)
+
+    def add_rule(self, selector_list, declarations, conditional=False, media=None):
+        """Add a style rule, one entry per selector of its selector list."""
+        if not declarations:
+            return
+        self.rules += 1
+        for selector in split_top_level(selector_list, ","):
+            selector = selector.strip()
+            if not selector or PSEUDO_ELEMENT_RE.search(selector):
+                continue
+            compiled = self._compile(selector)
+            if compiled is None:
+                self.unsupported_selectors += 1
+                continue
+
+            entry = RuleEntry(
+                selector_specificity(selector),
+                self._order,
+                selector,
+                compiled,
+                declarations,
+                conditional,
+                media,
+                ancestor_keys(selector),
+            )
+            self._order += 1
+            kind, key = bucket_key(selector)
+            groups = self._universal if kind == "universal" else self._buckets[kind].setdefault(key, defaultdict(list))
+            groups[group_key(entry.ancestors)].append(entry)
+
+    def _compile(self, selector):
+        if selector not in self._compiled:
+            try:
+                self._compiled[selector] = sv.compile(selector)
+            except (sv.SelectorSyntaxError, NotImplementedError, ValueError):
+                self._compiled[selector] = None
+        return self._compiled[selector]
+
+    def matching(self, element, ancestors=None):
+        """
+        Return the entries whose selector matches `element`.
+        `ancestors` is the set of element_keys() of the element's ancestors; a selector requiring an id, class or tag
+        of an ancestor that none of them carries is rejected without running the selector, as browsers do with their
+        ancestor Bloom filter.
+        """
+        self.elements_matched += 1
+        if ancestors is None:
+            ancestors = set().union(
+                *(element_keys(parent) for parent in element.parents if parent.name != "[document]")
+            )
+        buckets = [self._universal, self._buckets["tag"].get(element.name)]
+        element_id = element.get("id")
+        if element_id:
+            buckets.append(self._buckets["id"].get(element_id))
+        classes = element.get("class") or ()
+        if isinstance(classes, str):
+            classes = classes.split()
+        buckets += [self._buckets["class"].get(class_name) for class_name in set(classes)]
+        buckets += [self._buckets["attribute"].get(attribute) for attribute in element.attrs]
+
+        candidates = []
+        for groups in buckets:
+            if not groups:
+                continue
+            candidates += groups.get(None, ())
+            for key in ancestors if len(ancestors) < len(groups) else groups:
+                if key is not None and key in ancestors:
+                    candidates += groups.get(key, ())
+        return [entry for entry in candidates if entry.ancestors <= ancestors and entry.compiled.match(element)]
+
+
+def cascade(entries, inline_declarations):
+    """Return {property: (value, source)} of the winning declarations, by importance, specificity and order."""
+    winners = {}
+    ranked = sorted(entries, key=lambda entry: (entry.specificity, entry.order))
+    for important in (False, True):
+        for entry in ranked:
+            for prop, value, declaration_important in entry.declarations:
+                if declaration_important == important:
+                    winners[prop] = (value, entry.selector)
+        for prop, value, declaration_important in inline_declarations:
+            if declaration_important == important:
+                winners[prop] = (value, INLINE_SOURCE)
+    return winners
+
+
+class ComputedStyle:
+    """The tracked properties of one element, resolved from its cascaded values and its parent's style."""
+
+    __slots__ = (
+        "display",
+        "visibility",
+        "opacity",
+        "font_size",
+        "text_indent",
+        "color",
+        "background",
+        "position",
+        "left",
+        "top",
+        "custom",
+        "sources",
+        "unresolved",
+        "keys",
+    )
+
+    @classmethod
+    def root(cls):
+        style = cls()
+        style.display = "block"
+        style.visibility = "visible"
+        style.opacity = 1.0
+        style.font_size = ROOT_FONT_SIZE
+        style.text_indent = 0.0
+        style.color = DEFAULT_TEXT_COLOR
+        style.background = CANVAS_COLOR
+        style.position = "static"
+        style.left = style.top = None
+        style.custom = {}
+        style.sources = {}
+        style.unresolved = []
+        style.keys = frozenset()
+        return style
+
+
+class StyleResolver:
+    """Computes the styles of a document's elements top-down, from a StyleIndex and their inline styles."""
+
+    def __init__(self, index, root_font_size=ROOT_FONT_SIZE):
+        self.index = index
+        self.root_font_size = root_font_size
+
+    def compute(self, element, parent):
+        """Return the ComputedStyle of `element` given its parent's, and the conditional rules it matches."""
+        entries = self.index.matching(element, parent.keys)
+        matched = [entry for entry in entries if not entry.conditional]
+        conditional = [entry for entry in entries if entry.conditional]
+        inline = parse_declarations(element.get("style") or "")
+        if element.has_attr("hidden"):
+            # The user agent stylesheet's [hidden] { display: none }, below every author rule
+            matched.insert(
+                0,
+                RuleEntry(
+                    (0, 0, 0), -1, "hidden attribute", None, [("display", "none", False)], False, None, frozenset()
+                ),
+            )
+        winners = cascade(matched, inline)
+
+        style = ComputedStyle()
+        style.sources = {}
+        style.unresolved = []
+        # The element_keys() of the element and its ancestors, which its descendants' selectors are filtered by
+        style.keys = parent.keys | element_keys(element)
+        own_custom = {prop: value for prop, (value, _) in winners.items() if prop.startswith("--")}
+        style.custom = {**parent.custom, **own_custom} if own_custom else parent.custom
+
+        def specified(prop):
+            """Return the cascaded value of `prop` with variables substituted, or a CSS-wide keyword."""
+            if prop not in winners:
+                if prop not in INHERITED_PROPERTIES:
+                    return "initial"
+                # An inherited value keeps the rule that set it on the ancestor
+                if prop in parent.sources:
+                    style.sources[prop] = parent.sources[prop]
+                return "inherit"
+            value, source = winners[prop]
+            style.sources[prop] = source
+            if value in CSS_WIDE_KEYWORDS:
+                return value
+            resolved = substitute_variables(value, style.custom)
+            # A reference to an undefined variable makes the declaration invalid at computed-value time
+            return "unset" if resolved is None else resolved.strip().lower()
+
+        def keyword(prop, initial, inherited):
+            value = specified(prop)
+            if value == "inherit" or (value in ("unset", "revert", "revert-layer") and prop in INHERITED_PROPERTIES):
+                return inherited
+            if value in CSS_WIDE_KEYWORDS:
+                return initial
+            return value
+
+        style.display = keyword("display", "inline", parent.display)
+        style.visibility = keyword("visibility", "visible", parent.visibility)
+        style.position = keyword("position", "static", parent.position)
+
+        opacity = keyword("opacity", "1", str(parent.opacity))
+        try:
+            style.opacity = float(opacity[:-1]) / 100 if opacity.endswith("%") else float(opacity)
+        except ValueError:
+            style.opacity = 1.0
+            style.unresolved.append(("opacity", opacity))
+
+        font_size = keyword("font-size", "medium", parent.font_size)
+        if isinstance(font_size, float):
+            style.font_size = font_size
+        elif font_size in FONT_SIZE_KEYWORDS:
+            style.font_size = FONT_SIZE_KEYWORDS[font_size]
+        elif font_size in ("smaller", "larger"):
+            style.font_size = parent.font_size / 1.2 if font_size == "smaller" else parent.font_size * 1.2
+        else:
+            size = length_px(font_size, parent.font_size, self.root_font_size, parent.font_size)
+            if size is None:
+                style.font_size = parent.font_size
+                style.unresolved.append(("font-size", font_size))
+            else:
+                style.font_size = max(size, 0.0)
+
+        text_indent = keyword("text-indent", "0", parent.text_indent)
+        if isinstance(text_indent, float):
+            style.text_indent = text_indent
+        else:
+            # Percentages are of the containing block's width, at most the viewport's
+            indent = length_px(text_indent.split()[0], style.font_size, self.root_font_size, VIEWPORT_WIDTH)
+            if indent is None:
+                style.unresolved.append(("text-indent", text_indent))
+            style.text_indent = indent or 0.0
+
+        for prop in ("left", "top"):
+            value = keyword(prop, "auto", "auto")
+            if value == "auto":
+                setattr(style, prop, None)
+                continue
+            base = VIEWPORT_WIDTH if prop == "left" else VIEWPORT_HEIGHT
+            offset = length_px(value, style.font_size, self.root_font_size, base)
+            if offset is None:
+                style.unresolved.append((prop, value))
+            setattr(style, prop, offset)
+
+        color = keyword("color", DEFAULT_TEXT_COLOR, parent.color)
+        if isinstance(color, tuple):
+            style.color = color
+        elif color == "currentcolor":
+            style.color = parent.color
+        else:
+            style.color = parse_color(color)
+            if style.color is None:
+                style.color = parent.color
+                style.unresolved.append(("color", color))
+
+        # The background seen behind the text: the element's own opaque color, or what shows through from its parent
+        background_image = keyword("background-image", "none", "none")
+        background_color = keyword("background-color", "transparent", "transparent")
+        parsed_background = parse_color(background_color) if background_color != "currentcolor" else style.color
+        if background_image != "none":
+            style.background = UNKNOWN_BACKGROUND
+        elif parsed_background is None:
+            style.background = UNKNOWN_BACKGROUND
+        elif parsed_background[3] == 0:
+            style.background = parent.background
+        elif parsed_background[3] < 1:
+            style.background = UNKNOWN_BACKGROUND
+        else:
+            style.background = parsed_background
+
+        if element.name == "html":
+            # rem units are relative to the root element's font size
+            self.root_font_size = style.font_size
+        return style, conditional
+
+
+def hiding_methods(style):
+    """Return the ways a computed style hides an element's text, as (method, properties) pairs."""
+    methods = []
+    if style.display == "none":
+        methods.append(("display: none", ("display",)))
+    if style.visibility in ("hidden", "collapse"):
+        methods.append((f"visibility: {style.visibility}", ("visibility",)))
+    if style.opacity <= 0:
+        methods.append(("opacity: 0", ("opacity",)))
+    if style.font_size <= 0:
+        methods.append(("font-size: 0", ("font-size",)))
+    if style.text_indent <= -OFFSCREEN_DISTANCE:
+        methods.append(("negative text-indent", ("text-indent",)))
+    if style.position in ("absolute", "fixed"):
+        for prop in ("left", "top"):
+            offset = getattr(style, prop)
+            if offset is not None and offset <= -OFFSCREEN_DISTANCE:
+                methods.append(("positioned off-screen", ("position", prop)))
+                break
+    if style.color[3] == 0:
+        methods.append(("transparent text color", ("color",)))
+    elif style.background != UNKNOWN_BACKGROUND and style.color == style.background:
+        methods.append((f"text color matches background: {format_color(style.color)}", ("color", "background-color")))
+    return methods
+
+
+def has_own_text(element):
+    """Whether an element has non-blank text of its own, outside of its child elements and comments."""
+    return any(type(child) is NavigableString and child.strip() for child in element.children)
+
+
+def reveals_text(resolver, element, style):
+    """Whether a descendant of an element hidden by overridable properties overrides them and shows its text."""
+    stack = [(child, style) for child in element.find_all(True, recursive=False)]
+    while stack:
+        child, parent = stack.pop()
+        if child.name in UNRENDERED_TAGS:
+            continue
+        child_style, _ = resolver.compute(child, parent)
+        methods = hiding_methods(child_style)
+        if not methods and has_own_text(child):
+            return True
+        if all(OVERRIDABLE_PROPERTIES.issuperset(props) for _, props in methods):
+            stack.extend((grandchild, child_style) for grandchild in child.find_all(True, recursive=False))
+    return False
+
+
+def iter_hidden_elements(document, index, root_font_size=ROOT_FONT_SIZE):
+    """
+    Walk the rendered elements of a parsed document in order, computing their styles.
+    Yields ("hidden", element, methods, sources) for each outermost hidden element, whose subtree is not visited,
+    and ("uncertain", element, reason, None) for visible elements whose visibility cannot be decided statically.
+    An element hidden only by properties a descendant overrides, as with visibility: visible inside visibility: hidden,
+    is walked into instead, and yielded itself only for its own text.
+    """
+    resolver = StyleResolver(index, root_font_size)
+    root = ComputedStyle.root()
+    stack = [(child, root) for child in reversed(document.find_all(True, recursive=False))]
+
+    while stack:
+        element, parent = stack.pop()
+        if element.name in UNRENDERED_TAGS:
+            continue
+
+        style, conditional = resolver.compute(element, parent)
+        methods = hiding_methods(style)
+        if methods:
+            overridable = all(OVERRIDABLE_PROPERTIES.issuperset(props) for _, props in methods)
+            revealed = overridable and reveals_text(resolver, element, style)
+            if not revealed or has_own_text(element):
+                # The background behind matching text may come from an ancestor, and then has no source here
+                sources = list(
+                    dict.fromkeys(
+                        style.sources[prop] for _, props in methods for prop in props if prop in style.sources
+                    )
+                )
+                yield "hidden", element, [method for method, _ in methods], sources
+            if not revealed:
+                continue
+        else:
+            for prop, value in style.unresolved:
+                yield "uncertain", element, f"unresolved {prop}: {value}", None
+            for entry in conditional:
+                if any(declaration_may_hide(prop, value) for prop, value, _ in entry.declarations):
+                    yield "uncertain", element, f"conditional rule {entry.selector} under {entry.media}", None
+
+        stack.extend((child, style) for child in reversed(element.find_all(True, recursive=False)))
@@ -4,180 +4,305 @@ Hidden Text Detection Script
 Detects text or links that are visually hidden but present in HTML for SEO manipulation.
 """
 
+import os
 import sys
 import json
 import argparse
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
 from bs4 import BeautifulSoup
 import re
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urljoin, urlsplit
+
+from css_cascade import StyleIndex, iter_hidden_elements, media_applies
+
+# Per-phase timings and counters come from the sibling metrics script directory, put first on the path so that
+# no installed "metrics" module is picked up instead
+METRICS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "metrics")
+if METRICS_DIR not in sys.path:
+    sys.path.insert(0, METRICS_DIR)
+from metrics import EXPORT_FORMATS, NULL_METRICS, Metrics, add_timings, export_metrics  # noqa: E402
+
+
+# Warm Chrome drivers and page readiness come from the sibling webdriver_pool script directory; without it only
+# HTML content can be analyzed
+WEBDRIVER_POOL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "webdriver_pool")
+if WEBDRIVER_POOL_DIR not in sys.path:
+    sys.path.insert(0, WEBDRIVER_POOL_DIR)
+try:
+    from webdriver_pool import MEMORY_LIMIT_SUPPORTED, READY_TIMEOUT, DriverPool, wait_for_page_ready  # noqa: E402
+except ImportError:
+    READY_TIMEOUT = 15
+    MEMORY_LIMIT_SUPPORTED = False
+    DriverPool = wait_for_page_ready = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def setup_driver():
-    """Setup headless Chrome driver."""
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
+def read_urls_file(path):
+    """Read URLs from a file, one per line, skipping blank lines and # comments."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
 
-    try:
-        driver = webdriver.Chrome(options=chrome_options)
-        return driver
-    except Exception as e:
-        logger.error(f"Failed to setup Chrome driver: {e}")
-        return None
+
+# Collects the computed styles the hiding rules need for every candidate element in a single
+# WebDriver round-trip. Candidates match the XPaths //*[text()] and //*[.//a]; each row records
+# the index of its nearest candidate ancestor so hidden subtrees can be pruned in Python.
+VISIBILITY_SCRIPT = """
+var linkAncestors = new Set();
+var links = document.getElementsByTagName("a");
+for (var i = 0; i < links.length; i++) {
+    for (var node = links[i].parentElement; node && !linkAncestors.has(node); node = node.parentElement) {
+        linkAncestors.add(node);
+    }
+}
+
+function hasTextChild(el) {
+    for (var child = el.firstChild; child; child = child.nextSibling) {
+        if (child.nodeType === Node.TEXT_NODE) return true;
+    }
+    return false;
+}
+
+var candidates = [];
+var nearestCandidate = new Map();
+var rows = [];
+var all = document.getElementsByTagName("*");
+for (var j = 0; j < all.length; j++) {
+    var el = all[j];
+    var parentIndex = el.parentElement && nearestCandidate.has(el.parentElement)
+        ? nearestCandidate.get(el.parentElement)
+        : -1;
+
+    if (!linkAncestors.has(el) && !hasTextChild(el)) {
+        nearestCandidate.set(el, parentIndex);
+        continue;
+    }
+    nearestCandidate.set(el, candidates.length);
+    candidates.push(el);
+
+    var style = window.getComputedStyle(el);
+    var rect = el.getBoundingClientRect();
+    var displayed = el.checkVisibility
+        ? el.checkVisibility({opacityProperty: true, visibilityProperty: true})
+        : el.getClientRects().length > 0;
+
+    rows.push([
+        parentIndex,
+        el.tagName.toLowerCase(),
+        el.getAttribute("id") || "",
+        el.getAttribute("class") || "",
+        displayed,
+        style.display,
+        style.visibility,
+        style.opacity,
+        rect.width,
+        rect.height,
+        rect.left + window.scrollX,
+        rect.top + window.scrollY,
+        style.textIndent,
+        style.fontSize,
+        style.color,
+        style.backgroundColor
+    ]);
+}
+window.__seoHiddenTextCandidates = candidates;
+return JSON.stringify(rows);
+"""
+
+CANDIDATE_FIELDS = (
+    "parent",
+    "tag",
+    "id",
+    "class",
+    "displayed",
+    "display",
+    "visibility",
+    "opacity",
+    "width",
+    "height",
+    "x",
+    "y",
+    "text_indent",
+    "font_size",
+    "color",
+    "background_color",
+)
+
+# Reads text and link details for the hidden roots found by the Python rules. Roots never
+# overlap, so the total work is bounded by the size of the DOM.
+HIDDEN_CONTENT_SCRIPT = """
+var candidates = window.__seoHiddenTextCandidates || [];
+return JSON.stringify(arguments[0].map(function (index) {
+    var el = candidates[index];
+    var text = (el.textContent || "").replace(/\\s+/g, " ").trim();
+    return [text.slice(0, 200), text.length, text ? text.split(" ").length : 0, el.getElementsByTagName("a").length];
+}));
+"""
+
+CONTENT_FIELDS = ("text_content", "text_length", "word_count", "link_count")
 
 
-def is_element_hidden(driver, element):
+def collect_candidate_elements(driver):
+    """Return visibility details for every candidate element, gathered in one script execution."""
+    payload = driver.execute_script(VISIBILITY_SCRIPT)
+    return [dict(zip(CANDIDATE_FIELDS, row)) for row in json.loads(payload)]
+
+
+def collect_hidden_content(driver, indexes):
+    """Return text and link details for the candidates at `indexes`, gathered in one script execution."""
+    if not indexes:
+        return []
+    payload = driver.execute_script(HIDDEN_CONTENT_SCRIPT, indexes)
+    return [dict(zip(CONTENT_FIELDS, row)) for row in json.loads(payload)]
+
+
+def find_hidden_roots(candidates):
     """
-    Check if an element is visually hidden using various techniques.
-    Returns (is_hidden, reason) tuple.
+    Apply the hiding rules in document order, skipping descendants of elements already known to be hidden.
+    Returns a list of (index, reason) tuples for the outermost hidden elements.
     """
-    try:
-        # Get computed styles
-        is_displayed = element.is_displayed()
-
-        # Check CSS properties that indicate hiding
-        css_checks = [
-            ("display", "none"),
-            ("visibility", "hidden"),
-            ("opacity", "0"),
-        ]
-
-        for prop, hidden_value in css_checks:
-            value = element.value_of_css_property(prop)
-            if value == hidden_value:
-                return True, f"{prop}: {hidden_value}"
-
-        # Check for zero dimensions
-        size = element.size
-        if size["width"] == 0 or size["height"] == 0:
-            return True, f"zero dimensions: {size['width']}x{size['height']}"
-
-        # Check for positioning off-screen
-        location = element.location
-        if location["x"] < -9999 or location["y"] < -9999:
-            return True, f"positioned off-screen: x={location['x']}, y={location['y']}"
-
-        # Check text-indent hiding
-        text_indent = element.value_of_css_property("text-indent")
-        if text_indent and ("-9999" in text_indent or "-999" in text_indent):
-            return True, f"negative text-indent: {text_indent}"
-
-        # Check font-size hiding
-        font_size = element.value_of_css_property("font-size")
-        if font_size and (font_size == "0px" or font_size == "0"):
-            return True, f"zero font-size: {font_size}"
-
-        # Check color hiding (text same color as background)
-        color = element.value_of_css_property("color")
-        bg_color = element.value_of_css_property("background-color")
-        if color and bg_color and color == bg_color and color != "rgba(0, 0, 0, 0)":
-            return True, f"text color matches background: {color}"
-
-        # Check if element is not displayed according to Selenium
-        if not is_displayed:
-            return True, "element not displayed (Selenium check)"
-
-        return False, None
+    covered = [False] * len(candidates)
+    roots = []
 
-    except Exception as e:
-        logger.warning(f"Error checking element visibility: {e}")
-        return False, None
+    for index, element in enumerate(candidates):
+        parent = element["parent"]
+        if parent >= 0 and covered[parent]:
+            covered[index] = True
+            continue
 
+        is_hidden, reason = is_element_hidden(element)
+        if is_hidden:
+            covered[index] = True
+            roots.append((index, reason))
 
-def extract_text_content(element):
-    """Extract meaningful text content from element."""
-    try:
-        text = element.get_attribute("textContent") or ""
-        text = re.sub(r"\s+", " ", text).strip()
-        return text
-    except:
-        return ""
+    return roots
 
 
-def has_links(element):
-    """Check if element contains anchor tags."""
-    try:
-        links = element.find_elements(By.TAG_NAME, "a")
-        return len(links) > 0, len(links)
-    except:
-        return False, 0
+def normalize_css_color(color):
+    """Normalize computed rgb() colors to the rgba() form Selenium reports."""
+    match = re.fullmatch(r"rgb\((\d+), (\d+), (\d+)\)", color or "")
+    if match:
+        return f"rgba({match.group(1)}, {match.group(2)}, {match.group(3)}, 1)"
+    return color
 
 
-def analyze_url_for_hidden_text(url):
-    """Analyze a URL for hidden text detection."""
-    driver = setup_driver()
+def is_element_hidden(element):
+    """
+    Check if a candidate element is visually hidden using various techniques.
+    Returns (is_hidden, reason) tuple.
+    """
+    # Check CSS properties that indicate hiding
+    css_checks = [
+        ("display", "none"),
+        ("visibility", "hidden"),
+        ("opacity", "0"),
+    ]
+
+    for prop, hidden_value in css_checks:
+        if element[prop] == hidden_value:
+            return True, f"{prop}: {hidden_value}"
+
+    # Check for zero dimensions
+    if element["width"] == 0 or element["height"] == 0:
+        return True, f"zero dimensions: {element['width']}x{element['height']}"
+
+    # Check for positioning off-screen
+    if element["x"] < -9999 or element["y"] < -9999:
+        return True, f"positioned off-screen: x={element['x']}, y={element['y']}"
+
+    # Check text-indent hiding
+    text_indent = element["text_indent"]
+    if text_indent and ("-9999" in text_indent or "-999" in text_indent):
+        return True, f"negative text-indent: {text_indent}"
+
+    # Check font-size hiding
+    font_size = element["font_size"]
+    if font_size and (font_size == "0px" or font_size == "0"):
+        return True, f"zero font-size: {font_size}"
+
+    # Check color hiding (text same color as background)
+    color = normalize_css_color(element["color"])
+    bg_color = normalize_css_color(element["background_color"])
+    if color and bg_color and color == bg_color and color != "rgba(0, 0, 0, 0)":
+        return True, f"text color matches background: {color}"
+
+    # Check if element is not rendered by the browser
+    if not element["displayed"]:
+        return True, "element not displayed (browser check)"
+
+    return False, None
+
+
+def analyze_url_for_hidden_text(url, pool=None, ready_timeout=READY_TIMEOUT, metrics=NULL_METRICS):
+    """Analyze a URL for hidden text detection, borrowing a driver from `pool` when one is given."""
+    own_pool = pool is None
+    if own_pool:
+        pool = DriverPool(size=1)
+
+    with metrics.span("driver_acquire"):
+        driver = pool.acquire(metrics)
     if not driver:
         return {"status": "error", "message": "Failed to setup browser driver"}
 
     hidden_elements = []
+    broken = False
 
     try:
         # Load the page
-        driver.get(url)
-        time.sleep(3)  # Wait for page to fully load
-
-        # Find all text-containing elements
-        text_elements = driver.find_elements(By.XPATH, "//*[text()]")
-
-        # Also check for elements that might contain links
-        link_containers = driver.find_elements(By.XPATH, "//*[.//a]")
-
-        # Combine and deduplicate
-        all_elements = list(set(text_elements + link_containers))
-
-        for element in all_elements:
-            try:
-                # Check if element is hidden
-                is_hidden, reason = is_element_hidden(driver, element)
-
-                if is_hidden:
-                    # Extract text content
-                    text_content = extract_text_content(element)
-                    has_link, link_count = has_links(element)
-
-                    # Only flag if there's meaningful content
-                    if (text_content and len(text_content.split()) >= 2) or has_link:
-                        tag_name = element.tag_name
-
-                        # Get element attributes for identification
-                        element_id = element.get_attribute("id") or ""
-                        element_class = element.get_attribute("class") or ""
-
-                        hidden_elements.append(
-                            {
-                                "tag": tag_name,
-                                "id": element_id,
-                                "class": element_class,
-                                "text_content": text_content[:200],  # Truncate long text
-                                "text_length": len(text_content),
-                                "has_links": has_link,
-                                "link_count": link_count,
-                                "hiding_method": reason,
-                                "selector": f"{tag_name}{'#' + element_id if element_id else ''}{'.' + element_class.replace(' ', '.') if element_class else ''}",
-                            }
-                        )
-
-            except Exception as e:
-                logger.warning(f"Error processing element: {e}")
-                continue
+        started_at = time.monotonic()
+        with metrics.span("page_load"):
+            driver.get(url)
+        metrics.count("webdriver_calls")
+        with metrics.span("wait_ready"):
+            page_load = wait_for_page_ready(driver, started_at, ready_timeout, metrics=metrics)
+
+        with metrics.span("collect_candidates"):
+            candidates = collect_candidate_elements(driver)
+        metrics.count("webdriver_calls")
+        metrics.count("elements_inspected", len(candidates))
+        with metrics.span("hiding_rules"):
+            roots = find_hidden_roots(candidates)
+        with metrics.span("collect_content"):
+            contents = collect_hidden_content(driver, [index for index, _ in roots])
+        metrics.count("webdriver_calls", 1 if roots else 0)
+
+        for (index, reason), content in zip(roots, contents):
+            element = candidates[index]
+            has_link = content["link_count"] > 0
+
+            # Only flag if there's meaningful content
+            if (content["text_content"] and content["word_count"] >= 2) or has_link:
+                tag_name = element["tag"]
+                element_id = element["id"]
+                element_class = element["class"]
+
+                hidden_elements.append(
+                    {
+                        "tag": tag_name,
+                        "id": element_id,
+                        "class": element_class,
+                        "text_content": content["text_content"],
+                        "text_length": content["text_length"],
+                        "has_links": has_link,
+                        "link_count": content["link_count"],
+                        "hiding_method": reason,
+                        "selector": f"{tag_name}{'#' + element_id if element_id else ''}{'.' + element_class.replace(' ', '.') if element_class else ''}",
+                    }
+                )
 
     except Exception as e:
         logger.error(f"Error analyzing URL {url}: {e}")
-        return {"status": "error", "message": f"Failed to analyze URL: {str(e)}"}
+        broken = True
+        return {"status": "error", "message": f"Failed to analyze URL: {str(e)}", "url": url}
 
     finally:
-        driver.quit()
+        pool.release(driver, broken=broken)
+        if own_pool:
+            pool.close()
 
     # Determine pass/fail
     has_hidden_text = len(hidden_elements) > 0
@@ -186,6 +311,7 @@ def analyze_url_for_hidden_text(url):
         "status": "success",
         "url": url,
         "passed": not has_hidden_text,
+        "page_load": page_load,
         "hidden_elements_count": len(hidden_elements),
         "hidden_elements": hidden_elements,
         "evidence": {
@@ -208,18 +334,177 @@ def analyze_url_for_hidden_text(url):
     return result
 
 
-def analyze_html_for_hidden_text(html_content):
+def analyze_urls_for_hidden_text(
+    urls,
+    pool_size=2,
+    recycle_after=50,
+    max_memory_mb=None,
+    ready_timeout=READY_TIMEOUT,
+    static_first=False,
+    metrics=NULL_METRICS,
+):
+    """
+    Analyze many URLs for hidden text through a shared pool of warm drivers.
+    With `static_first`, drivers are only started for the pages static analysis cannot decide.
+    Each result gets the timings of its own page, which add up in `metrics`.
+    """
+    pool = DriverPool(size=pool_size, recycle_after=recycle_after, max_memory_mb=max_memory_mb)
+    analyze_url = analyze_url_static_first if static_first else analyze_url_for_hidden_text
+
+    def analyze(url):
+        page_metrics = metrics.child()
+        return add_timings(analyze_url(url, pool, ready_timeout, metrics=page_metrics), page_metrics, metrics)
+
+    try:
+        with ThreadPoolExecutor(max_workers=pool.size) as executor:
+            results = list(executor.map(analyze, urls))
+    finally:
+        pool.close()
+
+    failed = [r for r in results if not r.get("passed", False)]
+
+    summary = {
+        "status": "success",
+        "passed": not failed,
+        "urls_count": len(results),
+        "failed_count": len(failed),
+        "results": results,
+        "message": f"{len(failed)} of {len(results)} URL(s) failed hidden text analysis.",
+    }
+    if static_first:
+        summary["rendered_count"] = len([r for r in results if r.get("analysis") == "rendered"])
+    return summary
+
+
+# Static analysis: stylesheet loading and limits
+MAX_IMPORT_DEPTH = 4
+MAX_STYLESHEET_BYTES = 2 * 1024 * 1024
+MAX_RENDERING_REASONS = 20
+# A page with scripts and less static text than this may build its content in the browser
+MIN_STATIC_WORDS = 50
+STATIC_FETCH_TIMEOUT = 30
+STATIC_FETCH_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+
+def local_stylesheet_loader(reference):
+    """Read a stylesheet referenced by a local path or file: URL; remote stylesheets are not loaded."""
+    parts = urlsplit(reference)
+    if parts.scheme not in ("", "file") or parts.netloc:
+        return None
+    try:
+        with open(unquote(parts.path), "r", encoding="utf-8", errors="replace") as f:
+            return f.read(MAX_STYLESHEET_BYTES)
+    except OSError:
+        return None
+
+
+def http_stylesheet_loader(session, timeout=STATIC_FETCH_TIMEOUT, metrics=NULL_METRICS):
+    """Return a loader fetching http(s) stylesheets through a requests session."""
+
+    def load(reference):
+        if urlsplit(reference).scheme not in ("http", "https"):
+            return None
+        try:
+            with metrics.span("fetch_stylesheet"):
+                response = session.get(reference, timeout=timeout)
+        except Exception as e:
+            logger.warning(f"Error fetching stylesheet {reference}: {e}")
+            return None
+        metrics.count("requests")
+        metrics.count("bytes_fetched", len(response.content))
+        if response.status_code != 200:
+            return None
+        return response.text[:MAX_STYLESHEET_BYTES]
+
+    return load
+
+
+def load_stylesheets(soup, index, stylesheet_loader=None, base_url=None):
+    """
+    Add a document's <style> blocks and linked stylesheets to a StyleIndex in document order.
+    Linked and @imported stylesheets are read with `stylesheet_loader(reference)`, references resolved against
+    `base_url`. Returns the counts of embedded and linked stylesheets and the references that could not be loaded.
+    """
+    stats = {"embedded": 0, "linked": 0, "unresolved": []}
+    seen = set()
+    base = soup.find("base", href=True)
+    if base:
+        base_url = urljoin(base_url or "", base["href"])
+
+    def add_linked(reference, media, depth):
+        if reference in seen:
+            return
+        seen.add(reference)
+        text = stylesheet_loader(reference) if stylesheet_loader else None
+        if text is None:
+            stats["unresolved"].append(reference)
+            return
+        stats["linked"] += 1
+        index.add_stylesheet(text, media, make_import_loader(reference, depth + 1))
+
+    def make_import_loader(sheet_url, depth):
+        if depth > MAX_IMPORT_DEPTH:
+            return None
+        return lambda href, media: add_linked(urljoin(sheet_url or "", href), media, depth)
+
+    for element in soup.find_all(["style", "link"]):
+        if element.name == "style":
+            stats["embedded"] += 1
+            index.add_stylesheet(element.get_text(), element.get("media"), make_import_loader(base_url, 1))
+            continue
+
+        rel = [value.lower() for value in element.get("rel") or []]
+        if "stylesheet" not in rel or "alternate" in rel or not element.get("href") or element.has_attr("disabled"):
+            continue
+        if media_applies(element.get("media")) is not False:
+            add_linked(urljoin(base_url or "", element["href"]), element.get("media"), 0)
+
+    return stats
+
+
+def describe_element(element):
+    """Return a short CSS-like description of an element for messages."""
+    classes = element.get("class") or []
+    element_id = element.get("id")
+    return f"{element.name}{'#' + element_id if element_id else ''}{''.join('.' + c for c in classes)}"
+
+
+def analyze_html_for_hidden_text(html_content, stylesheet_loader=None, base_url=None, metrics=NULL_METRICS):
     """Analyze HTML content for hidden text patterns using static analysis."""
+    try:
+        with metrics.span("parse"):
+            soup = BeautifulSoup(html_content, "html.parser")
+    except Exception as e:
+        logger.error(f"Error parsing HTML: {e}")
+        return {"status": "error", "message": f"Failed to analyze HTML: {str(e)}"}
+
+    return analyze_soup_for_hidden_text(soup, stylesheet_loader, base_url, metrics)
+
+
+def analyze_soup_for_hidden_text(soup, stylesheet_loader=None, base_url=None, metrics=NULL_METRICS):
+    """
+    Analyze an already parsed BeautifulSoup document for hidden text patterns using static analysis.
+    Styles are resolved from the inline styles, the <style> blocks and the stylesheets `stylesheet_loader` can
+    read. The result's `needs_rendering` is set, with the reasons, when the hidden text cannot be ruled out
+    without a browser.
+    """
     hidden_patterns = []
+    rendering_reasons = []
 
     try:
-        soup = BeautifulSoup(html_content, "html.parser")
-
-        # Check for common CSS hiding patterns in style attributes
-        elements_with_style = soup.find_all(attrs={"style": True})
+        index = StyleIndex()
+        with metrics.span("load_stylesheets"):
+            stylesheets = load_stylesheets(soup, index, stylesheet_loader, base_url)
+        for reference in stylesheets["unresolved"]:
+            rendering_reasons.append(f"stylesheet not available: {reference}")
+
+        cascade_started_at = time.perf_counter()
+        for kind, element, detail, sources in iter_hidden_elements(soup, index):
+            if kind == "uncertain" and len(rendering_reasons) >= MAX_RENDERING_REASONS:
+                continue
 
-        for element in elements_with_style:
-            style = element.get("style", "").lower()
             text_content = element.get_text(strip=True)
             has_links = bool(element.find("a"))
 
@@ -227,41 +512,45 @@ def analyze_html_for_hidden_text(html_content):
             if not text_content and not has_links:
                 continue
 
-            # Check for hiding patterns
-            hiding_methods = []
-
-            if "display:none" in style.replace(" ", ""):
-                hiding_methods.append("display: none")
-            if "visibility:hidden" in style.replace(" ", ""):
-                hiding_methods.append("visibility: hidden")
-            if "opacity:0" in style.replace(" ", ""):
-                hiding_methods.append("opacity: 0")
-            if "font-size:0" in style.replace(" ", ""):
-                hiding_methods.append("font-size: 0")
-            if re.search(r"text-indent:\s*-\d{3,}", style):
-                hiding_methods.append("negative text-indent")
-            if re.search(r"position:\s*absolute.*left:\s*-\d{3,}", style):
-                hiding_methods.append("positioned off-screen")
-
-            if hiding_methods:
-                hidden_patterns.append(
-                    {
-                        "tag": element.name,
-                        "id": element.get("id", ""),
-                        "class": element.get("class", []),
-                        "text_content": text_content[:200],
-                        "text_length": len(text_content),
-                        "has_links": has_links,
-                        "hiding_methods": hiding_methods,
-                        "style": style,
-                    }
-                )
+            if kind == "uncertain":
+                rendering_reasons.append(f"{detail} on {describe_element(element)}")
+                continue
+
+            hidden_patterns.append(
+                {
+                    "tag": element.name,
+                    "id": element.get("id", ""),
+                    "class": element.get("class", []),
+                    "text_content": text_content[:200],
+                    "text_length": len(text_content),
+                    "has_links": has_links,
+                    "hiding_methods": detail,
+                    "style": element.get("style", "").lower(),
+                    "rules": sources,
+                }
+            )
+
+        # The walk is a generator interleaved with the checks above, so it is timed as a whole
+        metrics.record("cascade", time.perf_counter() - cascade_started_at)
+        metrics.count("elements_inspected", index.elements_matched)
+        metrics.count("style_rules", index.rules)
+
+        body = soup.body or soup
+        if soup.find("script") and len(body.get_text(" ", strip=True).split()) < MIN_STATIC_WORDS:
+            rendering_reasons.append("little static text on a page with scripts, content may be built client-side")
 
     except Exception as e:
         logger.error(f"Error analyzing HTML: {e}")
         return {"status": "error", "message": f"Failed to analyze HTML: {str(e)}"}
 
     has_hidden_text = len(hidden_patterns) > 0
+    message = (
+        f"Hidden text detected in {len(hidden_patterns)} element(s)."
+        if has_hidden_text
+        else "No hidden text patterns detected."
+    )
+    if rendering_reasons:
+        message += " Static analysis is inconclusive, rendering is needed to confirm."
 
     return {
         "status": "success",
@@ -272,38 +561,144 @@ def analyze_html_for_hidden_text(html_content):
             "total_hidden_elements": len(hidden_patterns),
             "elements_with_text": len([e for e in hidden_patterns if e["text_length"] > 0]),
             "elements_with_links": len([e for e in hidden_patterns if e["has_links"]]),
+            "stylesheets": stylesheets,
+            "style_rules": index.rules,
+            "unsupported_selectors": index.unsupported_selectors,
         },
-        "message": f"Hidden text detected in {len(hidden_patterns)} element(s)."
-        if has_hidden_text
-        else "No hidden text patterns detected.",
+        "needs_rendering": bool(rendering_reasons),
+        "rendering_reasons": rendering_reasons,
+        "message": message,
     }
 
 
+def analyze_url_static_first(
+    url, pool=None, ready_timeout=READY_TIMEOUT, timeout=STATIC_FETCH_TIMEOUT, metrics=NULL_METRICS
+):
+    """
+    Analyze a URL from its HTML and stylesheets without a browser, and render it in Chrome only when the static
+    analysis is inconclusive. The result's `analysis` is "static" or "rendered".
+    """
+    # Only this path fetches pages over plain HTTP
+    import requests
+
+    try:
+        with requests.Session() as session:
+            session.headers["User-Agent"] = STATIC_FETCH_USER_AGENT
+            with metrics.span("fetch"):
+                response = session.get(url, timeout=timeout)
+            metrics.count("requests")
+            metrics.count("bytes_fetched", len(response.content))
+            response.raise_for_status()
+            with metrics.span("parse"):
+                soup = BeautifulSoup(response.text, "html.parser")
+            result = analyze_soup_for_hidden_text(
+                soup, http_stylesheet_loader(session, timeout, metrics), response.url, metrics
+            )
+    except Exception as e:
+        logger.warning(f"Static analysis of {url} failed, rendering it instead: {e}")
+        result = {"status": "error", "rendering_reasons": [f"static fetch failed: {e}"]}
+
+    if result["status"] == "success" and not result["needs_rendering"]:
+        return dict(result, url=url, analysis="static")
+
+    rendered = analyze_url_for_hidden_text(url, pool, ready_timeout, metrics)
+    rendered["analysis"] = "rendered"
+    rendered["rendering_reasons"] = result.get("rendering_reasons", [])
+    return rendered
+
+
 def main():
     parser = argparse.ArgumentParser(description="Detect hidden text in web content")
     parser.add_argument("--url", help="URL to analyze for hidden text")
+    parser.add_argument("--urls-file", help="Path to a file with one URL per line to analyze in batch")
     parser.add_argument("--html", help="HTML content to analyze")
     parser.add_argument("--html-file", help="Path to a local .html file to analyze")
     parser.add_argument("--output", help="Output file for results", default="hidden_text_results.json")
+    parser.add_argument(
+        "--static-first",
+        action="store_true",
+        help="For --url/--urls-file, analyze the fetched HTML and stylesheets first and only render inconclusive pages",
+    )
+    parser.add_argument(
+        "--pool-size", type=int, default=2, help="Number of Chrome drivers for --urls-file (default: 2)"
+    )
+    parser.add_argument(
+        "--recycle-after", type=int, default=50, help="Restart a driver after this many pages (default: 50)"
+    )
+    parser.add_argument(
+        "--max-driver-memory-mb",
+        type=int,
+        help="Restart a driver once its browser processes use more memory than this (requires psutil)",
+    )
+    parser.add_argument(
+        "--ready-timeout",
+        type=float,
+        default=READY_TIMEOUT,
+        help=f"Maximum seconds to wait for a page to become ready (default: {READY_TIMEOUT})",
+    )
+    parser.add_argument(
+        "--timings", action="store_true", help="Add per-phase durations and counts to the results under timings"
+    )
+    parser.add_argument("--metrics-file", help="Export the timings of the run to this file (implies --timings)")
+    parser.add_argument(
+        "--metrics-format",
+        choices=EXPORT_FORMATS,
+        default="jsonl",
+        help="Format of --metrics-file: jsonl appends a record per run, prometheus replaces the file (default: jsonl)",
+    )
 
     args = parser.parse_args()
 
-    if args.url:
-        result = analyze_url_for_hidden_text(args.url)
+    if (args.url or args.urls_file) and DriverPool is None:
+        print("Error: --url and --urls-file require the webdriver_pool script directory next to this one")
+        sys.exit(1)
+
+    if args.max_driver_memory_mb and not MEMORY_LIMIT_SUPPORTED:
+        print("Error: --max-driver-memory-mb requires psutil")
+        sys.exit(1)
+
+    metrics = Metrics() if args.timings or args.metrics_file else NULL_METRICS
+
+    if args.url and args.static_first:
+        result = analyze_url_static_first(args.url, ready_timeout=args.ready_timeout, metrics=metrics)
+    elif args.url:
+        result = analyze_url_for_hidden_text(args.url, ready_timeout=args.ready_timeout, metrics=metrics)
+    elif args.urls_file:
+        try:
+            urls = read_urls_file(args.urls_file)
+        except Exception as e:
+            print(f"Error reading URLs file: {e}")
+            sys.exit(1)
+        result = analyze_urls_for_hidden_text(
+            urls,
+            args.pool_size,
+            args.recycle_after,
+            args.max_driver_memory_mb,
+            args.ready_timeout,
+            args.static_first,
+            metrics,
+        )
     elif args.html:
-        result = analyze_html_for_hidden_text(args.html)
+        # Stylesheets linked from the HTML resolve against the current directory
+        result = analyze_html_for_hidden_text(
+            args.html, local_stylesheet_loader, os.path.join(os.getcwd(), ""), metrics
+        )
     elif args.html_file:
         try:
             with open(args.html_file, "r", encoding="utf-8") as f:
                 html_content = f.read()
-            result = analyze_html_for_hidden_text(html_content)
+            result = analyze_html_for_hidden_text(
+                html_content, local_stylesheet_loader, os.path.abspath(args.html_file), metrics
+            )
         except Exception as e:
             print(f"Error reading HTML file: {e}")
             sys.exit(1)
     else:
-        print("Error: Must provide either --url, --html, or --html-file parameter")
+        print("Error: Must provide either --url, --urls-file, --html, or --html-file parameter")
         sys.exit(1)
 
+    add_timings(result, metrics)
+
     # Output results
     print(json.dumps(result, indent=2))
 
@@ -312,6 +707,13 @@ def main():
         with open(args.output, "w") as f:
             json.dump(result, f, indent=2)
 
+    if args.metrics_file:
+        try:
+            export_metrics(result["timings"], args.metrics_file, args.metrics_format, {"detector": "hidden_text"})
+        except OSError as e:
+            print(f"Error writing metrics file: {e}")
+            sys.exit(1)
+
     # Exit with appropriate code
     sys.exit(0 if result.get("passed", False) else 1)
 
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP Cache
+On-disk cache of GET responses keyed on URL and user agent, used by the detector scripts through a requests
+transport adapter. Cached responses are revalidated with conditional requests, so repeated audits of mostly
+unchanged sites come back as 304s, and an offline mode replays the cache without touching the network.
+"""
+
+import io
+import sys
+import json
+import time
+import zlib
+import sqlite3
+import argparse
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+DEFAULT_MAX_SIZE_MB = 512
+# Responses worth replaying: successes, redirects and definitive client errors. 304 is never stored itself.
+CACHEABLE_CODES = {200, 203, 204, 300, 301, 302, 303, 307, 308, 404, 410}
+# Headers describing the transfer rather than the content, dropped because bodies are stored decoded
+TRANSFER_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "connection", "keep-alive"}
+CONDITIONAL_HEADERS = ("If-None-Match", "If-Modified-Since")
+# Evicting down to this share of the size limit leaves room for new entries before the next eviction
+EVICT_TO = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT NOT NULL,
+    user_agent TEXT NOT NULL,
+    status_code INTEGER NOT NULL,
+    reason TEXT,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    UNIQUE (url, user_agent)
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+class OfflineCacheMiss(requests.exceptions.ConnectionError):
+    """Raised in offline mode for a request the cache has no response for."""
+
+
+class HttpCache:
+    """
+    SQLite store of compressed GET responses keyed on (URL, user agent), bounded to `max_size_mb` of compressed
+    bodies by evicting the least recently used responses. With `offline` set, cached responses are replayed
+    as they are and requests missing from the cache fail instead of reaching the network.
+    """
+
+    def __init__(self, path, max_size_mb=DEFAULT_MAX_SIZE_MB, offline=False):
+        self.path = path
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self.offline = offline
+        self.counters = {"hits": 0, "revalidated": 0, "stored": 0, "misses": 0, "bypassed": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        # Every session of a run shares one connection, the lock serializes the worker threads on it
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def close(self):
+        """Close the underlying database connection."""
+        self._conn.close()
+
+    def count(self, counter):
+        """Increment one of the cache counters."""
+        with self._lock:
+            self.counters[counter] += 1
+
+    def get(self, url, user_agent):
+        """Return the cached response for (url, user_agent) as a dict, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status_code, reason, headers, body, etag, last_modified FROM responses "
+                "WHERE url = ? AND user_agent = ?",
+                (url, user_agent),
+            ).fetchone()
+        if row is None:
+            return None
+
+        status_code, reason, headers, body, etag, last_modified = row
+        return {
+            "status_code": status_code,
+            "reason": reason,
+            "headers": json.loads(headers),
+            "body": zlib.decompress(body),
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+
+    def touch(self, url, user_agent):
+        """Mark a cached response as just used, for least-recently-used eviction."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE responses SET last_used = ? WHERE url = ? AND user_agent = ?", (time.time(), url, user_agent)
+            )
+
+    def put(self, url, user_agent, response):
+        """Store a requests Response for (url, user_agent), evicting old responses beyond the size limit."""
+        headers = {name: value for name, value in response.headers.items() if name.lower() not in TRANSFER_HEADERS}
+        body = zlib.compress(response.content)
+        size = len(body)
+        if size > self.max_size:
+            return
+
+        now = time.time()
+        with self._lock, self._conn:
+            previous = self._conn.execute(
+                "SELECT size FROM responses WHERE url = ? AND user_agent = ?", (url, user_agent)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (url, user_agent, status_code, reason, headers, body, etag, "
+                "last_modified, size, stored_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    user_agent,
+                    response.status_code,
+                    response.reason,
+                    json.dumps(headers),
+                    body,
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    size,
+                    now,
+                    now,
+                ),
+            )
+            self._size += size - (previous[0] if previous else 0)
+            self.counters["stored"] += 1
+            if self._size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        """Drop least recently used responses until the cache is back under its size limit."""
+        target = self.max_size * EVICT_TO
+        while self._size > target:
+            rows = self._conn.execute("SELECT rowid, size FROM responses ORDER BY last_used LIMIT 100").fetchall()
+            if not rows:
+                break
+
+            evicted = []
+            for rowid, size in rows:
+                evicted.append((rowid,))
+                self._size -= size
+                if self._size <= target:
+                    break
+            self._conn.executemany("DELETE FROM responses WHERE rowid = ?", evicted)
+            self.counters["evicted"] += len(evicted)
+
+    def trim(self):
+        """Evict least recently used responses if the cache is over its size limit."""
+        with self._lock, self._conn:
+            if self._size > self.max_size:
+                self._evict()
+
+    def clear(self):
+        """Remove every cached response."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+            self._size = 0
+        self._conn.execute("VACUUM")
+
+    def stats(self):
+        """Return the cache counters, entry count and stored size for reporting."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return dict(self.counters, entries=entries, size_mb=round(self._size / 1024 / 1024, 2))
+
+
+def cached_response(request, entry, adapter):
+    """Build a requests Response for `request` from a cached entry."""
+    response = requests.Response()
+    response.status_code = entry["status_code"]
+    response.reason = entry["reason"]
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    response._content = entry["body"]
+    response.raw = io.BytesIO(entry["body"])
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    response.connection = adapter
+    return response
+
+
+class CachingAdapter(HTTPAdapter):
+    """
+    Transport adapter that serves GET requests through an HttpCache.
+    A cached response is revalidated with If-None-Match / If-Modified-Since and returned from the cache on 304.
+    Requests that already carry their own conditional headers, and streamed requests whose body the caller reads
+    partially, go straight to the network. Each response gets a `cache_status` attribute: hit (offline replay),
+    revalidated, stored, miss (not cacheable) or bypassed.
+    """
+
+    def __init__(self, cache, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = cache
+
+    def send(self, request, stream=False, **kwargs):
+        user_agent = request.headers.get("User-Agent", "")
+        caller_conditional = any(name in request.headers for name in CONDITIONAL_HEADERS)
+        if request.method != "GET" or (caller_conditional and not self.cache.offline):
+            return self._bypass(request, stream, **kwargs)
+
+        entry = self.cache.get(request.url, user_agent)
+
+        if self.cache.offline:
+            if entry is None:
+                self.cache.count("misses")
+                raise OfflineCacheMiss(f"Offline mode: no cached response for {request.url}", request=request)
+            self.cache.count("hits")
+            self.cache.touch(request.url, user_agent)
+            response = cached_response(request, entry, self)
+            response.cache_status = "hit"
+            return response
+
+        if stream:
+            return self._bypass(request, stream, **kwargs)
+
+        # Revalidate on a copy, requests derives the next hop of a redirect from the original request
+        conditional = request
+        if entry is not None and (entry["etag"] or entry["last_modified"]):
+            conditional = request.copy()
+            if entry["etag"]:
+                conditional.headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                conditional.headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = super().send(conditional, stream=stream, **kwargs)
+
+        if entry is not None and response.status_code == 304:
+            response.close()
+            self.cache.count("revalidated")
+            self.cache.touch(request.url, user_agent)
+            response = cached_response(request, entry, self)
+            response.cache_status = "revalidated"
+            return response
+
+        no_store = "no-store" in response.headers.get("Cache-Control", "").lower()
+        if response.status_code in CACHEABLE_CODES and not no_store:
+            self.cache.put(request.url, user_agent, response)
+            response.cache_status = "stored"
+        else:
+            self.cache.count("misses")
+            response.cache_status = "miss"
+        return response
+
+    def _bypass(self, request, stream, **kwargs):
+        self.cache.count("bypassed")
+        response = super().send(request, stream=stream, **kwargs)
+        response.cache_status = "bypassed"
+        return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear a shared HTTP cache")
+    parser.add_argument("cache", help="Path to the cache file")
+    parser.add_argument("--clear", action="store_true", help="Remove every cached response")
+    parser.add_argument(
+        "--max-size-mb",
+        type=float,
+        help="Evict least recently used responses until the cache fits in this many MB of compressed bodies",
+    )
+
+    args = parser.parse_args()
+
+    cache = HttpCache(args.cache, args.max_size_mb or DEFAULT_MAX_SIZE_MB)
+    try:
+        if args.clear:
+            cache.clear()
+        elif args.max_size_mb is not None:
+            cache.trim()
+        print(json.dumps(cache.stats(), indent=2))
+    finally:
+        cache.close()
+
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
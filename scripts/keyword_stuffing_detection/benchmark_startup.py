@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Benchmark the startup cost of the static HTML path of the detector scripts.
+Each module is imported in fresh interpreters, timed against importing the HTML parser stack (bs4 and lxml) alone,
+and checked for browser modules; the slowest of its imports are listed from `python -X importtime`. A full
+`--html-file` run is timed against an empty interpreter. Exits non-zero when a module misses the target.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SCRIPTS = [
+    os.path.join(SCRIPTS_DIR, "keyword_stuffing_detection", "keyword_stuffing_detection.py"),
+    os.path.join(SCRIPTS_DIR, "hidden_text_detection", "hidden_text_detection.py"),
+]
+DEFAULT_REPEATS = 9
+# Import time a detector may add on top of the parser stack it cannot do without
+DEFAULT_TARGET_MS = 25.0
+# Top-level packages of the browser stack, none of which the static path may import
+BROWSER_PACKAGES = {"selenium", "webdriver_manager", "websocket", "trio", "trio_websocket", "urllib3"}
+PARSER_STACK = "bs4, lxml.etree"
+# Measure with bytecode caching on, as a deployed pipeline would run, whatever the calling environment says
+CHILD_ENV = {name: value for name, value in os.environ.items() if name != "PYTHONDONTWRITEBYTECODE"}
+
+PROBE = """
+import sys, time, json
+started_at = time.perf_counter()
+import {modules}
+elapsed = time.perf_counter() - started_at
+print(json.dumps({{"ms": elapsed * 1000, "modules": sorted(sys.modules)}}))
+"""
+
+SAMPLE_PAGE = (
+    "<html><head><title>Startup benchmark</title></head><body>"
+    + "<p>Fresh roasted coffee beans shipped daily from our roastery to your door.</p>" * 50
+    + "</body></html>"
+)
+
+
+def probe_import(modules, cwd):
+    """Import `modules` in a fresh interpreter, returning the import time in ms and the loaded module names."""
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(modules=modules)],
+        cwd=cwd,
+        env=CHILD_ENV,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def median_import_ms(modules, cwd, repeats):
+    """Return the median import time of `modules` over `repeats` fresh interpreters, and the modules loaded."""
+    # The first import writes the bytecode caches and is left out
+    probes = [probe_import(modules, cwd) for _ in range(repeats + 1)][1:]
+    return statistics.median(probe["ms"] for probe in probes), probes[-1]["modules"]
+
+
+def slowest_imports(module, cwd, limit):
+    """Return the direct imports of `module` with the largest cumulative times from `python -X importtime`."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd,
+        env=CHILD_ENV,
+        capture_output=True,
+        text=True,
+    ).stderr
+
+    # importtime lists a module after its imports, each level indented by two more spaces
+    imports = []
+    for line in stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        cumulative, name = int(fields[1]), fields[2]
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            if name.strip() == module:
+                return sorted(imports, key=lambda entry: entry["ms"], reverse=True)[:limit]
+            imports = []
+        elif depth == 1:
+            imports.append({"module": name.strip(), "ms": round(cumulative / 1000, 2)})
+
+    return []
+
+
+def median_run_ms(command, cwd, repeats):
+    """Return the median wall time of running `command` in `repeats` fresh processes."""
+    samples = []
+    subprocess.run(command, cwd=cwd, env=CHILD_ENV, capture_output=True)
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        subprocess.run(command, cwd=cwd, env=CHILD_ENV, capture_output=True)
+        samples.append((time.perf_counter() - started_at) * 1000)
+    return statistics.median(samples)
+
+
+def run_benchmark(scripts, repeats=DEFAULT_REPEATS, target_ms=DEFAULT_TARGET_MS, top=8):
+    """Measure the import and static run startup of each script against the target."""
+    interpreter_ms = median_run_ms([sys.executable, "-c", "pass"], SCRIPTS_DIR, repeats)
+    parser_stack_ms, _ = median_import_ms(PARSER_STACK, SCRIPTS_DIR, repeats)
+    results = {
+        "repeats": repeats,
+        "target_overhead_ms": target_ms,
+        "interpreter_ms": round(interpreter_ms, 2),
+        "parser_stack_ms": round(parser_stack_ms, 2),
+        "scripts": [],
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        page_path = os.path.join(directory, "page.html")
+        with open(page_path, "w", encoding="utf-8") as f:
+            f.write(SAMPLE_PAGE)
+
+        for script in scripts:
+            cwd, filename = os.path.split(os.path.abspath(script))
+            module = os.path.splitext(filename)[0]
+
+            import_ms, modules = median_import_ms(module, cwd, repeats)
+            browser_modules = sorted(name for name in modules if name.split(".")[0] in BROWSER_PACKAGES)
+            overhead_ms = import_ms - parser_stack_ms
+            run_ms = median_run_ms([sys.executable, filename, "--html-file", page_path, "--output", ""], cwd, repeats)
+
+            results["scripts"].append(
+                {
+                    "script": filename,
+                    "import_ms": round(import_ms, 2),
+                    "overhead_ms": round(overhead_ms, 2),
+                    "static_run_ms": round(run_ms, 2),
+                    "static_run_startup_ms": round(run_ms - interpreter_ms, 2),
+                    "modules_loaded": len(modules),
+                    "browser_modules": browser_modules,
+                    "slowest_imports": slowest_imports(module, cwd, top),
+                    "passed": overhead_ms <= target_ms and not browser_modules,
+                }
+            )
+
+    results["passed"] = all(script["passed"] for script in results["scripts"])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the static HTML startup of the detector scripts")
+    parser.add_argument(
+        "--scripts", nargs="+", default=DEFAULT_SCRIPTS, help="Detector scripts to measure (default: keyword, hidden)"
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=DEFAULT_REPEATS,
+        help=f"Fresh interpreters per measurement (default: {DEFAULT_REPEATS})",
+    )
+    parser.add_argument(
+        "--target-ms",
+        type=float,
+        default=DEFAULT_TARGET_MS,
+        help=f"Import time allowed on top of the parser stack (default: {DEFAULT_TARGET_MS})",
+    )
+    parser.add_argument("--top", type=int, default=8, help="Slowest imports to list per script (default: 8)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON instead of a table")
+
+    args = parser.parse_args()
+
+    results = run_benchmark(args.scripts, args.repeats, args.target_ms, args.top)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        sys.exit(0 if results["passed"] else 1)
+
+    print(f"median of {results['repeats']} fresh interpreters, times in ms")
+    print(
+        f"empty interpreter: {results['interpreter_ms']:.1f}   parser stack ({PARSER_STACK}) import: "
+        f"{results['parser_stack_ms']:.1f}   target: +{results['target_overhead_ms']:.1f} over the parser stack"
+    )
+    for r in results["scripts"]:
+        print()
+        status = "ok" if r["passed"] else "MISSED"
+        print(
+            f"{r['script']}: import {r['import_ms']:.1f} (+{r['overhead_ms']:.1f}) [{status}], "
+            f"--html-file run {r['static_run_ms']:.1f} ({r['static_run_startup_ms']:.1f} over the interpreter), "
+            f"{r['modules_loaded']} modules"
+        )
+        if r["browser_modules"]:
+            print(f"  browser modules loaded: {', '.join(r['browser_modules'])}")
+        for entry in r["slowest_imports"]:
+            print(f"  {entry['ms']:>8.2f}  {entry['module']}")
+
+    sys.exit(0 if results["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark the visible-text extraction parser backends on synthetic pages of increasing size.
+Every page is extracted with each backend, the outputs are checked to be identical and the best time is reported.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from keyword_stuffing_detection import PARSER_BACKENDS, extract_visible_text
+from text_extraction import lxml_reads_like_html_parser
+
+DEFAULT_SIZES_KB = [10, 100, 1000, 5000]
+
+WORDS = (
+    "seo search engine ranking content page website keyword optimization link quality google crawler index "
+    "visitor article guide product review price shipping support contact about blog news update"
+).split()
+
+
+def random_sentence(rng):
+    """Return a short sentence of random words."""
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 18))).capitalize() + "."
+
+
+def random_block(rng, index):
+    """Return one body section mixing the markup found on typical content pages."""
+    paragraphs = "".join(
+        f"<p>{random_sentence(rng)} <a href='/p/{index}'>{rng.choice(WORDS)}</a></p>" for _ in range(4)
+    )
+    items = "".join(f"<li><span>{rng.choice(WORDS)}</span> &amp; {rng.choice(WORDS)}</li>" for _ in range(5))
+    cells = "".join(f"<td>{rng.choice(WORDS)}</td>" for _ in range(4))
+
+    return (
+        f"<section id='s{index}' class='content'>"
+        f"<h2>{random_sentence(rng)}</h2>{paragraphs}"
+        f"<ul>{items}</ul>"
+        f"<table><tr>{cells}</tr></table>"
+        f"<!-- section {index} -->"
+        f"<script>window.track && track('s{index}', '<div>');</script>"
+        f"<noscript><img src='/pixel/{index}.gif'></noscript>"
+        f"</section>\n"
+    )
+
+
+def generate_page(size_kb, seed=0):
+    """Generate a well-formed HTML page of roughly `size_kb` kilobytes."""
+    rng = random.Random(seed)
+    head = (
+        "<!DOCTYPE html><html lang='en'><head><meta charset='utf-8'>"
+        "<title>Benchmark page</title><meta name='description' content='synthetic page'>"
+        "<link rel='stylesheet' href='/style.css'><style>body { color: #333; }</style>"
+        "<script>var config = {selector: '<p>'};</script></head><body>\n"
+    )
+    blocks = []
+    size = len(head)
+    while size < size_kb * 1024:
+        block = random_block(rng, len(blocks))
+        blocks.append(block)
+        size += len(block)
+
+    return head + "".join(blocks) + "</body></html>"
+
+
+def time_backend(html_content, parser_backend, repeat):
+    """Return the best extraction time in seconds and the extracted text."""
+    best = None
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        text = extract_visible_text(html_content, parser_backend)
+        elapsed = time.perf_counter() - started_at
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best, text
+
+
+def run_benchmark(sizes_kb, repeat=3):
+    """Benchmark every parser backend on a page of each size."""
+    results = []
+    for size_kb in sizes_kb:
+        html_content = generate_page(size_kb)
+        timings = {}
+        texts = {}
+        for parser_backend in PARSER_BACKENDS:
+            timings[parser_backend], texts[parser_backend] = time_backend(html_content, parser_backend, repeat)
+
+        baseline = timings["html.parser"]
+        results.append(
+            {
+                "size_kb": round(len(html_content) / 1024),
+                "lxml_fast_path": lxml_reads_like_html_parser(html_content),
+                "identical_output": len(set(texts.values())) == 1,
+                "seconds": {backend: round(seconds, 4) for backend, seconds in timings.items()},
+                "speedup": round(baseline / timings["lxml"], 2) if timings["lxml"] else None,
+            }
+        )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the HTML parser backends used for text extraction")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES_KB,
+        help=f"Page sizes in KB to benchmark (default: {' '.join(map(str, DEFAULT_SIZES_KB))})",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per backend and size, best time is kept")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON instead of a table")
+
+    args = parser.parse_args()
+
+    results = run_benchmark(args.sizes, args.repeat)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'size':>9}  {'html.parser':>12}  {'lxml':>10}  {'speedup':>8}  {'fast path':>9}  {'identical':>9}")
+        for r in results:
+            print(
+                f"{r['size_kb']:>6} KB  {r['seconds']['html.parser']:>11.4f}s  {r['seconds']['lxml']:>9.4f}s  "
+                f"{r['speedup']:>7}x  {str(r['lxml_fast_path']):>9}  {str(r['identical_output']):>9}"
+            )
+
+    sys.exit(0 if all(r["identical_output"] for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
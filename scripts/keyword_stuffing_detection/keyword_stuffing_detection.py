@@ -4,16 +4,66 @@ Keyword Stuffing Detection Script
 Detects excessive repetition of keywords indicative of keyword stuffing.
 """
 
+import os
 import sys
 import json
 import argparse
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
+import bs4
 from bs4 import BeautifulSoup
+from bs4.builder import HTMLParserTreeBuilder
+from bs4.builder._htmlparser import BeautifulSoupHTMLParser
+from bs4.element import CData
 import re
 import time
 import logging
-from collections import Counter
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from term_stats_index import DEFAULT_Z_THRESHOLD, MIN_BASELINE_PAGES, TermStatsIndex
+
+# Per-phase timings and counters come from the sibling metrics script directory, put first on the path so that
+# no installed "metrics" module is picked up instead
+METRICS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "metrics")
+if METRICS_DIR not in sys.path:
+    sys.path.insert(0, METRICS_DIR)
+from metrics import EXPORT_FORMATS, NULL_METRICS, Metrics, add_timings, export_metrics  # noqa: E402
+
+
+# Warm Chrome drivers and page readiness come from the sibling webdriver_pool script directory; without it only
+# HTML content can be analyzed
+WEBDRIVER_POOL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "webdriver_pool")
+if WEBDRIVER_POOL_DIR not in sys.path:
+    sys.path.insert(0, WEBDRIVER_POOL_DIR)
+try:
+    from webdriver_pool import MEMORY_LIMIT_SUPPORTED, READY_TIMEOUT, DriverPool, wait_for_page_ready  # noqa: E402
+except ImportError:
+    READY_TIMEOUT = 15
+    MEMORY_LIMIT_SUPPORTED = False
+    DriverPool = wait_for_page_ready = None
+
+# Text extraction backends live in the sibling text_extraction script directory; without it, text is extracted
+# with html.parser only
+TEXT_EXTRACTION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "text_extraction")
+if TEXT_EXTRACTION_DIR not in sys.path:
+    sys.path.insert(0, TEXT_EXTRACTION_DIR)
+try:
+    from text_extraction import DEFAULT_PARSER_BACKEND, PARSER_BACKENDS, extract_raw_text  # noqa: E402
+except ImportError:
+    PARSER_BACKENDS = ("html.parser",)
+    DEFAULT_PARSER_BACKEND = "html.parser"
+
+    def extract_raw_text(html_content, drop_tags, body_only=True, parser_backend=DEFAULT_PARSER_BACKEND):
+        """Return the text of `html_content` without `drop_tags` elements, before whitespace normalization."""
+        if parser_backend not in PARSER_BACKENDS:
+            raise ValueError(f"Unknown parser backend: {parser_backend}")
+
+        soup = BeautifulSoup(html_content, "html.parser")
+        for element in soup(drop_tags):
+            element.decompose()
+
+        body = soup.find("body") if body_only else None
+        return body.get_text() if body else soup.get_text()
+
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -136,38 +186,17 @@ STOP_WORDS = {
 }
 
 
-def setup_driver():
-    """Setup headless Chrome driver."""
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
+def read_urls_file(path):
+    """Read URLs from a file, one per line, skipping blank lines and # comments."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
 
-    try:
-        driver = webdriver.Chrome(options=chrome_options)
-        return driver
-    except Exception as e:
-        logger.error(f"Failed to setup Chrome driver: {e}")
-        return None
 
-
-def extract_visible_text(html_content):
+def extract_visible_text(html_content, parser_backend=DEFAULT_PARSER_BACKEND):
     """Extract visible text content from HTML body."""
     try:
-        soup = BeautifulSoup(html_content, "html.parser")
-
-        # Remove script and style elements
-        for element in soup(["script", "style", "meta", "noscript"]):
-            element.decompose()
-
-        # Get body content or fall back to entire document
-        body = soup.find("body")
-        if body:
-            text = body.get_text()
-        else:
-            text = soup.get_text()
+        # Remove script and style elements, and use the body content or fall back to entire document
+        text = extract_raw_text(html_content, ["script", "style", "meta", "noscript"], True, parser_backend)
 
         # Clean up whitespace
         text = re.sub(r"\s+", " ", text).strip()
@@ -192,156 +221,816 @@ def tokenize_and_normalize(text):
     return words, meaningful_words
 
 
-def calculate_keyword_density(words, meaningful_words, density_threshold=0.05):
-    """Calculate keyword density and identify potential stuffing."""
-    total_words = len(words)
-    meaningful_total = len(meaningful_words)
+# Phrase (n-gram) analysis. Phrases are built from consecutive meaningful words, so "cheap flights to london"
+# and "cheap flights london" count as the same trigram. A phrase's density is its share of the n-word windows of the
+# text, which overlap, so one word repeated in a row is not counted n times over.
+DEFAULT_NGRAM_SIZES = (2, 3)
+MIN_PHRASE_COUNT = 2
+NGRAM_MAX_ENTRIES = 50000
+HASH_BASE = 1000003
+HASH_MASK = (1 << 64) - 1
+
+
+class NgramCounter:
+    """
+    Counts n-word phrases with a rolling hash over the last n words, keeping at most `max_entries` phrases.
+    Lookups are keyed by the 64-bit hash, so only a phrase entering the table allocates its text. Once the table
+    is full the Misra-Gries rule applies: a new phrase decrements every count and evicts the ones reaching zero, so
+    a phrase seen in more than 1/max_entries of the windows is always kept and undercounted by at most that much.
+    """
+
+    def __init__(self, n, max_entries=NGRAM_MAX_ENTRIES):
+        self.n = n
+        self.max_entries = max_entries
+        self.total = 0
+        self.approximate = False
+        self._words = deque(maxlen=n)
+        self._hashes = deque(maxlen=n)
+        self._hash = 0
+        self._leading_factor = pow(HASH_BASE, n - 1, 1 << 64)
+        self._counts = {}
+        self._phrases = {}
+
+    def __len__(self):
+        return len(self._counts)
+
+    def add(self, word):
+        """Slide the window by one word and count the phrase it now covers."""
+        word_hash = hash(word) & HASH_MASK
+        if len(self._hashes) == self.n:
+            self._hash = (self._hash - self._hashes[0] * self._leading_factor) & HASH_MASK
+        self._hash = (self._hash * HASH_BASE + word_hash) & HASH_MASK
+        self._hashes.append(word_hash)
+        self._words.append(word)
+
+        if len(self._hashes) < self.n:
+            return
 
+        self.total += 1
+        count = self._counts.get(self._hash)
+        if count is not None:
+            self._counts[self._hash] = count + 1
+        elif len(self._counts) < self.max_entries:
+            self._counts[self._hash] = 1
+            self._phrases[self._hash] = " ".join(self._words)
+        else:
+            self._evict()
+
+    def _evict(self):
+        self.approximate = True
+        self._counts = {key: count - 1 for key, count in self._counts.items() if count > 1}
+        self._phrases = {key: self._phrases[key] for key in self._counts}
+
+    def items(self):
+        """Yield (phrase, count) pairs in first-seen order."""
+        for key, count in self._counts.items():
+            yield self._phrases[key], count
+
+    def most_common(self, limit):
+        """Return the `limit` most frequent (phrase, count) pairs, ties in first-seen order."""
+        return sorted(self.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+def count_ngrams(meaningful_words, ngram_sizes=DEFAULT_NGRAM_SIZES):
+    """Count the phrases of each size in `ngram_sizes` over a list of meaningful words."""
+    counters = [NgramCounter(n) for n in ngram_sizes]
+    for counter in counters:
+        for word in meaningful_words:
+            counter.add(word)
+
+    return counters
+
+
+def term_density(keyword, ngram, count, total_words, word_counts):
+    """
+    Return the density of a word, or of a phrase counted `count` times over the total_words - n + 1 windows of
+    n words. A phrase is never denser than its most frequent word, nor than the whole text.
+    """
+    if ngram == 1:
+        return count / total_words
+
+    density = count / max(total_words - ngram + 1, 1)
+    return min(density, max(word_counts.get(word, 0) for word in keyword.split()) / total_words, 1.0)
+
+
+def density_entry(keyword, ngram, count, density):
+    """Describe the density of a word or phrase, as used in violations and top keywords."""
+    return {
+        "keyword": keyword,
+        "ngram": ngram,
+        "count": count,
+        "density": round(density, 4),
+        "density_percentage": round(density * 100, 2),
+    }
+
+
+def calculate_keyword_density(words, meaningful_words, density_threshold=0.05, ngram_sizes=DEFAULT_NGRAM_SIZES):
+    """Calculate keyword and phrase density and identify potential stuffing."""
+    # Count word and phrase frequencies
+    return keyword_density_from_counts(
+        len(words),
+        len(meaningful_words),
+        Counter(meaningful_words),
+        density_threshold,
+        count_ngrams(meaningful_words, ngram_sizes),
+    )
+
+
+def keyword_density_from_counts(total_words, meaningful_total, word_counts, density_threshold=0.05, ngram_counters=()):
+    """Calculate keyword density from word totals, a Counter of meaningful words and NgramCounters of phrases."""
     if total_words == 0:
         return [], {"total_words": 0, "meaningful_words": 0, "unique_words": 0, "density_threshold": density_threshold}
 
-    # Count word frequencies
-    word_counts = Counter(meaningful_words)
-
     keyword_violations = []
 
-    for word, count in word_counts.items():
-        # Calculate density against total words (including stop words)
-        density = count / total_words
-        density_percentage = density * 100
-
-        if density > density_threshold:
-            keyword_violations.append(
-                {
-                    "keyword": word,
-                    "count": count,
-                    "density": round(density, 4),
-                    "density_percentage": round(density_percentage, 2),
-                    "threshold": density_threshold,
-                    "threshold_percentage": density_threshold * 100,
-                }
-            )
+    counts = [(1, word_counts.items())] + [(counter.n, counter.items()) for counter in ngram_counters]
+    for ngram, items in counts:
+        for keyword, count in items:
+            # A phrase only counts as stuffing once it repeats
+            if ngram > 1 and count < MIN_PHRASE_COUNT:
+                continue
+
+            # Calculate density against total words (including stop words)
+            density = term_density(keyword, ngram, count, total_words, word_counts)
+            if density > density_threshold:
+                violation = density_entry(keyword, ngram, count, density)
+                violation["threshold"] = density_threshold
+                violation["threshold_percentage"] = density_threshold * 100
+                keyword_violations.append(violation)
 
     # Sort by density (highest first)
     keyword_violations.sort(key=lambda x: x["density"], reverse=True)
 
+    top_keywords = [density_entry(word, 1, count, count / total_words) for word, count in word_counts.most_common(10)]
+    for counter in ngram_counters:
+        top_keywords.extend(
+            density_entry(phrase, counter.n, count, term_density(phrase, counter.n, count, total_words, word_counts))
+            for phrase, count in counter.most_common(10)
+            if count >= MIN_PHRASE_COUNT
+        )
+
     stats = {
         "total_words": total_words,
         "meaningful_words": meaningful_total,
         "unique_words": len(word_counts),
         "density_threshold": density_threshold,
-        "top_keywords": [
-            {
-                "keyword": word,
-                "count": count,
-                "density": round(count / total_words, 4),
-                "density_percentage": round((count / total_words) * 100, 2),
-            }
-            for word, count in word_counts.most_common(10)
-        ],
+        "top_keywords": top_keywords,
     }
 
+    if ngram_counters:
+        stats["phrases"] = [
+            {"ngram": counter.n, "total": counter.total, "unique": len(counter), "approximate": counter.approximate}
+            for counter in ngram_counters
+        ]
+
     return keyword_violations, stats
 
 
-def analyze_url_for_keyword_stuffing(url, density_threshold=0.05):
-    """Analyze a URL for keyword stuffing."""
-    driver = setup_driver()
+# A term only stands out from the site baseline if it also takes up a noticeable share of the page
+ANOMALY_MIN_DENSITY = 0.01
+
+
+def page_term_counts(word_counts, ngram_counters=()):
+    """Return {term: (ngram, count)} for every word and repeated phrase of a page."""
+    counts = {word: (1, count) for word, count in word_counts.items()}
+    for counter in ngram_counters:
+        counts.update((phrase, (counter.n, count)) for phrase, count in counter.items() if count >= MIN_PHRASE_COUNT)
+
+    return counts
+
+
+def score_against_site(term_index, page_key, total_words, word_counts, violations, ngram_counters=()):
+    """
+    Score a page's terms against the site baseline of `term_index` and add the page to it.
+    Marks each violation with its z-score and returns the site baseline summary and the anomalous terms.
+    """
+    counts = page_term_counts(word_counts, ngram_counters)
+    densities = {
+        term: (ngram, term_density(term, ngram, count, total_words, word_counts))
+        for term, (ngram, count) in counts.items()
+    }
+    baseline_pages, scores = term_index.score_page(densities, page_key)
+    ready = baseline_pages >= term_index.min_pages
+
+    anomalies = []
+    for term, score in scores.items():
+        if score is None or score[0] < term_index.z_threshold:
+            continue
+        ngram, density = densities[term]
+        count = counts[term][1]
+        if count < MIN_PHRASE_COUNT or density < ANOMALY_MIN_DENSITY:
+            continue
+
+        anomaly = density_entry(term, ngram, count, density)
+        anomaly["z_score"] = round(score[0], 2)
+        anomaly["site_mean_percentage"] = round(score[1] * 100, 2)
+        anomalies.append(anomaly)
+
+    anomalies.sort(key=lambda x: x["z_score"], reverse=True)
+
+    if ready:
+        for violation in violations:
+            score = scores.get(violation["keyword"])
+            violation["z_score"] = round(score[0], 2) if score else None
+            # The site uses this term this densely on a regular basis, so it is on-topic rather than stuffed
+            violation["site_typical"] = score is not None and score[0] < term_index.z_threshold
+
+    baseline = {"pages": baseline_pages, "ready": ready, "z_threshold": term_index.z_threshold}
+    return baseline, anomalies
+
+
+# Streaming analysis. html.parser events are fed straight into running counters instead of building a tree,
+# the page text and the word lists, so memory is bounded by the chunk size and the vocabulary of the page.
+STREAM_CHUNK_SIZE = 64 * 1024
+# Streaming drives bs4's html.parser event parser with a stand-in for the BeautifulSoup object, which relies on
+# bs4 internals; requirements.txt pins beautifulsoup4 to the releases it was checked against
+STREAMING_BS4_VERSIONS = ">=4.13,<4.16"
+PREVIEW_LENGTH = 200
+VISIBLE_TEXT_DROP_TAGS = {"script", "style", "meta", "noscript"}
+
+WHITESPACE_RE = re.compile(r"\s+")
+NON_WORD_RE = re.compile(r"\W")
+LAST_NON_WORD_RE = re.compile(r"\W(?=\w*\Z)")
+WORD_RE = re.compile(r"\b[a-zA-Z]{2,}\b")
+
+
+class StreamingKeywordCounter:
+    """
+    Running word counts over text that arrives in pieces.
+    A word may span pieces, so the trailing partial word of each piece is carried over to the next one.
+    """
+
+    def __init__(self, ngram_sizes=DEFAULT_NGRAM_SIZES):
+        self.total_words = 0
+        self.meaningful_total = 0
+        self.word_counts = Counter()
+        self.ngram_counters = [NgramCounter(n) for n in ngram_sizes]
+        self.preview = ""
+        self._pending_space = False
+        self._run = ""
+        self._run_is_word = True
+
+    def feed(self, text):
+        """Count the words of the next piece of text."""
+        if not text:
+            return
+
+        self._update_preview(text)
+        text = text.lower()
+
+        first = NON_WORD_RE.search(text)
+        if first is None:
+            self._extend_run(text)
+            return
+
+        self._extend_run(text[: first.start()])
+        self._end_run()
+
+        last = LAST_NON_WORD_RE.search(text, first.start())
+        self._count(WORD_RE.findall(text, first.start(), last.end()))
+        self._extend_run(text[last.end() :])
+
+    def close(self):
+        """Count the word still carried at the end of the text."""
+        self._end_run()
+
+    def _extend_run(self, chars):
+        # Only runs made entirely of ASCII letters are words, anything else is dropped as it streams by
+        if not chars or not self._run_is_word:
+            return
+        if chars.isascii() and chars.isalpha():
+            self._run += chars
+        else:
+            self._run, self._run_is_word = "", False
+
+    def _end_run(self):
+        if self._run_is_word and len(self._run) >= 2:
+            self._count([self._run])
+        self._run, self._run_is_word = "", True
+
+    def _count(self, words):
+        self.total_words += len(words)
+        meaningful_words = [word for word in words if word not in STOP_WORDS and len(word) >= 3]
+        self.meaningful_total += len(meaningful_words)
+        self.word_counts.update(meaningful_words)
+        for counter in self.ngram_counters:
+            for word in meaningful_words:
+                counter.add(word)
+
+    def _update_preview(self, text):
+        # Keep the first PREVIEW_LENGTH + 1 characters of the whitespace-normalized text
+        if len(self.preview) > PREVIEW_LENGTH:
+            return
+
+        text = WHITESPACE_RE.sub(" ", text)
+        if text.startswith(" "):
+            self._pending_space = True
+        core = text.strip(" ")
+        if not core:
+            return
+
+        if self._pending_space and self.preview:
+            self.preview += " "
+        self.preview += core[: PREVIEW_LENGTH + 1 - len(self.preview)]
+        self._pending_space = text.endswith(" ")
+
+
+class _StreamedTag:
+    __slots__ = ("name", "is_empty_element")
+
+    def __init__(self, name, is_empty_element):
+        self.name = name
+        self.is_empty_element = is_empty_element
+
+
+class VisibleTextSink:
+    """
+    Stands in for the BeautifulSoup object behind bs4's html.parser event parser.
+    It keeps only the open-tag stack, nesting tags and typing strings exactly like BeautifulSoup does, and feeds
+    the strings extract_visible_text() would return to a StreamingKeywordCounter.
+    """
+
+    def __init__(self, drop_tags=VISIBLE_TEXT_DROP_TAGS, ngram_sizes=DEFAULT_NGRAM_SIZES):
+        self.builder = HTMLParserTreeBuilder()
+        self.drop_tags = drop_tags
+        self.ngram_sizes = ngram_sizes
+        self.contains_replacement_characters = False
+
+        self.tag_stack = []
+        self.open_tag_counter = Counter()
+        self.dropped_depth = 0
+        self.string_container_depth = 0
+        self._pending_data = None
+
+        # Text before the first <body> counts only if the document has no <body> at all
+        self.document_counter = StreamingKeywordCounter(ngram_sizes)
+        self.body_counter = None
+        self.body_depth = None
+
+    @property
+    def counter(self):
+        """The counter holding the text extract_visible_text() would return."""
+        return self.body_counter if self.body_counter is not None else self.document_counter
+
+    def handle_starttag(self, name, namespace, nsprefix, attrs, sourceline=None, sourcepos=None, namespaces=None):
+        self.endData()
+
+        if self.body_counter is None and name == "body" and not self.dropped_depth:
+            self.document_counter = None
+            self.body_counter = StreamingKeywordCounter(self.ngram_sizes)
+            self.body_depth = len(self.tag_stack)
+
+        self.tag_stack.append(name)
+        self.open_tag_counter[name] += 1
+        self.dropped_depth += name in self.drop_tags
+        self.string_container_depth += name in self.builder.string_containers
+
+        return _StreamedTag(name, self.builder.can_be_empty_element(name))
+
+    def handle_endtag(self, name, nsprefix=None):
+        self.endData()
+
+        # Same as BeautifulSoup._popToTag: pop up to the most recent open tag with this name, if there is one
+        while self.tag_stack and self.open_tag_counter[name]:
+            popped = self.tag_stack.pop()
+            self.open_tag_counter[popped] -= 1
+            self.dropped_depth -= popped in self.drop_tags
+            self.string_container_depth -= popped in self.builder.string_containers
+            if self.body_depth is not None and len(self.tag_stack) == self.body_depth:
+                self.body_depth = -1
+            if popped == name:
+                break
+
+    def handle_data(self, data):
+        # A comment, doctype or CDATA section arrives as one handle_data() call between endData() and
+        # endData(cls), so any data already pending when more arrives is ordinary text
+        if self._pending_data is not None:
+            self._emit(self._pending_data, None)
+        self._pending_data = data
+
+    def endData(self, containerClass=None):
+        if self._pending_data is not None:
+            data, self._pending_data = self._pending_data, None
+            self._emit(data, containerClass)
+
+    def _emit(self, data, container_class):
+        # get_text() only returns plain strings and CDATA; text inside script, style, template, rt and rp
+        # gets a special string class, and comments, doctypes and processing instructions are skipped
+        if container_class is None:
+            if self.string_container_depth:
+                return
+        elif container_class is not CData:
+            return
+
+        if self.dropped_depth or self.body_depth == -1:
+            return
+
+        self.counter.feed(data)
+
+
+def iter_text_chunks(text, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield `text` in chunks of `chunk_size` characters."""
+    for start in range(0, len(text), chunk_size):
+        yield text[start : start + chunk_size]
+
+
+def iter_file_chunks(path, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield the decoded contents of a UTF-8 file in chunks, without reading it whole."""
+    with open(path, "r", encoding="utf-8") as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
+def stream_visible_text_counts(chunks, ngram_sizes=DEFAULT_NGRAM_SIZES):
+    """Parse HTML chunks incrementally and return the StreamingKeywordCounter of the visible text."""
+    sink = VisibleTextSink(ngram_sizes=ngram_sizes)
+    args, kwargs = sink.builder.parser_args
+    parser = BeautifulSoupHTMLParser(sink, *args, **kwargs)
+    if not hasattr(parser, "already_closed_empty_element") or not hasattr(sink.builder, "string_containers"):
+        raise RuntimeError(
+            f"Streaming needs beautifulsoup4{STREAMING_BS4_VERSIONS}, found {bs4.__version__}; run without --stream"
+        )
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        # Void elements are closed as soon as they open, so a stray end tag for one never pops anything and
+        # bs4's list of them would only grow with the page
+        parser.already_closed_empty_element.clear()
+    parser.close()
+    sink.endData()
+
+    counter = sink.counter
+    counter.close()
+    return counter
+
+
+def analyze_html_stream_for_keyword_stuffing(
+    chunks,
+    density_threshold=0.05,
+    ngram_sizes=DEFAULT_NGRAM_SIZES,
+    term_index=None,
+    page_key=None,
+    metrics=NULL_METRICS,
+):
+    """
+    Analyze HTML that arrives as an iterable of string chunks for keyword stuffing.
+    Returns the same result as analyze_html_for_keyword_stuffing() with memory bounded by the chunk size. Streaming
+    always parses with html.parser; the lxml backend only takes markup both parsers read alike, so the result does not
+    depend on the backend the other path uses.
+    """
+    try:
+        with metrics.span("parse_and_count"):
+            counter = stream_visible_text_counts(chunks, ngram_sizes)
+    except Exception as e:
+        logger.error(f"Error analyzing HTML: {e}")
+        return {"status": "error", "message": f"Failed to analyze HTML: {str(e)}"}
+
+    if not counter.preview:
+        return empty_text_result(density_threshold)
+
+    metrics.count("words", counter.total_words)
+    with metrics.span("density"):
+        violations, stats = keyword_density_from_counts(
+            counter.total_words,
+            counter.meaningful_total,
+            counter.word_counts,
+            density_threshold,
+            counter.ngram_counters,
+        )
+    text_preview = (
+        counter.preview[:PREVIEW_LENGTH] + "..." if len(counter.preview) > PREVIEW_LENGTH else counter.preview
+    )
+
+    site = None
+    if term_index is not None:
+        with metrics.span("site_baseline"):
+            site = score_against_site(
+                term_index, page_key, counter.total_words, counter.word_counts, violations, counter.ngram_counters
+            )
+
+    return keyword_stuffing_result(violations, stats, text_preview, site)
+
+
+def analyze_url_for_keyword_stuffing(
+    url,
+    density_threshold=0.05,
+    pool=None,
+    ready_timeout=READY_TIMEOUT,
+    parser_backend=DEFAULT_PARSER_BACKEND,
+    stream=False,
+    ngram_sizes=DEFAULT_NGRAM_SIZES,
+    term_index=None,
+    metrics=NULL_METRICS,
+):
+    """
+    Analyze a URL for keyword stuffing, borrowing a driver from `pool` when one is given.
+    With a `term_index` the page is also scored against, and added to, the site baseline under its URL.
+    """
+    own_pool = pool is None
+    if own_pool:
+        pool = DriverPool(size=1)
+
+    with metrics.span("driver_acquire"):
+        driver = pool.acquire(metrics)
     if not driver:
         return {"status": "error", "message": "Failed to setup browser driver"}
 
+    broken = False
     try:
         # Load the page
-        driver.get(url)
-        time.sleep(3)  # Wait for page to fully load
+        started_at = time.monotonic()
+        with metrics.span("page_load"):
+            driver.get(url)
+        with metrics.span("wait_ready"):
+            page_load = wait_for_page_ready(driver, started_at, ready_timeout, metrics=metrics)
 
-        # Get page HTML
-        html_content = driver.page_source
+        with metrics.span("page_source"):
+            # Get page HTML
+            html_content = driver.page_source
 
-        # Extract page title for context
-        try:
-            title = driver.title
-        except:
-            title = "Unknown"
+            # Extract page title for context
+            try:
+                title = driver.title
+            except:
+                title = "Unknown"
+        metrics.count("webdriver_calls", 3)
+        metrics.count("html_characters", len(html_content))
 
     except Exception as e:
         logger.error(f"Error loading URL {url}: {e}")
-        return {"status": "error", "message": f"Failed to load URL: {str(e)}"}
+        broken = True
+        return {"status": "error", "message": f"Failed to load URL: {str(e)}", "url": url}
 
     finally:
-        driver.quit()
+        pool.release(driver, broken=broken)
+        if own_pool:
+            pool.close()
 
     # Analyze the HTML content
-    result = analyze_html_for_keyword_stuffing(html_content, density_threshold)
+    result = analyze_html_for_keyword_stuffing(
+        html_content, density_threshold, parser_backend, stream, ngram_sizes, term_index, url, metrics
+    )
     result["url"] = url
     result["title"] = title
+    result["page_load"] = page_load
 
     return result
 
 
-def analyze_html_for_keyword_stuffing(html_content, density_threshold=0.05):
-    """Analyze HTML content for keyword stuffing."""
+def analyze_urls_for_keyword_stuffing(
+    urls,
+    density_threshold=0.05,
+    pool_size=2,
+    recycle_after=50,
+    max_memory_mb=None,
+    ready_timeout=READY_TIMEOUT,
+    parser_backend=DEFAULT_PARSER_BACKEND,
+    stream=False,
+    ngram_sizes=DEFAULT_NGRAM_SIZES,
+    term_index=None,
+    metrics=NULL_METRICS,
+):
+    """
+    Analyze many URLs for keyword stuffing through a shared pool of warm drivers.
+    Each result gets the timings of its own page, which add up in `metrics`.
+    """
+    pool = DriverPool(size=pool_size, recycle_after=recycle_after, max_memory_mb=max_memory_mb)
+
+    def analyze(url):
+        page_metrics = metrics.child()
+        result = analyze_url_for_keyword_stuffing(
+            url, density_threshold, pool, ready_timeout, parser_backend, stream, ngram_sizes, term_index, page_metrics
+        )
+        return add_timings(result, page_metrics, metrics)
+
     try:
-        # Extract visible text
-        visible_text = extract_visible_text(html_content)
+        with ThreadPoolExecutor(max_workers=pool.size) as executor:
+            results = list(executor.map(analyze, urls))
+    finally:
+        pool.close()
+
+    failed = [r for r in results if not r.get("passed", False)]
+
+    return {
+        "status": "success",
+        "passed": not failed,
+        "urls_count": len(results),
+        "failed_count": len(failed),
+        "results": results,
+        "message": f"{len(failed)} of {len(results)} URL(s) failed keyword stuffing analysis.",
+    }
+
+
+def analyze_html_for_keyword_stuffing(
+    html_content,
+    density_threshold=0.05,
+    parser_backend=DEFAULT_PARSER_BACKEND,
+    stream=False,
+    ngram_sizes=DEFAULT_NGRAM_SIZES,
+    term_index=None,
+    page_key=None,
+    metrics=NULL_METRICS,
+):
+    """Analyze HTML content for keyword stuffing, counting words incrementally when `stream` is set."""
+    if stream:
+        return analyze_html_stream_for_keyword_stuffing(
+            iter_text_chunks(html_content), density_threshold, ngram_sizes, term_index, page_key, metrics
+        )
+
+    # Extract visible text
+    with metrics.span("extract_text"):
+        visible_text = extract_visible_text(html_content, parser_backend)
+
+    return analyze_text_for_keyword_stuffing(
+        visible_text, density_threshold, ngram_sizes, term_index, page_key, metrics
+    )
+
 
+def analyze_text_for_keyword_stuffing(
+    visible_text,
+    density_threshold=0.05,
+    ngram_sizes=DEFAULT_NGRAM_SIZES,
+    term_index=None,
+    page_key=None,
+    metrics=NULL_METRICS,
+):
+    """
+    Analyze already extracted, whitespace-normalized visible text for keyword stuffing.
+    With a `term_index` the page is also scored against the site baseline and added to it; pages given a
+    `page_key` replace their earlier version in the index when analyzed again.
+    """
+    try:
         if not visible_text:
-            return {
-                "status": "success",
-                "passed": True,
-                "message": "No text content found to analyze",
-                "violations": [],
-                "stats": {
-                    "total_words": 0,
-                    "meaningful_words": 0,
-                    "unique_words": 0,
-                    "density_threshold": density_threshold,
-                },
-            }
+            return empty_text_result(density_threshold)
 
         # Tokenize and normalize
-        all_words, meaningful_words = tokenize_and_normalize(visible_text)
+        with metrics.span("tokenize"):
+            all_words, meaningful_words = tokenize_and_normalize(visible_text)
+        metrics.count("words", len(all_words))
 
         # Calculate keyword density
-        violations, stats = calculate_keyword_density(all_words, meaningful_words, density_threshold)
-
-        has_keyword_stuffing = len(violations) > 0
-
-        result = {
-            "status": "success",
-            "passed": not has_keyword_stuffing,
-            "violations_count": len(violations),
-            "violations": violations,
-            "stats": stats,
-            "text_preview": visible_text[:200] + "..." if len(visible_text) > 200 else visible_text,
-        }
-
-        if has_keyword_stuffing:
-            primary_violation = violations[0]
-            result["message"] = (
-                f"Keyword stuffing detected: '{primary_violation['keyword']}' "
-                f"density {primary_violation['density_percentage']}% "
-                f"exceeds allowed maximum of {primary_violation['threshold_percentage']}%"
+        with metrics.span("count"):
+            word_counts = Counter(meaningful_words)
+            ngram_counters = count_ngrams(meaningful_words, ngram_sizes)
+        with metrics.span("density"):
+            violations, stats = keyword_density_from_counts(
+                len(all_words), len(meaningful_words), word_counts, density_threshold, ngram_counters
             )
-        else:
-            result["message"] = f"No keyword stuffing detected. Analyzed {stats['total_words']} words."
 
-        return result
+        site = None
+        if term_index is not None:
+            with metrics.span("site_baseline"):
+                site = score_against_site(term_index, page_key, len(all_words), word_counts, violations, ngram_counters)
+
+        text_preview = visible_text[:200] + "..." if len(visible_text) > 200 else visible_text
+        return keyword_stuffing_result(violations, stats, text_preview, site)
 
     except Exception as e:
         logger.error(f"Error analyzing HTML: {e}")
         return {"status": "error", "message": f"Failed to analyze HTML: {str(e)}"}
 
 
+def empty_text_result(density_threshold=0.05):
+    """Result for a page without any visible text."""
+    return {
+        "status": "success",
+        "passed": True,
+        "message": "No text content found to analyze",
+        "violations": [],
+        "stats": {
+            "total_words": 0,
+            "meaningful_words": 0,
+            "unique_words": 0,
+            "density_threshold": density_threshold,
+        },
+    }
+
+
+def keyword_stuffing_result(violations, stats, text_preview, site=None):
+    """
+    Build the analysis result from keyword violations and stats.
+    `site` is the (baseline, anomalies) pair from score_against_site(); once the site baseline is ready, terms the
+    site typically uses this densely no longer fail the page and terms far above their site average do.
+    """
+    failing = violations
+    anomalies = []
+    if site is not None:
+        baseline, anomalies = site
+        if baseline["ready"]:
+            failing = [v for v in violations if not v["site_typical"]]
+
+    has_keyword_stuffing = len(failing) > 0 or len(anomalies) > 0
+
+    result = {
+        "status": "success",
+        "passed": not has_keyword_stuffing,
+        "violations_count": len(violations),
+        "violations": violations,
+        "stats": stats,
+        "text_preview": text_preview,
+    }
+
+    if site is not None:
+        result["site_baseline"] = baseline
+        result["anomalies"] = anomalies
+
+    if failing:
+        primary_violation = failing[0]
+        result["message"] = (
+            f"Keyword stuffing detected: '{primary_violation['keyword']}' "
+            f"density {primary_violation['density_percentage']}% "
+            f"exceeds allowed maximum of {primary_violation['threshold_percentage']}%"
+        )
+    elif anomalies:
+        primary_anomaly = anomalies[0]
+        result["message"] = (
+            f"Keyword stuffing detected: '{primary_anomaly['keyword']}' "
+            f"density {primary_anomaly['density_percentage']}% is {primary_anomaly['z_score']} standard deviations "
+            f"above the site average of {primary_anomaly['site_mean_percentage']}%"
+        )
+    elif violations:
+        result["message"] = (
+            f"No keyword stuffing detected. Analyzed {stats['total_words']} words, "
+            f"{len(violations)} keyword(s) above the density threshold are typical for this site."
+        )
+    else:
+        result["message"] = f"No keyword stuffing detected. Analyzed {stats['total_words']} words."
+
+    return result
+
+
 def main():
     parser = argparse.ArgumentParser(description="Detect keyword stuffing in web content")
     parser.add_argument("--url", help="URL to analyze for keyword stuffing")
+    parser.add_argument("--urls-file", help="Path to a file with one URL per line to analyze in batch")
     parser.add_argument("--html", help="HTML content string to analyze")
     parser.add_argument("--html-file", help="Path to a local .html file to analyze")
     parser.add_argument(
         "--threshold", type=float, default=0.05, help="Keyword density threshold (0-1, default: 0.05 = 5%)"
     )
     parser.add_argument("--output", help="Output file for results", default="keyword_stuffing_results.json")
+    parser.add_argument(
+        "--pool-size", type=int, default=2, help="Number of Chrome drivers for --urls-file (default: 2)"
+    )
+    parser.add_argument(
+        "--recycle-after", type=int, default=50, help="Restart a driver after this many pages (default: 50)"
+    )
+    parser.add_argument(
+        "--max-driver-memory-mb",
+        type=int,
+        help="Restart a driver once its browser processes use more memory than this (requires psutil)",
+    )
+    parser.add_argument(
+        "--ready-timeout",
+        type=float,
+        default=READY_TIMEOUT,
+        help=f"Maximum seconds to wait for a page to become ready (default: {READY_TIMEOUT})",
+    )
+    parser.add_argument(
+        "--parser",
+        choices=PARSER_BACKENDS,
+        default=DEFAULT_PARSER_BACKEND,
+        help=f"HTML parser used for text extraction (default: {DEFAULT_PARSER_BACKEND})",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Count words while parsing, with memory bounded by the chunk size instead of the page size "
+        "(always parses with html.parser, with the same results)",
+    )
+    parser.add_argument(
+        "--ngrams",
+        type=int,
+        nargs="*",
+        default=list(DEFAULT_NGRAM_SIZES),
+        help="Phrase lengths checked for phrase stuffing (default: 2 3, pass no value to disable)",
+    )
+    parser.add_argument(
+        "--term-index",
+        help="Site-wide term statistics file (SQLite). Pages are scored against it and added to it as they are analyzed",
+    )
+    parser.add_argument(
+        "--z-threshold",
+        type=float,
+        default=DEFAULT_Z_THRESHOLD,
+        help=f"Standard deviations above the site average that flag a term (default: {DEFAULT_Z_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--min-baseline-pages",
+        type=int,
+        default=MIN_BASELINE_PAGES,
+        help=f"Pages the index needs before the site baseline is used (default: {MIN_BASELINE_PAGES})",
+    )
+    parser.add_argument(
+        "--timings", action="store_true", help="Add per-phase durations and counts to the results under timings"
+    )
+    parser.add_argument("--metrics-file", help="Export the timings of the run to this file (implies --timings)")
+    parser.add_argument(
+        "--metrics-format",
+        choices=EXPORT_FORMATS,
+        default="jsonl",
+        help="Format of --metrics-file: jsonl appends a record per run, prometheus replaces the file (default: jsonl)",
+    )
 
     args = parser.parse_args()
 
@@ -350,22 +1039,98 @@ def main():
         print("Error: Threshold must be between 0 and 1")
         sys.exit(1)
 
+    if any(n < 2 for n in args.ngrams):
+        print("Error: Phrase lengths must be 2 or more")
+        sys.exit(1)
+    ngram_sizes = tuple(sorted(set(args.ngrams)))
+
+    term_index = None
+    if args.term_index:
+        try:
+            term_index = TermStatsIndex(args.term_index, args.z_threshold, args.min_baseline_pages)
+        except Exception as e:
+            print(f"Error opening term index: {e}")
+            sys.exit(1)
+
+    if (args.url or args.urls_file) and DriverPool is None:
+        print("Error: --url and --urls-file require the webdriver_pool script directory next to this one")
+        sys.exit(1)
+
+    if args.max_driver_memory_mb and not MEMORY_LIMIT_SUPPORTED:
+        print("Error: --max-driver-memory-mb requires psutil")
+        sys.exit(1)
+
+    metrics = Metrics() if args.timings or args.metrics_file else NULL_METRICS
+
     if args.url:
-        result = analyze_url_for_keyword_stuffing(args.url, args.threshold)
+        result = analyze_url_for_keyword_stuffing(
+            args.url,
+            args.threshold,
+            ready_timeout=args.ready_timeout,
+            parser_backend=args.parser,
+            stream=args.stream,
+            ngram_sizes=ngram_sizes,
+            term_index=term_index,
+            metrics=metrics,
+        )
+    elif args.urls_file:
+        try:
+            urls = read_urls_file(args.urls_file)
+        except Exception as e:
+            print(f"Error reading URLs file: {e}")
+            sys.exit(1)
+        result = analyze_urls_for_keyword_stuffing(
+            urls,
+            args.threshold,
+            args.pool_size,
+            args.recycle_after,
+            args.max_driver_memory_mb,
+            args.ready_timeout,
+            args.parser,
+            args.stream,
+            ngram_sizes,
+            term_index,
+            metrics,
+        )
     elif args.html:
-        result = analyze_html_for_keyword_stuffing(args.html, args.threshold)
+        result = analyze_html_for_keyword_stuffing(
+            args.html, args.threshold, args.parser, args.stream, ngram_sizes, term_index, metrics=metrics
+        )
+    elif args.html_file and args.stream:
+        # Read the file chunk by chunk so it is never held in memory whole
+        result = analyze_html_stream_for_keyword_stuffing(
+            iter_file_chunks(args.html_file),
+            args.threshold,
+            ngram_sizes,
+            term_index,
+            os.path.abspath(args.html_file),
+            metrics,
+        )
     elif args.html_file:
         try:
             with open(args.html_file, "r", encoding="utf-8") as f:
                 html_content = f.read()
-            result = analyze_html_for_keyword_stuffing(html_content, args.threshold)
+            result = analyze_html_for_keyword_stuffing(
+                html_content,
+                args.threshold,
+                args.parser,
+                ngram_sizes=ngram_sizes,
+                term_index=term_index,
+                page_key=os.path.abspath(args.html_file),
+                metrics=metrics,
+            )
         except Exception as e:
             print(f"Error reading HTML file: {e}")
             sys.exit(1)
     else:
-        print("Error: Must provide either --url, --html, or --html-file parameter")
+        print("Error: Must provide either --url, --urls-file, --html, or --html-file parameter")
         sys.exit(1)
 
+    if term_index is not None:
+        term_index.close()
+
+    add_timings(result, metrics)
+
     # Output results
     print(json.dumps(result, indent=2))
 
@@ -374,6 +1139,13 @@ def main():
         with open(args.output, "w") as f:
             json.dump(result, f, indent=2)
 
+    if args.metrics_file:
+        try:
+            export_metrics(result["timings"], args.metrics_file, args.metrics_format, {"detector": "keyword_stuffing"})
+        except OSError as e:
+            print(f"Error writing metrics file: {e}")
+            sys.exit(1)
+
     # Exit with appropriate code
     sys.exit(0 if result.get("passed", False) else 1)
 
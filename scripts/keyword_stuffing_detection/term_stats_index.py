@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Site-wide Term Statistics Index
+Keeps per-term document frequencies and density sums for every analyzed page of a site in a SQLite file, so a
+page's keyword densities can be scored against the site baseline instead of a single global threshold.
+"""
+
+import sys
+import json
+import math
+import zlib
+import sqlite3
+import argparse
+import threading
+
+DEFAULT_Z_THRESHOLD = 3.0
+MIN_BASELINE_PAGES = 30
+MIN_DOC_FREQ = 5
+# Keeps a density that is identical on every page from giving an infinite z-score on the first page that differs
+DENSITY_STD_FLOOR = 0.001
+# SQLite limits the number of bound parameters per statement
+LOOKUP_BATCH_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS terms (
+    term TEXT PRIMARY KEY,
+    ngram INTEGER NOT NULL,
+    doc_freq INTEGER NOT NULL,
+    density_sum REAL NOT NULL,
+    density_sq_sum REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS pages (
+    page_key TEXT PRIMARY KEY,
+    densities BLOB NOT NULL
+) WITHOUT ROWID;
+"""
+
+UPSERT_TERM = """
+INSERT INTO terms (term, ngram, doc_freq, density_sum, density_sq_sum) VALUES (?, ?, 1, ?, ?)
+ON CONFLICT (term) DO UPDATE SET
+    doc_freq = doc_freq + 1,
+    density_sum = density_sum + excluded.density_sum,
+    density_sq_sum = density_sq_sum + excluded.density_sq_sum
+"""
+
+REMOVE_TERM = """
+UPDATE terms SET doc_freq = doc_freq - 1, density_sum = density_sum - ?, density_sq_sum = density_sq_sum - ?
+WHERE term = ?
+"""
+
+
+def encode_densities(densities):
+    """Serialize a page's {term: (ngram, density)} mapping for the pages table."""
+    return zlib.compress(json.dumps(densities, separators=(",", ":"), sort_keys=True).encode("utf-8"))
+
+
+def decode_densities(blob):
+    """Inverse of encode_densities()."""
+    return {term: tuple(value) for term, value in json.loads(zlib.decompress(blob)).items()}
+
+
+def term_baseline(page_count, doc_freq, density_sum, density_sq_sum):
+    """Return the mean and standard deviation of a term's density over `page_count` pages."""
+    # Pages without the term contribute a density of 0, so the sums over the pages that have it are enough
+    mean = density_sum / page_count
+    variance = max(density_sq_sum / page_count - mean * mean, 0.0)
+    return mean, math.sqrt(variance)
+
+
+class TermStatsIndex:
+    """
+    Incremental on-disk index of term statistics across the pages of a site.
+    Each term keeps its document frequency and the sum and sum of squares of its density, so adding a page and
+    scoring a term are constant time per term whatever the number of pages. Pages added with a key can be
+    re-analyzed: their previous contribution is replaced rather than counted twice.
+    """
+
+    def __init__(self, path, z_threshold=DEFAULT_Z_THRESHOLD, min_pages=MIN_BASELINE_PAGES, min_doc_freq=MIN_DOC_FREQ):
+        self.path = path
+        self.z_threshold = z_threshold
+        self.min_pages = min_pages
+        self.min_doc_freq = min_doc_freq
+        self._lock = threading.Lock()
+        # Batch analysis scores pages from several threads, the lock serializes them on one connection
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('pages', 0)")
+        self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the underlying database connection."""
+        self._conn.close()
+
+    @property
+    def page_count(self):
+        """Number of pages in the index."""
+        return self._conn.execute("SELECT value FROM meta WHERE key = 'pages'").fetchone()[0]
+
+    def _lookup(self, terms):
+        """Return {term: (doc_freq, density_sum, density_sq_sum)} for the indexed terms among `terms`."""
+        rows = {}
+        terms = list(terms)
+        for start in range(0, len(terms), LOOKUP_BATCH_SIZE):
+            batch = terms[start : start + LOOKUP_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            for term, doc_freq, density_sum, density_sq_sum in self._conn.execute(
+                f"SELECT term, doc_freq, density_sum, density_sq_sum FROM terms WHERE term IN ({placeholders})",
+                batch,
+            ):
+                rows[term] = (doc_freq, density_sum, density_sq_sum)
+        return rows
+
+    def _z_scores(self, densities, rows, previous, page_count):
+        """Score every term of a page against the other `page_count` pages as (z-score, mean density) pairs."""
+        scores = {}
+        for term, (_, density) in densities.items():
+            doc_freq, density_sum, density_sq_sum = rows.get(term, (0, 0.0, 0.0))
+            if term in previous:
+                # Leave the page's own earlier version out of its baseline
+                old_density = previous[term][1]
+                doc_freq, density_sum, density_sq_sum = (
+                    doc_freq - 1,
+                    density_sum - old_density,
+                    density_sq_sum - old_density * old_density,
+                )
+
+            if page_count < self.min_pages or doc_freq < self.min_doc_freq:
+                scores[term] = None
+                continue
+
+            mean, std = term_baseline(page_count, doc_freq, density_sum, density_sq_sum)
+            scores[term] = ((density - mean) / max(std, DENSITY_STD_FLOOR), mean)
+
+        return scores
+
+    def score_page(self, densities, page_key=None):
+        """
+        Score a page's {term: (ngram, density)} against the site baseline, then add it to the index.
+        Returns the number of other pages in the baseline and {term: (z-score, mean density)}, with None for terms
+        seen on too few pages (or when the index has too few pages) to have a meaningful baseline.
+        """
+        with self._lock, self._conn:
+            page_count = self.page_count
+            previous = {}
+            unchanged = False
+            blob = encode_densities(densities)
+
+            if page_key is not None:
+                row = self._conn.execute("SELECT densities FROM pages WHERE page_key = ?", (page_key,)).fetchone()
+                if row is not None:
+                    page_count -= 1
+                    previous = decode_densities(row[0])
+                    unchanged = row[0] == blob
+
+            rows = self._lookup(densities)
+            scores = self._z_scores(densities, rows, previous, page_count)
+
+            if previous and unchanged:
+                return page_count, scores
+
+            # Replace the earlier version of the page, dropping terms no other page has any more
+            if previous:
+                self._conn.executemany(
+                    REMOVE_TERM, [(density, density * density, term) for term, (_, density) in previous.items()]
+                )
+                self._conn.executemany(
+                    "DELETE FROM terms WHERE term = ? AND doc_freq <= 0", [(term,) for term in previous]
+                )
+
+            self._conn.executemany(
+                UPSERT_TERM,
+                [(term, ngram, density, density * density) for term, (ngram, density) in densities.items()],
+            )
+            if page_key is not None:
+                self._conn.execute("INSERT OR REPLACE INTO pages (page_key, densities) VALUES (?, ?)", (page_key, blob))
+            self._conn.execute("UPDATE meta SET value = ? WHERE key = 'pages'", (page_count + 1,))
+
+        return page_count, scores
+
+    def baseline(self, term):
+        """Return the document frequency, mean and standard deviation of a term's density, or None."""
+        page_count = self.page_count
+        row = self._lookup([term]).get(term)
+        if row is None or page_count == 0:
+            return None
+
+        mean, std = term_baseline(page_count, *row)
+        return {"doc_freq": row[0], "mean_density": mean, "std_density": std}
+
+    def summary(self, limit=20):
+        """Describe the index and its most widespread terms."""
+        page_count = self.page_count
+        term_count = self._conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0]
+        rows = self._conn.execute(
+            "SELECT term, ngram, doc_freq, density_sum, density_sq_sum FROM terms ORDER BY doc_freq DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+
+        top_terms = []
+        for term, ngram, doc_freq, density_sum, density_sq_sum in rows:
+            mean, std = term_baseline(page_count, doc_freq, density_sum, density_sq_sum)
+            top_terms.append(
+                {
+                    "term": term,
+                    "ngram": ngram,
+                    "doc_freq": doc_freq,
+                    "mean_density_percentage": round(mean * 100, 3),
+                    "std_density_percentage": round(std * 100, 3),
+                }
+            )
+
+        return {"pages": page_count, "terms": term_count, "top_terms": top_terms}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a site-wide term statistics index")
+    parser.add_argument("index", help="Path to the index file built with keyword_stuffing_detection.py --term-index")
+    parser.add_argument("--term", help="Show the baseline of a single word or phrase")
+    parser.add_argument("--top", type=int, default=20, help="Number of most widespread terms to list (default: 20)")
+
+    args = parser.parse_args()
+
+    with TermStatsIndex(args.index) as index:
+        if args.term:
+            result = index.baseline(args.term.lower())
+            if result is None:
+                print(f"Term not found in index: {args.term}")
+                sys.exit(1)
+        else:
+            result = index.summary(args.top)
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Detector Metrics
+Per-phase timings and counters for the detector scripts: how long each phase of a run took and how often it ran,
+with counts such as elements inspected, WebDriver calls and bytes fetched. Results go into the detectors' output
+under `timings` and export as Prometheus text or JSON Lines, which this script aggregates across runs.
+Detectors default to NULL_METRICS, whose spans and counters do nothing, so a run without timings pays one no-op
+method call per phase.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from contextlib import nullcontext
+
+EXPORT_FORMATS = ("jsonl", "prometheus")
+PROMETHEUS_PREFIX = "seo_detector"
+
+
+class Span:
+    """Times one run of a phase and records it on exit, also when the phase raised."""
+
+    __slots__ = ("metrics", "phase", "started_at")
+
+    def __init__(self, metrics, phase):
+        self.metrics = metrics
+        self.phase = phase
+        self.started_at = None
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.metrics.record(self.phase, time.perf_counter() - self.started_at)
+        return False
+
+
+class Metrics:
+    """
+    Durations per phase and counters of one page or run, safe to record from several threads.
+    Phases may nest or overlap, as with two views fetched at once, so their durations need not add up to the
+    elapsed time.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        # Phase -> [calls, total seconds, longest call in seconds], in the order phases first ran
+        self.phases = {}
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def span(self, phase):
+        """Return a context manager timing one run of `phase`."""
+        return Span(self, phase)
+
+    def record(self, phase, seconds, calls=1, longest=None):
+        """Add `calls` runs of `phase` taking `seconds` in all."""
+        longest = seconds if longest is None else longest
+        with self._lock:
+            entry = self.phases.get(phase)
+            if entry is None:
+                self.phases[phase] = [calls, seconds, longest]
+            else:
+                entry[0] += calls
+                entry[1] += seconds
+                entry[2] = max(entry[2], longest)
+
+    def count(self, name, amount=1):
+        """Add `amount` to the counter `name`."""
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def child(self):
+        """Return empty metrics for one page of a batch, to be merged back into these with merge()."""
+        return Metrics()
+
+    def merge(self, other):
+        """Add the phases and counters of `other`."""
+        if not other.enabled:
+            return
+        with other._lock:
+            phases = [(phase, *entry) for phase, entry in other.phases.items()]
+            counts = list(other.counts.items())
+        for phase, calls, seconds, longest in phases:
+            self.record(phase, seconds, calls, longest)
+        for name, amount in counts:
+            self.count(name, amount)
+
+    def snapshot(self):
+        """Return the timings as a JSON-serializable dict."""
+        with self._lock:
+            return {
+                "elapsed_seconds": round(time.perf_counter() - self.started_at, 6),
+                "phases": {
+                    phase: {"calls": calls, "seconds": round(seconds, 6), "max_seconds": round(longest, 6)}
+                    for phase, (calls, seconds, longest) in self.phases.items()
+                },
+                "counts": dict(self.counts),
+            }
+
+
+class NullMetrics:
+    """Stand-in for Metrics when timings are off: nothing is recorded."""
+
+    enabled = False
+    _span = nullcontext()
+
+    def span(self, phase):
+        return self._span
+
+    def record(self, phase, seconds, calls=1, longest=None):
+        pass
+
+    def count(self, name, amount=1):
+        pass
+
+    def child(self):
+        return self
+
+    def merge(self, other):
+        pass
+
+    def snapshot(self):
+        return None
+
+
+NULL_METRICS = NullMetrics()
+
+
+def add_timings(result, metrics, parent=NULL_METRICS):
+    """Add the snapshot of `metrics` to a result dict under `timings` and merge it into `parent`."""
+    if metrics.enabled:
+        result["timings"] = metrics.snapshot()
+        parent.merge(metrics)
+    return result
+
+
+def escape_label_value(value):
+    """Escape a label value for the Prometheus text exposition format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_labels(labels):
+    """Render a label set such as {"detector": "cloaking"} as {detector="cloaking"}."""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in labels.items()) + "}"
+
+
+def prometheus_text(series, prefix=PROMETHEUS_PREFIX):
+    """Render (labels, snapshot) pairs of timings in the Prometheus text exposition format."""
+    lines = [f"# HELP {prefix}_run_seconds Wall-clock seconds of the run", f"# TYPE {prefix}_run_seconds gauge"]
+    for labels, snapshot in series:
+        lines.append(f"{prefix}_run_seconds{prometheus_labels(labels)} {snapshot['elapsed_seconds']}")
+
+    lines.append(f"# HELP {prefix}_phase_seconds Seconds spent in each phase")
+    lines.append(f"# TYPE {prefix}_phase_seconds summary")
+    for labels, snapshot in series:
+        for phase, entry in snapshot["phases"].items():
+            phase_labels = prometheus_labels({**labels, "phase": phase})
+            lines.append(f"{prefix}_phase_seconds_sum{phase_labels} {entry['seconds']}")
+            lines.append(f"{prefix}_phase_seconds_count{phase_labels} {entry['calls']}")
+
+    lines.append(f"# HELP {prefix}_phase_max_seconds Longest single run of each phase")
+    lines.append(f"# TYPE {prefix}_phase_max_seconds gauge")
+    for labels, snapshot in series:
+        for phase, entry in snapshot["phases"].items():
+            phase_labels = prometheus_labels({**labels, "phase": phase})
+            lines.append(f"{prefix}_phase_max_seconds{phase_labels} {entry['max_seconds']}")
+
+    lines.append(f"# HELP {prefix}_events_total Elements inspected, WebDriver calls, bytes fetched and other counts")
+    lines.append(f"# TYPE {prefix}_events_total counter")
+    for labels, snapshot in series:
+        for name, value in snapshot["counts"].items():
+            lines.append(f"{prefix}_events_total{prometheus_labels({**labels, 'event': name})} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def export_metrics(snapshot, path, format="jsonl", labels=None):
+    """
+    Export a timings snapshot to `path`. JSON Lines files get one record appended per run, so runs accumulate;
+    Prometheus text files are replaced whole, as the node exporter's textfile collector expects.
+    """
+    labels = labels or {}
+    if format == "prometheus":
+        # Written under a temporary name, so a collector never reads a half-written file
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(prometheus_text([(labels, snapshot)]))
+        os.replace(temporary, path)
+        return
+
+    record = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"), **labels, **snapshot}
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def aggregate_records(records, key="detector"):
+    """Merge exported JSON Lines records into one snapshot per value of `key`, with the number of runs."""
+    totals = {}
+    for record in records:
+        group = record.get(key, "")
+        total = totals.setdefault(group, {"runs": 0, "elapsed_seconds": 0.0, "phases": {}, "counts": {}})
+        total["runs"] += 1
+        total["elapsed_seconds"] = round(total["elapsed_seconds"] + record.get("elapsed_seconds", 0), 6)
+        for phase, entry in record.get("phases", {}).items():
+            phase_total = total["phases"].setdefault(phase, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0})
+            phase_total["calls"] += entry["calls"]
+            phase_total["seconds"] = round(phase_total["seconds"] + entry["seconds"], 6)
+            phase_total["max_seconds"] = max(phase_total["max_seconds"], entry["max_seconds"])
+        for name, value in record.get("counts", {}).items():
+            total["counts"][name] = total["counts"].get(name, 0) + value
+    return totals
+
+
+def read_records(paths):
+    """Read the records of exported JSON Lines files, skipping blank lines."""
+    records = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    return records
+
+
+def print_aggregate(totals):
+    """Print aggregated timings as a table per group, slowest phases first."""
+    for group, total in totals.items():
+        print(f"{group or '(unlabeled)'}: {total['runs']} run(s), {total['elapsed_seconds']:.3f}s elapsed")
+        print(f"  {'phase':<24} {'calls':>8} {'seconds':>10} {'mean ms':>10} {'max ms':>10}")
+        for phase, entry in sorted(total["phases"].items(), key=lambda item: -item[1]["seconds"]):
+            mean_ms = entry["seconds"] / entry["calls"] * 1000 if entry["calls"] else 0
+            print(
+                f"  {phase:<24} {entry['calls']:>8} {entry['seconds']:>10.3f} {mean_ms:>10.1f} "
+                f"{entry['max_seconds'] * 1000:>10.1f}"
+            )
+        for name, value in total["counts"].items():
+            print(f"  {name}: {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate detector timings exported as JSON Lines")
+    parser.add_argument("files", nargs="+", help="JSON Lines files written with a detector's --metrics-file")
+    parser.add_argument("--group-by", default="detector", help="Record field to aggregate by (default: detector)")
+    parser.add_argument("--prometheus", action="store_true", help="Print the aggregate as Prometheus text")
+    parser.add_argument("--json", action="store_true", help="Print the aggregate as JSON")
+
+    args = parser.parse_args()
+
+    try:
+        totals = aggregate_records(read_records(args.files), args.group_by)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error reading timings: {e}")
+        sys.exit(1)
+
+    if args.prometheus:
+        sys.stdout.write(prometheus_text([({args.group_by: group}, total) for group, total in totals.items()]))
+    elif args.json:
+        print(json.dumps(totals, indent=2))
+    else:
+        print_aggregate(totals)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Load Test
+Drives the fetch paths of the network detectors against the origin simulator from a pool of threads, with the
+regular and Googlebot user agents, and reports throughput, latency percentiles and outcomes per route together with
+the connections the origin accepted, which shows how well each detector reuses its pooled connections.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import logging
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from origin_simulator import RESET_PATH, STATS_PATH, OriginSimulator
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for script_dir in ("cloaking_detection", "sneaky_redirect_detection"):
+    path = os.path.join(SCRIPTS_DIR, script_dir)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from cloaking_detection import DEFAULT_USER_AGENT_GOOGLEBOT, DEFAULT_USER_AGENT_REGULAR, CloakingDetector
+from sneaky_redirect_detection import follow_redirects_with_details, setup_session
+
+logger = logging.getLogger(__name__)
+
+USER_AGENTS = {"regular": DEFAULT_USER_AGENT_REGULAR, "googlebot": DEFAULT_USER_AGENT_GOOGLEBOT}
+
+# Routes fetched round-robin by each detector, mixing the happy paths with the failures they have to survive
+DEFAULT_PATHS = {
+    "redirect": [
+        "/redirect/sneaky",
+        "/chain/5",
+        "/landing",
+        "/flaky",
+        "/redirect/loop/a",
+        "/redirect/no-location",
+        "/unavailable",
+        "/slow",
+        "/reset",
+    ],
+    "cloaking": [
+        "/cloaked",
+        "/same",
+        "/conditional",
+        "/redirect/sneaky",
+        "/large",
+        "/throttled",
+        "/flaky",
+        "/not-found",
+        "/reset-mid-body",
+    ],
+}
+DETECTORS = tuple(DEFAULT_PATHS)
+
+DEFAULT_REQUESTS = 100
+DEFAULT_CONCURRENCY = 8
+DEFAULT_TIMEOUT = 10
+
+# Substrings of the detectors' error messages, mapped to a short outcome label
+ERROR_LABELS = [
+    ("timeout", "timeout"),
+    ("timed out", "timeout"),
+    ("too many", "retries exhausted"),
+    ("Max retries exceeded", "retries exhausted"),
+    ("Connection", "connection error"),
+    ("Exceeded maximum redirects", "redirect limit"),
+    ("missing Location", "missing location"),
+    ("HTTP error: 404", "404"),
+]
+
+
+def percentile(values, fraction):
+    """Return the nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def error_label(error):
+    """Return a short label for a detector error message."""
+    for fragment, label in ERROR_LABELS:
+        if fragment in error:
+            return label
+    return "error"
+
+
+def redirect_fetcher(timeout):
+    """Return a fetch function following redirects as the sneaky redirect detector does, over one shared session."""
+    session = setup_session()
+
+    def fetch(url, user_agent):
+        result = follow_redirects_with_details(session, url, user_agent, timeout=timeout)
+        if result.get("error"):
+            return error_label(result["error"])
+        return f"{result['final_status_code']} after {result['redirect_count']} redirects"
+
+    return fetch, session.close
+
+
+def cloaking_fetcher(timeout, max_retries, per_host_concurrency):
+    """Return a fetch function fetching views as the cloaking detector does, over the detector's pooled session."""
+    detector = CloakingDetector(max_retries=max_retries, per_host_concurrency=per_host_concurrency, timeout=timeout)
+
+    def fetch(url, user_agent):
+        response = detector.fetch_content(url, user_agent)
+        if response["error"]:
+            return error_label(response["error"])
+        return f"{response['status_code']}, {len(response['content']) // 1024} KB"
+
+    return fetch, detector.close
+
+
+def origin_request(base_url, path):
+    """Call an admin endpoint of the simulator; these are not counted in its stats."""
+    response = requests.get(base_url + path, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+def run_detector(name, fetch, base_url, paths, total, concurrency):
+    """Fetch `total` URLs round-robin over paths and user agents, and return the summary of the run."""
+    jobs = [(paths[i % len(paths)], list(USER_AGENTS)[i // len(paths) % len(USER_AGENTS)]) for i in range(total)]
+
+    def timed(job):
+        path, agent = job
+        start = time.perf_counter()
+        try:
+            outcome = fetch(base_url + path, USER_AGENTS[agent])
+        except Exception as e:
+            outcome = f"raised {type(e).__name__}"
+        return path, agent, outcome, time.perf_counter() - start
+
+    origin_request(base_url, RESET_PATH)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, jobs))
+    elapsed = time.perf_counter() - start
+    origin = origin_request(base_url, STATS_PATH)
+
+    durations = [duration for _, _, _, duration in results]
+    routes = defaultdict(lambda: {"durations": [], "outcomes": Counter()})
+    for path, agent, outcome, duration in results:
+        routes[path]["durations"].append(duration)
+        routes[path]["outcomes"][f"{agent}: {outcome}"] += 1
+
+    return {
+        "detector": name,
+        "fetches": total,
+        "seconds": round(elapsed, 3),
+        "fetches_per_second": round(total / elapsed, 2),
+        "p50_ms": round(percentile(durations, 0.5) * 1000, 1),
+        "p99_ms": round(percentile(durations, 0.99) * 1000, 1),
+        "routes": {
+            path: {
+                "fetches": len(route["durations"]),
+                "p50_ms": round(percentile(route["durations"], 0.5) * 1000, 1),
+                "max_ms": round(max(route["durations"]) * 1000, 1),
+                "outcomes": dict(sorted(route["outcomes"].items())),
+            }
+            for path, route in routes.items()
+        },
+        "origin": origin,
+    }
+
+
+def print_report(report):
+    """Print a load test report as tables, one per detector."""
+    print(f"Origin: {report['origin_url']}  concurrency: {report['concurrency']}  timeout: {report['timeout']}s")
+    for summary in report["detectors"]:
+        origin = summary["origin"]
+        print(
+            f"\n{summary['detector']}: {summary['fetches']} fetches in {summary['seconds']:.1f}s "
+            f"({summary['fetches_per_second']:.1f}/s), p50 {summary['p50_ms']:.0f} ms, p99 {summary['p99_ms']:.0f} ms"
+        )
+        print(
+            f"origin: {origin['requests']} requests over {origin['connections']} connections "
+            f"({origin['requests_per_connection']} per connection), {origin['bytes_sent'] / 1024:.0f} KB sent, "
+            f"{origin['resets']} resets"
+        )
+        print(f"{'route':<24} {'p50 ms':>8} {'max ms':>8}  outcomes")
+        for path, route in summary["routes"].items():
+            outcomes = ", ".join(f"{outcome} x{count}" for outcome, count in route["outcomes"].items())
+            print(f"{path:<24} {route['p50_ms']:>8.0f} {route['max_ms']:>8.0f}  {outcomes}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the network detectors against the origin simulator")
+    parser.add_argument("--detectors", nargs="+", choices=DETECTORS, default=list(DETECTORS), help="Detectors to run")
+    parser.add_argument("--origin-url", help="Base URL of a running simulator (default: start one in process)")
+    parser.add_argument(
+        "--requests", type=int, default=DEFAULT_REQUESTS, help=f"Fetches per detector (default: {DEFAULT_REQUESTS})"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Fetching threads (default: {DEFAULT_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help=f"Request timeout in seconds (default: {DEFAULT_TIMEOUT})",
+    )
+    parser.add_argument("--max-retries", type=int, default=3, help="Retries of the cloaking detector (default: 3)")
+    parser.add_argument(
+        "--per-host-concurrency", type=int, default=2, help="Pooled connections of the cloaking detector (default: 2)"
+    )
+    parser.add_argument("--latency", type=float, default=0.0, help="Latency of the in-process simulator in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Latency jitter of the in-process simulator")
+    parser.add_argument("--bandwidth", type=int, help="Bandwidth of the in-process simulator in bytes per second")
+    parser.add_argument("--output", help="Also write the report to a JSON file")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    args = parser.parse_args()
+
+    # The detectors log every hop, retry and failure; the outcomes are reported per route instead
+    logging.disable(logging.ERROR)
+
+    simulator = None
+    if args.origin_url:
+        base_url = args.origin_url.rstrip("/")
+    else:
+        simulator = OriginSimulator(latency=args.latency, jitter=args.jitter, bandwidth=args.bandwidth).start()
+        base_url = simulator.base_url
+
+    fetchers = {
+        "redirect": lambda: redirect_fetcher(args.timeout),
+        "cloaking": lambda: cloaking_fetcher(args.timeout, args.max_retries, args.per_host_concurrency),
+    }
+    report = {"origin_url": base_url, "concurrency": args.concurrency, "timeout": args.timeout, "detectors": []}
+    try:
+        for name in args.detectors:
+            fetch, close = fetchers[name]()
+            try:
+                report["detectors"].append(
+                    run_detector(name, fetch, base_url, DEFAULT_PATHS[name], args.requests, args.concurrency)
+                )
+            finally:
+                close()
+    except requests.RequestException as e:
+        print(f"Error reaching the origin simulator: {e}")
+        sys.exit(1)
+    finally:
+        if simulator is not None:
+            simulator.stop()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Origin Simulator
+Local HTTP origin serving scripted scenarios, to exercise the network detectors offline and reproducibly: user-agent
+dependent redirect chains, cloaked bodies, 503s with Retry-After, slow and throttled responses, large bodies and
+connection resets. Latency and bandwidth are injected globally or per response, and the requests and connections
+served are counted at /__stats.
+"""
+
+import sys
+import json
+import time
+import random
+import socket
+import struct
+import hashlib
+import argparse
+import logging
+import threading
+from collections import Counter
+from urllib.parse import urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8800
+STATS_PATH = "/__stats"
+RESET_PATH = "/__reset"
+# Throttled bodies are written in slices of this many seconds' worth of bandwidth
+THROTTLE_INTERVAL = 0.05
+RESET_POINTS = ("before_response", "after_headers", "mid_body")
+CHAIN_LENGTH = 10
+
+REGULAR_BODY = (
+    "<html><head><title>Fresh Coffee Roasters</title></head><body><h1>Fresh Coffee Roasters</h1>"
+    "<p>We roast small batches of single origin coffee every morning and ship them the same day.</p>"
+    "<p>Browse our seasonal beans, brewing guides and subscription plans.</p></body></html>"
+)
+CLOAKED_BODY = (
+    "<html><head><title>Cheap Coffee Best Coffee Buy Coffee Online</title></head><body>"
+    "<h1>Cheap coffee best coffee buy coffee online</h1>"
+    + "<p>cheap coffee best coffee buy coffee online coffee deals coffee discount coffee sale</p>" * 20
+    + "</body></html>"
+)
+CRAWLER_LANDING_BODY = (
+    "<html><head><title>Coffee Deals</title></head><body><h1>Coffee deals for crawlers</h1>"
+    "<p>Affiliate offers and partner links only shown to search engines.</p></body></html>"
+)
+
+
+def page(title):
+    """Return a small HTML page."""
+    return f"<html><head><title>{title}</title></head><body><h1>{title}</h1><p>{title} content.</p></body></html>"
+
+
+def chain_routes(length):
+    """Return routes /chain/<n> redirecting to /chain/<n - 1>, down to /chain/0 which serves a page."""
+    routes = {"/chain/0": {"responses": [{"body": page("End of chain")}]}}
+    for hops in range(1, length + 1):
+        routes[f"/chain/{hops}"] = {
+            "responses": [{"status": 301 if hops % 2 else 302, "location": f"/chain/{hops - 1}"}]
+        }
+    return routes
+
+
+# Route path -> {"responses": [...]}; the first response whose "when" conditions hold is served
+DEFAULT_SCENARIOS = {
+    "/": {"responses": [{"body": page("Origin simulator")}]},
+    "/ok": {"responses": [{"body": REGULAR_BODY}]},
+    "/same": {"responses": [{"body": REGULAR_BODY}]},
+    "/cloaked": {
+        "responses": [
+            {"when": {"user_agent": "googlebot"}, "body": CLOAKED_BODY},
+            {"body": REGULAR_BODY},
+        ]
+    },
+    "/conditional": {"responses": [{"body": REGULAR_BODY, "etag": True}]},
+    "/redirect/sneaky": {
+        "responses": [
+            {"when": {"user_agent": "googlebot"}, "status": 301, "location": "/landing/crawler"},
+            {"status": 301, "location": "/redirect/sneaky/step"},
+        ]
+    },
+    "/redirect/sneaky/step": {"responses": [{"status": 302, "location": "/landing"}]},
+    "/landing": {"responses": [{"body": REGULAR_BODY}]},
+    "/landing/crawler": {"responses": [{"body": CRAWLER_LANDING_BODY}]},
+    "/redirect/loop/a": {"responses": [{"status": 302, "location": "/redirect/loop/b"}]},
+    "/redirect/loop/b": {"responses": [{"status": 302, "location": "/redirect/loop/a"}]},
+    "/redirect/no-location": {"responses": [{"status": 302}]},
+    "/unavailable": {"responses": [{"status": 503, "retry_after": 1, "body": page("Service unavailable")}]},
+    "/flaky": {
+        "responses": [
+            {"when": {"first": 2}, "status": 503, "retry_after": 1, "body": page("Service unavailable")},
+            {"body": REGULAR_BODY},
+        ]
+    },
+    "/not-found": {"responses": [{"status": 404, "body": page("Not found")}]},
+    "/slow": {"responses": [{"delay": 3, "body": REGULAR_BODY}]},
+    "/hang": {"responses": [{"delay": 120, "body": REGULAR_BODY}]},
+    "/large": {"responses": [{"body_size": 5 * 1024 * 1024}]},
+    "/throttled": {"responses": [{"body_size": 256 * 1024, "bandwidth": 64 * 1024}]},
+    "/reset": {"responses": [{"reset": "before_response"}]},
+    "/reset-after-headers": {"responses": [{"body": REGULAR_BODY, "reset": "after_headers"}]},
+    "/reset-mid-body": {"responses": [{"body_size": 100 * 1024, "reset": "mid_body"}]},
+    **chain_routes(CHAIN_LENGTH),
+}
+
+
+def filler_body(size):
+    """Return a deterministic HTML body of exactly `size` bytes."""
+    head = b"<html><head><title>Large page</title></head><body>\n"
+    tail = b"</body></html>\n"
+    paragraph = b"<p>Fresh roasted coffee beans shipped daily from our roastery to your door.</p>\n"
+    content = head + paragraph * (size // len(paragraph) + 1)
+    if size < len(head) + len(tail):
+        return content[:size]
+    return content[: size - len(tail)] + tail
+
+
+def validate_scenarios(scenarios):
+    """Raise ValueError when a scenario definition is malformed."""
+    for path, route in scenarios.items():
+        if not path.startswith("/"):
+            raise ValueError(f"Route {path!r} must start with /")
+        if not route.get("responses"):
+            raise ValueError(f"Route {path} has no responses")
+        for response in route["responses"]:
+            if response.get("reset") not in (None, *RESET_POINTS):
+                raise ValueError(f"Route {path}: reset must be one of {', '.join(RESET_POINTS)}")
+            unknown = set(response.get("when", {})) - {"user_agent", "first"}
+            if unknown:
+                raise ValueError(f"Route {path}: unknown conditions {', '.join(sorted(unknown))}")
+
+
+class SimulatorServer(ThreadingHTTPServer):
+    """Threading HTTP server that does not report clients dropping their connection."""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients that time out or reset their connection are expected under load, only report other errors
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            logger.debug(f"{client_address[0]}:{client_address[1]} closed the connection")
+            return
+        super().handle_error(request, client_address)
+
+
+class OriginSimulator:
+    """
+    Scripted HTTP origin on a local port, served from a background thread.
+    Responses are delayed by `latency` seconds plus up to `jitter` seconds, and bodies are throttled to `bandwidth`
+    bytes per second, unless a response sets its own delay or bandwidth. Connections are kept alive, so a client
+    reusing its connections shows fewer connections than requests in stats().
+    """
+
+    def __init__(self, scenarios=None, host=DEFAULT_HOST, port=0, latency=0.0, jitter=0.0, bandwidth=None, seed=0):
+        self.scenarios = DEFAULT_SCENARIOS if scenarios is None else scenarios
+        validate_scenarios(self.scenarios)
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._bodies = {}
+        self._server = None
+        self._thread = None
+        self.reset()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _bind(self):
+        self._server = SimulatorServer((self.host, self.port), SimulatorHandler)
+        self._server.simulator = self
+        self.port = self._server.server_address[1]
+
+    def start(self):
+        """Start serving in a background thread, on an ephemeral port when `port` is 0."""
+        self._bind()
+        self._thread = threading.Thread(target=self._server.serve_forever, name="origin-simulator", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve in the calling thread until interrupted."""
+        self._bind()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def url(self, path):
+        return self.base_url + path
+
+    def reset(self):
+        """Clear the counters, including the per-route request counts that "first" conditions look at."""
+        with self._lock:
+            self._connections = 0
+            self._requests = 0
+            self._bytes_sent = 0
+            self._resets = 0
+            self._statuses = Counter()
+            self._routes = Counter()
+
+    def stats(self):
+        """Return the requests, connections, bytes and resets served since the last reset."""
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "connections": self._connections,
+                "requests_per_connection": round(self._requests / self._connections, 2) if self._connections else None,
+                "bytes_sent": self._bytes_sent,
+                "resets": self._resets,
+                "statuses": {str(status): count for status, count in sorted(self._statuses.items())},
+                "routes": dict(self._routes.most_common()),
+            }
+
+    def count_connection(self):
+        with self._lock:
+            self._connections += 1
+
+    def count_response(self, status, bytes_sent, reset):
+        with self._lock:
+            if status is not None:
+                self._statuses[status] += 1
+            self._bytes_sent += bytes_sent
+            self._resets += int(reset)
+
+    def select(self, path, user_agent):
+        """Return the response a request for `path` gets, or None for an unknown route, counting the request."""
+        route = self.scenarios.get(path)
+        with self._lock:
+            self._requests += 1
+            if route is None:
+                return None
+            self._routes[path] += 1
+            seen = self._routes[path]
+
+        for response in route["responses"]:
+            when = response.get("when", {})
+            if "user_agent" in when and when["user_agent"].lower() not in user_agent.lower():
+                continue
+            if "first" in when and seen > when["first"]:
+                continue
+            return response
+        return None
+
+    def delay(self, response):
+        """Seconds to wait before answering with `response`."""
+        if "delay" in response:
+            return response["delay"]
+        if not self.jitter:
+            return self.latency
+        with self._lock:
+            return self.latency + self._random.uniform(0, self.jitter)
+
+    def body(self, response):
+        """Return the encoded body of a response, generating and keeping sized bodies once."""
+        if "body_size" in response:
+            size = response["body_size"]
+            if size not in self._bodies:
+                self._bodies[size] = filler_body(size)
+            return self._bodies[size]
+        return response.get("body", "").encode("utf-8")
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "OriginSimulator/1.0"
+    # Headers and body are separate writes; with Nagle's algorithm the body would wait for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.connection_counted = False
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def respond(self, send_body):
+        simulator = self.server.simulator
+        path = urlsplit(self.path).path
+        if path in (STATS_PATH, RESET_PATH):
+            if path == RESET_PATH:
+                simulator.reset()
+            self.send_json(simulator.stats(), send_body)
+            return
+
+        if not self.connection_counted:
+            self.connection_counted = True
+            simulator.count_connection()
+
+        response = simulator.select(path, self.headers.get("User-Agent", ""))
+        if response is None:
+            response = {"status": 404, "body": f"No scenario response for {path}\n"}
+
+        bytes_sent = 0
+        status = None
+        reset = response.get("reset")
+        try:
+            time.sleep(simulator.delay(response))
+            if reset == "before_response":
+                self.reset_connection()
+                return
+
+            status, body, headers = self.build_response(response)
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            if reset == "after_headers":
+                self.reset_connection()
+                return
+
+            if send_body and body:
+                if reset == "mid_body":
+                    body = body[: len(body) // 2]
+                bytes_sent = self.write_body(body, response.get("bandwidth", simulator.bandwidth))
+                if reset == "mid_body":
+                    self.reset_connection()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up first, typically on its timeout
+            self.close_connection = True
+        finally:
+            simulator.count_response(status, bytes_sent, reset is not None)
+
+    def build_response(self, response):
+        """Return the status, body and headers of a scripted response, answering conditional requests."""
+        status = response.get("status", 200)
+        body = self.server.simulator.body(response)
+        headers = {"Content-Type": response.get("content_type", "text/html; charset=utf-8")}
+        if "location" in response:
+            headers["Location"] = response["location"]
+        if "retry_after" in response:
+            headers["Retry-After"] = str(response["retry_after"])
+        if response.get("etag"):
+            etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+            headers["ETag"] = etag
+            if self.headers.get("If-None-Match") == etag:
+                status, body = 304, b""
+        headers.update(response.get("headers", {}))
+        headers["Content-Length"] = str(len(body))
+        return status, body, headers
+
+    def write_body(self, body, bandwidth):
+        """Write a body, paced to `bandwidth` bytes per second when set, and return the bytes written."""
+        if not bandwidth:
+            self.wfile.write(body)
+            return len(body)
+
+        slice_size = max(1, int(bandwidth * THROTTLE_INTERVAL))
+        started_at = time.perf_counter()
+        for start in range(0, len(body), slice_size):
+            self.wfile.write(body[start : start + slice_size])
+            ahead = (start + slice_size) / bandwidth - (time.perf_counter() - started_at)
+            if ahead > 0:
+                time.sleep(ahead)
+        return len(body)
+
+    def reset_connection(self):
+        """Abort the connection with a TCP reset instead of an orderly close."""
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        self.connection.close()
+        self.close_connection = True
+
+    def send_json(self, data, send_body=True):
+        body = json.dumps(data, indent=2).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+def describe_response(response):
+    """Summarize a scripted response on one line."""
+    parts = [str(response.get("status", 200))]
+    for key in ("location", "retry_after", "delay", "body_size", "bandwidth", "reset"):
+        if key in response:
+            parts.append(f"{key}={response[key]}")
+    if response.get("etag"):
+        parts.append("etag")
+    if response.get("when"):
+        parts.append("when " + ", ".join(f"{key}={value}" for key, value in response["when"].items()))
+    return " ".join(parts)
+
+
+def load_scenarios(path):
+    """Return the built-in scenarios with the routes of a JSON scenario file added or replaced."""
+    with open(path, "r", encoding="utf-8") as f:
+        return {**DEFAULT_SCENARIOS, **json.load(f)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve scripted HTTP scenarios for testing the network detectors")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--scenarios", help="JSON file of routes to add to or replace the built-in ones")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added before every response (default: 0)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra latency of up to this many seconds")
+    parser.add_argument("--bandwidth", type=int, help="Throttle bodies to this many bytes per second")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the latency jitter (default: 0)")
+    parser.add_argument("--list", action="store_true", help="Print the routes and exit")
+
+    args = parser.parse_args()
+
+    try:
+        scenarios = load_scenarios(args.scenarios) if args.scenarios else DEFAULT_SCENARIOS
+        simulator = OriginSimulator(
+            scenarios, args.host, args.port, args.latency, args.jitter, args.bandwidth, args.seed
+        )
+    except (OSError, ValueError) as e:
+        print(f"Error loading scenarios: {e}")
+        sys.exit(1)
+
+    if args.list:
+        for path, route in scenarios.items():
+            print(f"{path:<24} {' | '.join(describe_response(response) for response in route['responses'])}")
+        return
+
+    logger.info(f"Serving {len(scenarios)} routes on http://{args.host}:{args.port}, stats at {STATS_PATH}")
+    try:
+        simulator.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Error starting server: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
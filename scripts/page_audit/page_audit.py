@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Page Audit Script
+Parses a page once into a shared document model and runs every applicable spam detector over it,
+producing one combined report with a section per detector.
+"""
+
+import os
+import sys
+import json
+import argparse
+import asyncio
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup, Tag
+
+# The detectors live in sibling script directories
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for detector_dir in ("keyword_stuffing_detection", "hidden_text_detection", "cloaking_detection"):
+    detector_path = os.path.join(SCRIPTS_DIR, detector_dir)
+    if detector_path not in sys.path:
+        sys.path.insert(0, detector_path)
+
+from keyword_stuffing_detection import analyze_text_for_keyword_stuffing, read_urls_file  # noqa: E402
+from hidden_text_detection import (  # noqa: E402
+    analyze_soup_for_hidden_text,
+    http_stylesheet_loader,
+    local_stylesheet_loader,
+)
+from cloaking_detection import (  # noqa: E402
+    DEFAULT_SHINGLE_SIZE,
+    DEFAULT_USER_AGENT_GOOGLEBOT,
+    DEFAULT_USER_AGENT_REGULAR,
+    SIMILARITY_THRESHOLDS,
+    CloakingDetector,
+    HostPolicy,
+)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Elements whose text is never visible. Keyword stuffing drops script/style/meta/noscript and cloaking also
+# drops link, which is a void element with no text, so one traversal serves both detectors.
+INVISIBLE_TAGS = {"script", "style", "meta", "link", "noscript"}
+
+DETECTORS = ("keyword_stuffing", "hidden_text", "cloaking")
+
+
+class PageDocument:
+    """
+    A page parsed once with html.parser, with the text views the detectors share.
+    Text views are collected without mutating the tree, so every detector sees the same parse. They match the text
+    of either text_extraction backend, whose lxml path only takes markup html.parser reads the same way.
+    """
+
+    def __init__(self, html_content):
+        self.html = html_content
+        self.soup = BeautifulSoup(html_content, "html.parser")
+        self._raw_texts = None
+
+    def _collect_raw_texts(self):
+        """Walk the tree once and return the raw whole-document and body texts."""
+        soup = self.soup
+        types = soup.interesting_string_types or Tag.MAIN_CONTENT_STRING_TYPES
+        parts = []
+        body, body_start, body_end = None, None, None
+
+        # Same result as decomposing INVISIBLE_TAGS and calling get_text(), on the document and on its first <body>
+        stack = [(soup, iter(soup.contents))]
+        while stack:
+            tag, children = stack[-1]
+            for node in children:
+                if isinstance(node, Tag):
+                    if node.name in INVISIBLE_TAGS:
+                        continue
+                    if body is None and node.name == "body":
+                        body, body_start = node, len(parts)
+                    stack.append((node, iter(node.contents)))
+                    break
+                if type(node) is types if isinstance(types, type) else type(node) in types:
+                    parts.append(node)
+            else:
+                stack.pop()
+                if tag is body:
+                    body_end = len(parts)
+
+        document_text = "".join(parts)
+        body_text = "".join(parts[body_start:body_end]) if body is not None else document_text
+        return document_text, body_text
+
+    @property
+    def document_text(self):
+        """Raw text of the whole document without invisible elements."""
+        if self._raw_texts is None:
+            self._raw_texts = self._collect_raw_texts()
+        return self._raw_texts[0]
+
+    @property
+    def body_text(self):
+        """Raw text of the first <body>, or of the whole document when there is none."""
+        if self._raw_texts is None:
+            self._raw_texts = self._collect_raw_texts()
+        return self._raw_texts[1]
+
+
+def section_status(name, section):
+    """Return pass, fail, error, needs_rendering or skipped for one detector section of the report."""
+    if section.get("status") == "skipped":
+        return "skipped"
+
+    if name == "cloaking":
+        if section.get("error"):
+            return "error"
+        return "fail" if section["analysis"]["cloaking_detected"] else "pass"
+
+    if section.get("status") != "success":
+        return "error"
+    if not section.get("passed"):
+        return "fail"
+    # Static hidden text analysis found nothing, but could not rule hidden text out without a browser
+    return "needs_rendering" if section.get("needs_rendering") else "pass"
+
+
+def build_report(sections, url=None):
+    """Combine the per-detector sections into one report."""
+    checks = {name: section_status(name, section) for name, section in sections.items()}
+    failed = [name for name, status in checks.items() if status == "fail"]
+    errors = [name for name, status in checks.items() if status == "error"]
+    undecided = [name for name, status in checks.items() if status == "needs_rendering"]
+
+    if failed:
+        message = f"Failed checks: {', '.join(failed)}."
+    elif errors:
+        message = f"Checks with errors: {', '.join(errors)}."
+    elif undecided:
+        message = f"Checks that need a rendered page to decide: {', '.join(undecided)}."
+    else:
+        message = "All applicable checks passed."
+
+    report = {"status": "success", "passed": not failed and not errors and not undecided}
+    if url:
+        report["url"] = url
+    report.update({"checks": checks, "failed_checks": failed, "detectors": sections, "message": message})
+    return report
+
+
+def audit_document(document, density_threshold=0.05, stylesheet_loader=None, base_url=None):
+    """
+    Run the detectors that only need the page itself over a parsed document.
+    Linked stylesheets are read with `stylesheet_loader`, references resolved against `base_url`.
+    """
+    visible_text = re.sub(r"\s+", " ", document.body_text).strip()
+
+    return {
+        "keyword_stuffing": analyze_text_for_keyword_stuffing(visible_text, density_threshold),
+        "hidden_text": analyze_soup_for_hidden_text(document.soup, stylesheet_loader, base_url),
+    }
+
+
+def audit_html(html_content, density_threshold=0.05, stylesheet_loader=None, base_url=None):
+    """Audit HTML content. Cloaking needs both crawler views of a URL, so it is skipped."""
+    try:
+        document = PageDocument(html_content)
+    except Exception as e:
+        logger.error(f"Error parsing HTML: {e}")
+        return {"status": "error", "passed": False, "message": f"Failed to parse HTML: {str(e)}"}
+
+    sections = audit_document(document, density_threshold, stylesheet_loader, base_url)
+    sections["cloaking"] = {"status": "skipped", "message": "Cloaking detection needs a URL to fetch both views"}
+
+    return build_report(sections)
+
+
+def audit_fetched_views(detector, results, regular_response, googlebot_response, density_threshold=0.05):
+    """Audit the regular view of a URL, comparing it with the Googlebot view for cloaking."""
+    try:
+        document = PageDocument(regular_response["content"])
+    except Exception as e:
+        logger.error(f"Error parsing HTML from {results['url']}: {e}")
+        return {"status": "error", "passed": False, "url": results["url"], "message": f"Failed to parse HTML: {e}"}
+
+    # Stylesheets are fetched through the detector's pooled session and resolved against the final URL
+    loader = http_stylesheet_loader(detector.session, detector.timeout)
+    sections = audit_document(document, density_threshold, loader, regular_response.get("final_url") or results["url"])
+
+    if results.get("error"):
+        sections["cloaking"] = results
+    else:
+        # The regular view was already parsed for the other detectors, only the Googlebot view needs its own parse
+        regular_text = detector.summarize_text(document.document_text)
+        sections["cloaking"] = detector.compare_views(
+            results, regular_response, googlebot_response, regular_text=regular_text
+        )
+
+    return build_report(sections, results["url"])
+
+
+async def audit_url_async(
+    detector,
+    url,
+    density_threshold=0.05,
+    user_agent_regular=None,
+    user_agent_googlebot=None,
+    policy=None,
+    executor=None,
+):
+    """Fetch both views of a URL concurrently and audit them."""
+    results, regular_response, googlebot_response = await detector.fetch_views_async(
+        url, user_agent_regular, user_agent_googlebot, policy=policy, executor=executor
+    )
+
+    if regular_response.get("error"):
+        return {"status": "error", "passed": False, "url": url, "message": results["error"]}
+
+    # Parsing is CPU bound, keep it off the event loop so other fetches keep flowing
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor, audit_fetched_views, detector, results, regular_response, googlebot_response, density_threshold
+    )
+
+
+async def run_url_audits(detector, urls, density_threshold=0.05, user_agent_regular=None, user_agent_googlebot=None):
+    """Audit many URLs concurrently under the detector's per-host politeness policy."""
+    policy = HostPolicy(detector.per_host_concurrency, detector.request_delay)
+    limit = asyncio.Semaphore(detector.max_concurrency)
+
+    # Each URL fetches two views at once, so size the pool for both
+    with ThreadPoolExecutor(max_workers=detector.max_concurrency * 2) as executor:
+
+        async def run_one(url):
+            async with limit:
+                return await audit_url_async(
+                    detector, url, density_threshold, user_agent_regular, user_agent_googlebot, policy, executor
+                )
+
+        return await asyncio.gather(*(run_one(url) for url in urls))
+
+
+def audit_urls(urls, density_threshold=0.05, detector=None, user_agent_regular=None, user_agent_googlebot=None):
+    """Audit URLs and return one report per URL, in the same order as `urls`."""
+    own_detector = detector is None
+    if own_detector:
+        detector = CloakingDetector()
+
+    try:
+        return asyncio.run(run_url_audits(detector, urls, density_threshold, user_agent_regular, user_agent_googlebot))
+    finally:
+        if own_detector:
+            detector.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit a page with every spam detector from a single parse")
+    parser.add_argument("--url", help="URL to audit")
+    parser.add_argument("--urls-file", help="Path to a file with one URL per line to audit in batch")
+    parser.add_argument("--html", help="HTML content string to audit")
+    parser.add_argument("--html-file", help="Path to a local .html file to audit")
+    parser.add_argument(
+        "--threshold", type=float, default=0.05, help="Keyword density threshold (0-1, default: 0.05 = 5%%)"
+    )
+    parser.add_argument(
+        "--similarity-threshold",
+        type=float,
+        default=SIMILARITY_THRESHOLDS[DEFAULT_SHINGLE_SIZE],
+        help=f"Minimum cloaking content similarity (default: {SIMILARITY_THRESHOLDS[DEFAULT_SHINGLE_SIZE]})",
+    )
+    parser.add_argument("--user-agent-regular", default=DEFAULT_USER_AGENT_REGULAR, help="User agent for regular users")
+    parser.add_argument("--user-agent-googlebot", default=DEFAULT_USER_AGENT_GOOGLEBOT, help="User agent for Googlebot")
+    parser.add_argument(
+        "--request-delay",
+        type=float,
+        default=2,
+        help="Minimum average delay in seconds between requests to the same host (default: 2)",
+    )
+    parser.add_argument(
+        "--max-concurrency", type=int, default=20, help="Maximum number of URLs audited at the same time (default: 20)"
+    )
+    parser.add_argument(
+        "--per-host-concurrency", type=int, default=2, help="Maximum requests in flight to a single host (default: 2)"
+    )
+    parser.add_argument("--output", help="Output file for results", default="page_audit_results.json")
+
+    args = parser.parse_args()
+
+    # Validate thresholds
+    if not 0 < args.threshold <= 1:
+        print("Error: Threshold must be between 0 and 1")
+        sys.exit(1)
+    if not 0 <= args.similarity_threshold <= 1:
+        print("Error: Similarity threshold must be between 0 and 1")
+        sys.exit(1)
+
+    if args.url or args.urls_file:
+        if args.url:
+            urls = [args.url]
+        else:
+            try:
+                urls = read_urls_file(args.urls_file)
+            except Exception as e:
+                print(f"Error reading URLs file: {e}")
+                sys.exit(1)
+
+        invalid_urls = [url for url in urls if not urlparse(url).scheme or not urlparse(url).netloc]
+        if invalid_urls:
+            print(f"Error: Invalid URL: {invalid_urls[0]}. Please provide a complete URL with http:// or https://")
+            sys.exit(1)
+
+        detector = CloakingDetector(
+            similarity_threshold=args.similarity_threshold,
+            request_delay=args.request_delay,
+            max_concurrency=args.max_concurrency,
+            per_host_concurrency=args.per_host_concurrency,
+        )
+        reports = audit_urls(urls, args.threshold, detector, args.user_agent_regular, args.user_agent_googlebot)
+        detector.close()
+
+        if args.url:
+            result = reports[0]
+        else:
+            failed = [r for r in reports if not r.get("passed", False)]
+            result = {
+                "status": "success",
+                "passed": not failed,
+                "urls_count": len(reports),
+                "failed_count": len(failed),
+                "results": reports,
+                "message": f"{len(failed)} of {len(reports)} URL(s) failed the page audit.",
+            }
+    elif args.html:
+        # Stylesheets linked from the HTML resolve against the current directory
+        result = audit_html(args.html, args.threshold, local_stylesheet_loader, os.path.join(os.getcwd(), ""))
+    elif args.html_file:
+        try:
+            with open(args.html_file, "r", encoding="utf-8") as f:
+                html_content = f.read()
+        except Exception as e:
+            print(f"Error reading HTML file: {e}")
+            sys.exit(1)
+        result = audit_html(html_content, args.threshold, local_stylesheet_loader, os.path.abspath(args.html_file))
+    else:
+        print("Error: Must provide either --url, --urls-file, --html, or --html-file parameter")
+        sys.exit(1)
+
+    # Output results
+    print(json.dumps(result, indent=2))
+
+    # Save to file if specified
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    # Exit with appropriate code
+    sys.exit(0 if result.get("passed", False) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark loading the rule catalog from JSON against the compiled catalog.
+The catalog is replicated into synthetic catalogs of increasing size, each compiled once. Reports the time to parse
+the JSON, to open the compiled artifact and fetch one rule, one scope or every rule, and the one-off compile time.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+from compiled_catalog import CATALOG_PATH, CompiledCatalog
+
+DEFAULT_SCALES = [1, 4, 16]
+DEFAULT_REPEATS = 7
+
+
+def scaled_catalog(rules, scale):
+    """Return `scale` copies of the catalog's rules, the copies' ids suffixed to keep them distinct."""
+    scaled = list(rules)
+    for copy in range(1, scale):
+        scaled += [dict(rule, id=f"{rule['id']}_{copy}") for rule in rules]
+    return scaled
+
+
+def median_seconds(function, repeats):
+    """Return the median wall time of `repeats` calls of `function`."""
+    samples = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started_at)
+    return statistics.median(samples)
+
+
+def load_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def open_and(path, lookup):
+    """Open a compiled catalog, run `lookup` on it and close it."""
+    with CompiledCatalog(path) as catalog:
+        return lookup(catalog)
+
+
+def run_benchmark(scales, repeats=DEFAULT_REPEATS, catalog_path=CATALOG_PATH, rule_id="TITLE_ELEMENT_PRESENT"):
+    """Time JSON and compiled catalog loads for each scale of the catalog."""
+    rules = load_json(catalog_path)
+    results = {"rules": len(rules), "repeats": repeats, "rule_id": rule_id, "scales": []}
+
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in scales:
+            path = os.path.join(directory, f"seo_rules_x{scale}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(scaled_catalog(rules, scale), f, indent=2)
+
+            started_at = time.perf_counter()
+            with CompiledCatalog(path) as catalog:
+                rule_count = len(catalog)
+            compile_seconds = time.perf_counter() - started_at
+
+            timings = {
+                "json_load": median_seconds(lambda: load_json(path), repeats),
+                "open": median_seconds(lambda: open_and(path, len), repeats),
+                "single_rule": median_seconds(lambda: open_and(path, lambda c: c.get(rule_id)), repeats),
+                "html_rules": median_seconds(lambda: open_and(path, lambda c: c.applicable({"html", "url"})), repeats),
+                "all_rules": median_seconds(lambda: open_and(path, CompiledCatalog.rules), repeats),
+            }
+            results["scales"].append(
+                {
+                    "scale": scale,
+                    "rules": rule_count,
+                    "json_bytes": os.path.getsize(path),
+                    "artifact_bytes": os.path.getsize(catalog.path),
+                    "compile_ms": round(compile_seconds * 1000, 2),
+                    **{f"{name}_ms": round(seconds * 1000, 3) for name, seconds in timings.items()},
+                }
+            )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON and compiled rule catalog load times")
+    parser.add_argument(
+        "--scales",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SCALES,
+        help=f"Catalog size multiples to benchmark (default: {' '.join(map(str, DEFAULT_SCALES))})",
+    )
+    parser.add_argument(
+        "--repeats", type=int, default=DEFAULT_REPEATS, help=f"Timed runs per measurement (default: {DEFAULT_REPEATS})"
+    )
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="Path to the rule catalog to replicate")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON instead of a table")
+
+    args = parser.parse_args()
+
+    results = run_benchmark(args.scales, args.repeats, args.catalog)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{results['rules']} catalog rules, median of {results['repeats']} runs, times in ms")
+    print()
+    print(
+        f"{'scale':>5}  {'rules':>6}  {'json MB':>7}  {'db MB':>6}  {'compile':>8}  {'json load':>9}  {'open':>6}  "
+        f"{'1 rule':>6}  {'html rules':>10}  {'all rules':>9}"
+    )
+    for r in results["scales"]:
+        print(
+            f"{r['scale']:>5}  {r['rules']:>6}  {r['json_bytes'] / 1e6:>7.2f}  {r['artifact_bytes'] / 1e6:>6.2f}  "
+            f"{r['compile_ms']:>8.1f}  {r['json_load_ms']:>9.2f}  {r['open_ms']:>6.2f}  {r['single_rule_ms']:>6.2f}  "
+            f"{r['html_rules_ms']:>10.2f}  {r['all_rules_ms']:>9.2f}"
+        )
+
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Compiled Rule Catalog
+Indexed SQLite form of references/seo_rules.json, rebuilt when the JSON changes. Rules load lazily by id, scope or
+input field, so a tool that needs a handful of rules does not pay for parsing the whole catalog.
+"""
+
+import os
+import sys
+import json
+import marshal
+import hashlib
+import sqlite3
+import argparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+CATALOG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "references", "seo_rules.json"
+)
+# Bump when the schema or the body encoding changes, older artifacts are then rebuilt
+FORMAT_VERSION = 1
+# marshal's format belongs to the interpreter, an artifact written by another Python version is rebuilt
+BODY_ENCODING = f"marshal-{marshal.version}-py{sys.version_info[0]}.{sys.version_info[1]}"
+# SQLite limits the number of bound parameters per statement
+LOOKUP_BATCH_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rules (
+    position INTEGER PRIMARY KEY,
+    id TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    required TEXT NOT NULL,
+    body BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rules_id ON rules (id);
+CREATE INDEX IF NOT EXISTS rules_scope ON rules (scope);
+CREATE TABLE IF NOT EXISTS rule_inputs (
+    input TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    required INTEGER NOT NULL,
+    PRIMARY KEY (input, position)
+) WITHOUT ROWID;
+"""
+
+
+def default_artifact_path(source):
+    """Return the compiled artifact path kept next to a catalog file."""
+    return os.path.splitext(source)[0] + ".compiled.db"
+
+
+def encode_rule(rule):
+    """Serialize one rule for the rules table; marshal decodes a few times faster than JSON."""
+    return marshal.dumps(rule)
+
+
+def decode_rule(blob):
+    """Inverse of encode_rule()."""
+    return marshal.loads(blob)
+
+
+def file_sha256(path):
+    """Return the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def required_inputs(rule):
+    """Return the sorted names of a rule's required input fields."""
+    return sorted({field["name"] for field in rule.get("input_fields") or [] if field.get("required")})
+
+
+def write_catalog(conn, rules, source_stat, source_hash):
+    """Fill an empty artifact database with the rules of a catalog."""
+    conn.executescript(SCHEMA)
+    conn.executemany(
+        "INSERT INTO rules (position, id, scope, required, body) VALUES (?, ?, ?, ?, ?)",
+        [
+            (position, rule["id"], rule.get("scope") or "page", ",".join(required_inputs(rule)), encode_rule(rule))
+            for position, rule in enumerate(rules)
+        ],
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO rule_inputs (input, position, required) VALUES (?, ?, ?)",
+        [
+            (field["name"], position, int(bool(field.get("required"))))
+            for position, rule in enumerate(rules)
+            for field in rule.get("input_fields") or []
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO meta (key, value) VALUES (?, ?)",
+        [
+            ("format_version", str(FORMAT_VERSION)),
+            ("body_encoding", BODY_ENCODING),
+            ("source_size", str(source_stat.st_size)),
+            ("source_mtime_ns", str(source_stat.st_mtime_ns)),
+            ("source_sha256", source_hash),
+            ("rules", str(len(rules))),
+        ],
+    )
+    conn.commit()
+
+
+class CompiledCatalog:
+    """
+    Lazily loaded rule catalog backed by a compiled SQLite artifact.
+    Opening checks the artifact against the source's size and modification time, and only hashes the source when
+    those changed, so an unchanged catalog opens without reading it. A stale artifact is rebuilt from the JSON and
+    swapped in atomically. Rule bodies are decoded only for the rules a lookup returns.
+    """
+
+    def __init__(self, source=CATALOG_PATH, path=None):
+        self.source = source
+        self.path = path or default_artifact_path(source)
+        self.rebuilt = False
+        self._conn = self._open()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the underlying database connection."""
+        self._conn.close()
+
+    def _open(self):
+        """Open the artifact, rebuilding it first when it is missing or stale."""
+        source_stat = os.stat(self.source)
+        if os.path.exists(self.path):
+            conn = sqlite3.connect(self.path)
+            try:
+                if self._is_current(conn, source_stat):
+                    return conn
+            except sqlite3.DatabaseError as e:
+                logger.warning(f"Unreadable compiled catalog {self.path}, rebuilding: {e}")
+            conn.close()
+
+        return self._build(source_stat)
+
+    def _is_current(self, conn, source_stat):
+        """Whether an open artifact was compiled from the current source."""
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        if meta.get("format_version") != str(FORMAT_VERSION) or meta.get("body_encoding") != BODY_ENCODING:
+            return False
+        if meta.get("source_size") == str(source_stat.st_size) and meta.get("source_mtime_ns") == str(
+            source_stat.st_mtime_ns
+        ):
+            return True
+
+        # A touched or re-checked-out catalog keeps its content, only its modification time needs updating
+        if meta.get("source_size") == str(source_stat.st_size) and meta.get("source_sha256") == file_sha256(
+            self.source
+        ):
+            try:
+                with conn:
+                    conn.execute(
+                        "UPDATE meta SET value = ? WHERE key = 'source_mtime_ns'", (str(source_stat.st_mtime_ns),)
+                    )
+            except sqlite3.OperationalError:
+                pass
+            return True
+        return False
+
+    def _build(self, source_stat):
+        """Compile the source catalog into a new artifact, or into memory when the artifact cannot be written."""
+        with open(self.source, "rb") as f:
+            data = f.read()
+        rules = json.loads(data)
+        source_hash = hashlib.sha256(data).hexdigest()
+        self.rebuilt = True
+
+        # Build beside the artifact and rename, so concurrent readers never see a half-written catalog
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            conn = sqlite3.connect(temporary)
+            try:
+                write_catalog(conn, rules, source_stat, source_hash)
+            finally:
+                conn.close()
+            os.replace(temporary, self.path)
+            return sqlite3.connect(self.path)
+        except (OSError, sqlite3.OperationalError) as e:
+            logger.warning(f"Cannot write compiled catalog {self.path}, keeping it in memory: {e}")
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            conn = sqlite3.connect(":memory:")
+            write_catalog(conn, rules, source_stat, source_hash)
+            return conn
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM rules").fetchone()[0]
+
+    def _bodies(self, query, parameters=()):
+        """Return the decoded rules selected by a query returning bodies in catalog order."""
+        return [decode_rule(body) for (body,) in self._conn.execute(query, parameters)]
+
+    def _by_positions(self, positions):
+        """Return the rules at `positions`, in catalog order."""
+        positions = sorted(positions)
+        rules = []
+        for start in range(0, len(positions), LOOKUP_BATCH_SIZE):
+            batch = positions[start : start + LOOKUP_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rules += self._bodies(f"SELECT body FROM rules WHERE position IN ({placeholders}) ORDER BY position", batch)
+        return rules
+
+    def get(self, rule_id):
+        """Return the rules with an id; the catalog uses a few ids in more than one category."""
+        return self._bodies("SELECT body FROM rules WHERE id = ? ORDER BY position", (rule_id,))
+
+    def _headers(self, rule_ids=None):
+        """Yield (position, scope, id, required) of every rule, or of the rules with `rule_ids` via the id index."""
+        if rule_ids is None:
+            yield from self._conn.execute("SELECT position, scope, id, required FROM rules")
+            return
+
+        rule_ids = list(dict.fromkeys(rule_ids))
+        for start in range(0, len(rule_ids), LOOKUP_BATCH_SIZE):
+            batch = rule_ids[start : start + LOOKUP_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            yield from self._conn.execute(
+                f"SELECT position, scope, id, required FROM rules WHERE id IN ({placeholders})", batch
+            )
+
+    def get_many(self, rule_ids):
+        """Return the rules with any of the ids, in catalog order."""
+        return self._by_positions(position for position, _, _, _ in self._headers(rule_ids))
+
+    def by_scope(self, scope):
+        """Return the rules of a scope."""
+        return self._bodies("SELECT body FROM rules WHERE scope = ? ORDER BY position", (scope,))
+
+    def by_input(self, input_name, required_only=False):
+        """Return the rules that read an input field, or only those that require it."""
+        return self._bodies(
+            "SELECT body FROM rules WHERE position IN "
+            "(SELECT position FROM rule_inputs WHERE input = ? AND required >= ?) ORDER BY position",
+            (input_name, int(required_only)),
+        )
+
+    def applicable(self, available, scopes=None, rule_ids=None):
+        """Return the rules whose required inputs are all in `available`, decoding only those."""
+        available = set(available)
+        positions = []
+        for position, scope, _, required in self._headers(rule_ids or None):
+            if scopes and scope not in scopes:
+                continue
+            if required and not available.issuperset(required.split(",")):
+                continue
+            positions.append(position)
+        return self._by_positions(positions)
+
+    def rules(self):
+        """Return every rule, in catalog order."""
+        return self._bodies("SELECT body FROM rules ORDER BY position")
+
+    def summary(self):
+        """Describe the artifact and the rule counts per scope and required input."""
+        meta = dict(self._conn.execute("SELECT key, value FROM meta"))
+        scopes = dict(self._conn.execute("SELECT scope, COUNT(*) FROM rules GROUP BY scope ORDER BY scope"))
+        inputs = dict(
+            self._conn.execute(
+                "SELECT input, COUNT(*) FROM rule_inputs WHERE required = 1 GROUP BY input ORDER BY COUNT(*) DESC"
+            )
+        )
+        return {
+            "source": self.source,
+            "artifact": self.path,
+            "artifact_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else None,
+            "source_bytes": int(meta["source_size"]),
+            "source_sha256": meta["source_sha256"],
+            "rules": len(self),
+            "scopes": scopes,
+            "required_inputs": inputs,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the SEO rule catalog or look rules up in it")
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="Path to the rule catalog JSON")
+    parser.add_argument("--artifact", help="Path to the compiled artifact (default: next to the catalog)")
+    parser.add_argument("--rule", action="append", help="Print the rule(s) with this id (repeatable)")
+    parser.add_argument("--scope", help="Print the rules of this scope")
+    parser.add_argument("--input", help="Print the rules requiring this input field")
+
+    args = parser.parse_args()
+
+    try:
+        catalog = CompiledCatalog(args.catalog, args.artifact)
+    except Exception as e:
+        print(f"Error compiling rule catalog: {e}")
+        sys.exit(1)
+
+    with catalog:
+        if args.rule:
+            result = catalog.get_many(args.rule)
+        elif args.scope:
+            result = catalog.by_scope(args.scope)
+        elif args.input:
+            result = catalog.by_input(args.input, required_only=True)
+        else:
+            result = dict(catalog.summary(), rebuilt=catalog.rebuilt)
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
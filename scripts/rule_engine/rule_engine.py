@@ -0,0 +1,1193 @@
+#!/usr/bin/env python3
+"""
+SEO Rule Engine
+Compiles the rule catalog in references/seo_rules.json into a registry indexed by scope and required inputs, then
+evaluates every rule applicable to the inputs available for a page. Evidence shared by several rules is gathered
+once, and all CSS selector evidence of a document comes from a single traversal of its parse tree.
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import logging
+import operator
+from collections import defaultdict, namedtuple
+
+import requests
+import soupsieve
+from bs4 import Tag
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# The script-backed rules run the detectors from the sibling script directories
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for script_dir in (
+    "page_audit",
+    "keyword_stuffing_detection",
+    "hidden_text_detection",
+    "cloaking_detection",
+    "sneaky_redirect_detection",
+):
+    script_path = os.path.join(SCRIPTS_DIR, script_dir)
+    if script_path not in sys.path:
+        sys.path.insert(0, script_path)
+
+from page_audit import PageDocument  # noqa: E402
+from keyword_stuffing_detection import analyze_text_for_keyword_stuffing  # noqa: E402
+from hidden_text_detection import (  # noqa: E402
+    analyze_soup_for_hidden_text,
+    http_stylesheet_loader,
+    local_stylesheet_loader,
+)
+from cloaking_detection import DEFAULT_USER_AGENT_REGULAR, CloakingDetector  # noqa: E402
+from sneaky_redirect_detection import analyze_manual_redirect_data  # noqa: E402
+from compiled_catalog import CATALOG_PATH, CompiledCatalog  # noqa: E402
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SCOPES = ("page", "resource", "site")
+# Values of one evidence item listed in the report, the rule itself sees all of them
+MAX_REPORTED_VALUES = 5
+JSON_LD_SELECTOR = "script[type='application/ld+json']"
+JSON_LD_PATTERN = re.compile(r"application/ld\+json")
+LINK_HEADER_PATTERN = re.compile(r"<([^>]*)>")
+PLACEHOLDER_PATTERN = re.compile(r"\$\{(\w+)\}")
+# Combinators separating the compound selectors of a CSS selector, outside brackets and quotes
+COMBINATORS = set(" \t\n>+~")
+
+OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">=": operator.ge,
+    "<=": operator.le,
+    ">": operator.gt,
+    "<": operator.lt,
+    "in": lambda observed, expected: observed in expected,
+    "matches": lambda observed, expected: re.search(expected, str(observed)) is not None,
+}
+
+# Sitemap extension prefixes used by the catalog's XPath evidence
+XML_NAMESPACES = {
+    "news": "http://www.google.com/schemas/sitemap-news/0.9",
+    "image": "http://www.google.com/schemas/sitemap-image/1.1",
+    "video": "http://www.google.com/schemas/sitemap-video/1.1",
+    "xhtml": "http://www.w3.org/1999/xhtml",
+}
+
+# One piece of evidence, read by `kind` from the input named `source`. Rules asking for the same evidence share it.
+EvidenceSpec = namedtuple("EvidenceSpec", "kind source selector attribute")
+
+
+def is_html_input(name):
+    """Whether an input field carries HTML markup."""
+    return name == "html" or name.endswith("_html") or name.startswith("html_")
+
+
+def first_input(names, predicate):
+    """Return the first input name matching `predicate`, or None."""
+    return next((name for name in names if predicate(name)), None)
+
+
+def resolve_evidence(evidence, input_names):
+    """
+    Resolve one evidence_to_collect entry of a rule into an EvidenceSpec, or None when none of the rule's inputs
+    can provide it. `input_names` lists the rule's inputs with the required ones first.
+    """
+    kind = evidence.get("type")
+    selector = evidence.get("selector") or ""
+    attribute = evidence.get("attribute")
+    html_source = first_input(input_names, is_html_input)
+
+    if kind == "attribute" and (selector in input_names or html_source is None):
+        # Attributes of the inputs themselves (final_url, method, country...) rather than of elements
+        kind = "field"
+
+    if kind in ("selector", "attribute"):
+        if html_source is None or not selector:
+            return None
+        # script[type="..."] and script[type='...'] are the same selector, let rules share it
+        if "'" not in selector:
+            selector = selector.replace('"', "'")
+        return EvidenceSpec("selector", html_source, selector, attribute)
+
+    if kind == "regex":
+        if selector in input_names:
+            # Names the input to search rather than giving a pattern, the input itself is the evidence
+            return EvidenceSpec("input", selector, selector, None)
+        if not selector or re.fullmatch(r"[a-z_]+", selector):
+            # A lowercase word such as "script" describes where to search, the pattern is only in the notes
+            return None
+        return EvidenceSpec("regex", input_names[0] if input_names else None, selector, None)
+
+    if kind == "xpath":
+        source = first_input(input_names, lambda name: "xml" in name or "sitemap" in name or "feed" in name)
+        return EvidenceSpec("xpath", source or html_source, selector, attribute) if etree is not None else None
+
+    if kind == "json_path":
+        # Pages carry their JSON in JSON-LD blocks, other rules in a JSON input
+        return EvidenceSpec("json_path", html_source or (input_names[0] if input_names else None), selector, None)
+
+    if kind == "header":
+        source = first_input(input_names, lambda name: "header" in name) or "http_headers"
+        return EvidenceSpec("header", source, selector, None)
+
+    if kind == "http_status":
+        source = "http_status" if "http_status" in input_names else first_input(input_names, lambda n: "header" in n)
+        return EvidenceSpec("http_status", source or "http_status", selector, None)
+
+    if kind in ("metric", "field"):
+        return EvidenceSpec("field", input_names[0] if input_names else None, selector, attribute)
+
+    if kind == "robots_txt":
+        return EvidenceSpec("regex", "robots_txt", re.escape(selector), None)
+
+    return None
+
+
+def selector_keys(selector):
+    """
+    Return the (tag or attribute, name) keys an element must carry to match `selector`, one per comma-separated
+    alternative, from the tag name of its rightmost compound or else its first attribute. Returns None when some
+    alternative can match any element.
+    """
+    keys = set()
+    for alternative in split_selector_list(selector):
+        depth, quote, start = 0, None, 0
+        for position, char in enumerate(alternative):
+            if quote:
+                if char == quote:
+                    quote = None
+            elif char in "'\"":
+                quote = char
+            elif char in "[(":
+                depth += 1
+            elif char in "])":
+                depth -= 1
+            elif depth == 0 and char in COMBINATORS:
+                start = position + 1
+
+        compound = alternative[start:].strip()
+        tag = re.match(r"[A-Za-z][\w-]*", compound)
+        # Attributes inside :not(...) and other pseudo-classes are not required
+        attribute = re.search(r"\[\s*([\w:-]+)", re.sub(r"\([^)]*\)", "", compound))
+        if tag is not None:
+            keys.add(("tag", tag.group(0).lower()))
+        elif attribute is not None:
+            keys.add(("attribute", attribute.group(1).lower()))
+        else:
+            return None
+    return keys
+
+
+def split_selector_list(selector):
+    """Split a CSS selector list on its top-level commas."""
+    parts, depth, quote, start = [], 0, None, 0
+    for position, char in enumerate(selector):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char in "[(":
+            depth += 1
+        elif char in "])":
+            depth -= 1
+        elif depth == 0 and char == ",":
+            parts.append(selector[start:position].strip())
+            start = position + 1
+    parts.append(selector[start:].strip())
+    return [part for part in parts if part]
+
+
+class SelectorIndex:
+    """
+    A set of CSS selectors compiled once and matched together in one traversal of a document.
+    Selectors are bucketed by the tag name or attribute their rightmost compound requires, so each element is
+    only tested against the selectors that can match it, like a browser's rule hash.
+    """
+
+    def __init__(self, selectors):
+        self.selectors = []
+        self.errors = {}
+        self._compiled = {}
+        self._buckets = {"tag": defaultdict(list), "attribute": defaultdict(list)}
+        self._any_element = []
+
+        for selector in dict.fromkeys(selectors):
+            try:
+                self._compiled[selector] = soupsieve.compile(selector)
+            except Exception as e:
+                self.errors[selector] = f"Invalid selector: {e}"
+                continue
+
+            self.selectors.append(selector)
+            keys = selector_keys(selector)
+            if keys is None:
+                self._any_element.append(selector)
+            else:
+                for kind, name in keys:
+                    self._buckets[kind][name].append(selector)
+
+    def match(self, soup):
+        """Return {selector: [matching elements in document order]} from a single traversal of `soup`."""
+        matches = {selector: [] for selector in self.selectors}
+        compiled = self._compiled
+        by_tag, by_attribute = self._buckets["tag"], self._buckets["attribute"]
+        # "*" matches every element, there is nothing to test
+        every_element = [matches[selector] for selector in self._any_element if selector.strip() == "*"]
+        any_element = [selector for selector in self._any_element if selector.strip() != "*"]
+
+        for element in soup.descendants:
+            if not isinstance(element, Tag):
+                continue
+
+            candidates = by_tag.get(element.name, ())
+            if by_attribute and element.attrs:
+                by_attributes = [selector for name in element.attrs for selector in by_attribute.get(name, ())]
+                if by_attributes:
+                    # A selector list can be keyed on both the tag and an attribute of the same element
+                    candidates = dict.fromkeys([*candidates, *by_attributes])
+            if any_element:
+                candidates = [*candidates, *any_element]
+
+            for selector in candidates:
+                if compiled[selector].match(element):
+                    matches[selector].append(element)
+            for found in every_element:
+                found.append(element)
+
+        return matches
+
+
+def json_path_values(document, path):
+    """Evaluate the child (`.key`) and descendant (`..key`) steps of a JSONPath expression against a document."""
+    nodes = [document]
+    for separator, key in re.findall(r"(\.\.?)([^.\[\]]+)", path.lstrip("$")):
+        found = []
+        for node in nodes:
+            if separator == "..":
+                found.extend(descendant_values(node, key))
+            else:
+                for item in node if isinstance(node, list) else [node]:
+                    if isinstance(item, dict) and key in item:
+                        found.append(item[key])
+        nodes = found
+    return nodes
+
+
+def descendant_values(node, key):
+    """Return the values of every `key` member at any depth under `node`."""
+    values = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if key in node:
+                values.append(node[key])
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+    return values
+
+
+def lookup_field(container, name):
+    """Look a field up by name in a mapping, falling back to a case-insensitive match."""
+    if not isinstance(container, dict) or not name:
+        return None
+    if name in container:
+        return container[name]
+    lowered = name.lower()
+    return next((value for key, value in container.items() if str(key).lower() == lowered), None)
+
+
+def as_text(value):
+    """Return an input value as text for pattern matching."""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    return json.dumps(value)
+
+
+def as_json(value):
+    """Return an input value parsed as JSON, or None."""
+    if isinstance(value, (dict, list)):
+        return value
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def as_number(value):
+    """Return a numeric observation as int or float, or None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        number = float(str(value).strip())
+    except ValueError:
+        return None
+    return int(number) if number.is_integer() else number
+
+
+def substitute_placeholders(text, inputs, escape=None):
+    """Replace ${name} placeholders with input values, or return None when one has no value."""
+    missing = []
+
+    def replace(match):
+        value = inputs.get(match.group(1))
+        if value is None and match.group(1) == "page_url":
+            value = inputs.get("url")
+        if value is None:
+            missing.append(match.group(1))
+            return ""
+        return escape(str(value)) if escape else str(value)
+
+    result = PLACEHOLDER_PATTERN.sub(replace, text)
+    return None if missing else result
+
+
+def threshold_measure(threshold, specs, preconditions=None):
+    """
+    Decide how a rule's threshold can be checked generically from its evidence: "value" compares the observed
+    value itself, "count" the number of matches and "words" / "characters" the length of the first match.
+    Returns None when the threshold needs rule-specific logic, such as reading structured data, or when the rule
+    only applies under preconditions, which the catalog states in prose.
+    """
+    if preconditions:
+        return None
+    threshold_type = threshold.get("type")
+    if threshold_type not in ("number", "string", "regex") or threshold.get("operator") not in OPERATORS:
+        return None
+    if len(specs) != 1 or specs[0].source is None:
+        return None
+    if threshold.get("operator") == "in" and not isinstance(threshold.get("value"), list):
+        return None
+
+    spec, unit = specs[0], threshold.get("unit")
+    if spec.kind in ("http_status", "header", "field"):
+        return "value"
+    if spec.kind == "selector" and not JSON_LD_PATTERN.search(spec.selector):
+        if unit in ("words", "characters"):
+            return unit
+        if threshold_type == "number" and unit in (None, "count"):
+            return "count"
+        return "value" if threshold_type in ("string", "regex") else None
+    if spec.kind == "regex" and threshold_type == "number" and unit in (None, "count"):
+        return "count"
+    return None
+
+
+class CompiledRule:
+    """A catalog rule with its required inputs, resolved evidence and the way its verdict is reached."""
+
+    __slots__ = (
+        "position",
+        "id",
+        "title",
+        "category",
+        "scope",
+        "severity",
+        "required",
+        "evidence",
+        "unresolved",
+        "threshold",
+        "measure",
+        "check",
+        "pass_condition",
+        "fail_message",
+    )
+
+    def __init__(self, rule, position=0):
+        self.position = position
+        self.id = rule["id"]
+        self.title = rule.get("title", "")
+        self.category = rule.get("category", "")
+        self.scope = rule.get("scope") or "page"
+        self.severity = rule.get("severity")
+        input_fields = rule.get("input_fields") or []
+        self.required = frozenset(field["name"] for field in input_fields if field.get("required"))
+        input_names = [field["name"] for field in input_fields if field.get("required")]
+        input_names += [field["name"] for field in input_fields if not field.get("required")]
+
+        evidence, unresolved = [], []
+        for item in rule.get("evidence_to_collect") or []:
+            spec = resolve_evidence(item, input_names)
+            if spec is None:
+                unresolved.append(item)
+            elif spec not in evidence:
+                evidence.append(spec)
+        self.evidence = tuple(evidence)
+        self.unresolved = unresolved
+
+        self.threshold = rule.get("threshold") or {}
+        self.measure = threshold_measure(self.threshold, self.evidence, rule.get("preconditions"))
+        # The catalog reuses some ids across categories, a check may only stand in for rules without a threshold
+        self.check, replaces_threshold = RULE_CHECKS.get(self.id, (None, False))
+        if self.check is not None and self.measure is not None and not replaces_threshold:
+            self.check = None
+        if self.check is not None:
+            self.measure = None
+        self.pass_condition = rule.get("pass_condition", "")
+        self.fail_message = (rule.get("fail_messages") or [None])[0]
+
+    @property
+    def executable(self):
+        """Whether the engine can reach a pass/fail verdict for this rule."""
+        return self.check is not None or self.measure is not None
+
+
+RULE_CHECKS = {}
+
+
+def rule_check(*rule_ids, replaces_threshold=False):
+    """
+    Register a function as the check of catalog rules whose logic cannot be derived from their threshold.
+    Unless `replaces_threshold` is set, rules with the same id whose threshold the engine can check keep it.
+    """
+
+    def register(function):
+        for rule_id in rule_ids:
+            RULE_CHECKS[rule_id] = (function, replaces_threshold)
+        return function
+
+    return register
+
+
+class Evidence:
+    """
+    The evidence gathered for one set of inputs, shared by every rule evaluated against them.
+    HTML inputs are parsed once into a PageDocument, which the script-backed checks reuse. Stylesheets linked
+    from the page are read with `stylesheet_loader`, references resolved against `base_url`.
+    """
+
+    def __init__(self, inputs, stylesheet_loader=None, base_url=None):
+        self.inputs = inputs
+        self.stylesheet_loader = stylesheet_loader
+        self.base_url = base_url
+        self.values = {}
+        self.errors = {}
+        # Attribute evidence spec -> (number of elements selected, elements without a non-empty value)
+        self.missing_attributes = {}
+        self._documents = {}
+
+    def document(self, source):
+        """Return the parsed document of an HTML input."""
+        if source not in self._documents:
+            self._documents[source] = PageDocument(as_text(self.inputs[source]))
+        return self._documents[source]
+
+    def gather(self, specs, selector_indexes):
+        """Collect the values of every evidence spec, matching all selectors of a document in one pass."""
+        for source, index in selector_indexes.items():
+            if self.inputs.get(source) is None:
+                continue
+            try:
+                matches = index.match(self.document(source).soup)
+            except Exception as e:
+                logger.error(f"Error parsing {source}: {e}")
+                for selector in index.selectors:
+                    self.errors[("selector", source, selector)] = f"Failed to parse {source}: {e}"
+                continue
+            for selector, error in index.errors.items():
+                self.errors[("selector", source, selector)] = error
+            for spec in specs:
+                if spec.kind == "selector" and spec.source == source and spec.selector in matches:
+                    elements = matches[spec.selector]
+                    if spec.attribute:
+                        values, missing = [], []
+                        for element in elements:
+                            value = element.get(spec.attribute)
+                            if isinstance(value, list):
+                                value = " ".join(value)
+                            if value is not None:
+                                values.append(value)
+                            if not (value or "").strip():
+                                missing.append(element)
+                        self.values[spec] = values
+                        self.missing_attributes[spec] = (len(elements), missing)
+                    else:
+                        self.values[spec] = [e.get_text(" ", strip=True) for e in elements]
+            self._json_ld_documents(source, matches.get(JSON_LD_SELECTOR, []))
+
+        for spec in specs:
+            if spec.kind == "selector" or spec in self.values:
+                continue
+            try:
+                self.values[spec] = self._collect(spec)
+            except Exception as e:
+                self.errors[spec[:3]] = f"Failed to collect {spec.kind} evidence: {e}"
+
+    def _json_ld_documents(self, source, elements):
+        """Parse the JSON-LD blocks of a document for JSONPath evidence, skipping malformed ones."""
+        documents = []
+        for element in elements:
+            document = as_json(element.get_text())
+            if document is not None:
+                documents.append(document)
+        self._documents[(source, "json_ld")] = documents
+
+    def json_ld(self, source="html"):
+        """Return the parsed JSON-LD blocks of an HTML input."""
+        if (source, "json_ld") not in self._documents:
+            self._json_ld_documents(source, self.document(source).soup.select(JSON_LD_SELECTOR))
+        return self._documents[(source, "json_ld")]
+
+    def _collect(self, spec):
+        """Collect the values of one non-selector evidence spec."""
+        value = self.inputs.get(spec.source)
+
+        if spec.kind == "input":
+            return [] if value is None else [value]
+
+        if spec.kind == "regex":
+            pattern = substitute_placeholders(spec.selector, self.inputs, re.escape)
+            text = as_text(value)
+            if pattern is None or text is None:
+                return None
+            values = []
+            for match in re.finditer(pattern, text):
+                values.append(match.group(1) if match.re.groups else match.group(0))
+            return values
+
+        if spec.kind == "xpath":
+            expression = substitute_placeholders(spec.selector, self.inputs)
+            tree = self._xml_tree(spec.source)
+            if expression is None or tree is None:
+                return None
+            found = tree.xpath(expression, namespaces=self._namespaces(tree))
+            if not isinstance(found, list):
+                return [found]
+            values = []
+            for node in found:
+                if isinstance(node, str):
+                    values.append(str(node))
+                elif spec.attribute:
+                    values.append(node.get(spec.attribute))
+                else:
+                    values.append((node.text or "").strip())
+            return values
+
+        if spec.kind == "json_path":
+            if is_html_input(spec.source):
+                documents = self.json_ld(spec.source)
+            else:
+                document = as_json(value)
+                documents = [] if document is None else [document]
+            return [found for document in documents for found in json_path_values(document, spec.selector)]
+
+        if spec.kind == "header":
+            if spec.selector.lower() in ("status_code", "status") and lookup_field(value, spec.selector) is None:
+                return self._status_codes(spec)
+            found = lookup_field(value, spec.selector)
+            if found is not None and spec.selector.lower() == "link":
+                # Link: <https://example.com/>; rel="canonical" is compared by its target URLs
+                return LINK_HEADER_PATTERN.findall(str(found))
+            return [] if found is None else [found]
+
+        if spec.kind == "http_status":
+            return self._status_codes(spec)
+
+        if spec.kind == "field":
+            found = lookup_field(as_json(value), spec.selector)
+            if found is None:
+                found = self.inputs.get(spec.selector)
+            if found is None and (spec.selector == spec.source or not is_html_input(spec.source or "")):
+                # A scalar input such as http_method or file_size_bytes is itself the field the rule reads
+                found = value if as_json(value) is None or spec.selector == spec.source else None
+            if found is not None and spec.attribute == "extension":
+                found = os.path.splitext(str(found))[1].lstrip(".").lower()
+            return [] if found is None else [found]
+
+        return None
+
+    def _status_codes(self, spec):
+        """Return the HTTP status of the response an evidence spec refers to, from http_status or the headers."""
+        status = self.inputs.get("http_status")
+        if isinstance(status, dict):
+            status = lookup_field(status, spec.selector)
+        if status is None:
+            headers = self.inputs.get("http_headers")
+            status = next(
+                (
+                    lookup_field(headers, name)
+                    for name in ("status_code", "status", ":status")
+                    if lookup_field(headers, name)
+                ),
+                None,
+            )
+        return None if status is None else [status]
+
+    def _xml_tree(self, source):
+        """Parse an XML input once, moving elements out of the document's default namespace."""
+        key = (source, "xml")
+        if key not in self._documents:
+            tree = None
+            text = as_text(self.inputs.get(source))
+            if text:
+                root = etree.fromstring(text.encode("utf-8"), etree.XMLParser(recover=True, resolve_entities=False))
+                if root is not None:
+                    # The catalog writes sitemap paths unprefixed (//url/loc), as XPath 1.0 only matches without a namespace
+                    default_namespace = root.nsmap.get(None)
+                    if default_namespace:
+                        prefix = f"{{{default_namespace}}}"
+                        for element in root.iter():
+                            if isinstance(element.tag, str) and element.tag.startswith(prefix):
+                                element.tag = element.tag[len(prefix) :]
+                    tree = root
+            self._documents[key] = tree
+        return self._documents[key]
+
+    @staticmethod
+    def _namespaces(tree):
+        """Return the prefixes usable in XPath evidence: the document's own plus the sitemap extensions."""
+        namespaces = dict(XML_NAMESPACES)
+        namespaces.update({prefix: uri for prefix, uri in tree.nsmap.items() if prefix})
+        return namespaces
+
+
+def observe(rule, evidence):
+    """Return the observation a rule's generic threshold check compares, or None when it is missing."""
+    spec = rule.evidence[0]
+    values = evidence.values.get(spec)
+    if values is None:
+        return None
+
+    if rule.measure == "count":
+        return len(values)
+    if rule.measure == "words":
+        return len(values[0].split()) if values else 0
+    if rule.measure == "characters":
+        return len(values[0].strip()) if values else 0
+    if not values:
+        return None
+    return values[0]
+
+
+def is_redirect_status(value):
+    """Whether a status code observation or threshold value is a 3xx redirect."""
+    number = as_number(value)
+    return number is not None and 300 <= number < 400
+
+
+def compare_threshold(rule, observed, inputs):
+    """
+    Compare an observation with a rule's threshold, returning pass/fail or None when they are not comparable.
+    A rule requiring particular redirect status codes does not apply to a response that is not a redirect.
+    """
+    expected = rule.threshold.get("value")
+    if rule.evidence[0].kind in ("http_status", "header"):
+        codes = expected if isinstance(expected, list) else [expected]
+        if all(is_redirect_status(code) for code in codes) and not is_redirect_status(observed):
+            return "not_applicable"
+
+    if isinstance(expected, str):
+        expected = substitute_placeholders(expected, inputs)
+        if expected is None:
+            return None
+
+    if rule.threshold.get("type") == "number":
+        observed = as_number(observed)
+        if observed is None:
+            return None
+        if not isinstance(expected, list):
+            expected = as_number(expected)
+    elif rule.threshold.get("type") == "string":
+        observed = str(observed)
+        expected = [str(item) for item in expected] if isinstance(expected, list) else str(expected)
+
+    return "pass" if OPERATORS[rule.threshold["operator"]](observed, expected) else "fail"
+
+
+def evaluate_rule(rule, evidence):
+    """Evaluate one applicable rule against gathered evidence."""
+    result = {
+        "id": rule.id,
+        "title": rule.title,
+        "category": rule.category,
+        "scope": rule.scope,
+        "severity": rule.severity,
+    }
+
+    errors = [evidence.errors[spec[:3]] for spec in rule.evidence if spec[:3] in evidence.errors]
+    observed = None
+    details = None
+    try:
+        if rule.check is not None:
+            status, observed, details = rule.check(rule, evidence)
+        elif errors:
+            status = "error"
+        elif rule.measure is not None:
+            observed = observe(rule, evidence)
+            status = None if observed is None else compare_threshold(rule, observed, evidence.inputs)
+            status = status or "insufficient_evidence"
+        else:
+            status = "collected"
+    except Exception as e:
+        logger.error(f"Error evaluating rule {rule.id}: {e}")
+        status, errors = "error", errors + [str(e)]
+
+    result["status"] = status
+    if observed is not None and status != "insufficient_evidence":
+        result["observed"] = observed
+    if rule.measure is not None or rule.check is not None:
+        result["threshold"] = {key: rule.threshold.get(key) for key in ("operator", "value", "unit")}
+
+    if status == "fail":
+        result["message"] = rule.fail_message or f"Rule not met: {rule.pass_condition}"
+    elif status == "pass":
+        result["message"] = rule.pass_condition
+    elif status == "error":
+        result["message"] = "; ".join(errors) or "Rule evaluation failed"
+    elif status == "insufficient_evidence":
+        result["message"] = "The inputs do not contain the evidence this rule compares."
+    elif status == "not_applicable":
+        result["message"] = "The response is not a redirect, the rule only applies to redirects."
+    elif status == "needs_rendering":
+        result["message"] = "Static analysis found no violation but cannot rule one out without rendering the page."
+    else:
+        result["message"] = f"No executable check, evidence collected for review: {rule.pass_condition}"
+
+    result["evidence"] = []
+    for spec in rule.evidence:
+        values = evidence.values.get(spec)
+        item = {"type": spec.kind, "source": spec.source, "selector": spec.selector}
+        if spec.attribute:
+            item["attribute"] = spec.attribute
+        if values is None:
+            item["available"] = False
+        else:
+            item["count"] = len(values)
+            item["values"] = [summarize_value(value) for value in values[:MAX_REPORTED_VALUES]]
+        result["evidence"].append(item)
+    if details is not None:
+        result["details"] = details
+
+    return result
+
+
+def summarize_value(value):
+    """Shorten long evidence values for the report."""
+    if isinstance(value, str) and len(value) > 200:
+        return value[:200] + "..."
+    if isinstance(value, (dict, list)):
+        return summarize_value(json.dumps(value))
+    return value
+
+
+class RuleRegistry:
+    """
+    The rule catalog compiled for dispatch. Rules are indexed by scope and by the set of inputs they require, so
+    finding the rules applicable to a page tests each distinct input set once rather than every rule. The
+    evidence plan of each combination of available inputs is compiled once and reused for every page.
+    """
+
+    def __init__(self, rules, rules_total=None):
+        self.rules = []
+        self._by_id = defaultdict(list)
+        self._index = defaultdict(lambda: defaultdict(list))
+        for position, rule in enumerate(rules):
+            compiled = CompiledRule(rule, position)
+            self.rules.append(compiled)
+            self._by_id[compiled.id].append(compiled)
+            self._index[compiled.scope][compiled.required].append(compiled)
+        # Number of rules in the whole catalog, when the registry only holds the rules loaded for some inputs
+        self.rules_total = len(self.rules) if rules_total is None else rules_total
+        self._plans = {}
+
+    @classmethod
+    def from_catalog(cls, path=CATALOG_PATH):
+        """Build a registry from every rule of a catalog file."""
+        with CompiledCatalog(path) as catalog:
+            return cls(catalog.rules())
+
+    @classmethod
+    def for_inputs(cls, catalog, available, scopes=None, rule_ids=None):
+        """Build a registry holding only the rules of a CompiledCatalog applicable to the `available` inputs."""
+        return cls(catalog.applicable(available, scopes, rule_ids), len(catalog))
+
+    def __len__(self):
+        return len(self.rules)
+
+    def find(self, rule_id):
+        """Return the compiled rules with an id, the catalog uses a few ids in more than one category."""
+        return list(self._by_id.get(rule_id, ()))
+
+    def applicable(self, available, scopes=None, rule_ids=None):
+        """Return the rules whose required inputs are all in `available`, in catalog order."""
+        available = frozenset(available)
+        selected = []
+        for scope in scopes or self._index:
+            for required, rules in self._index.get(scope, {}).items():
+                if required <= available:
+                    selected.extend(rules)
+
+        if rule_ids is not None:
+            rule_ids = set(rule_ids)
+            selected = [rule for rule in selected if rule.id in rule_ids]
+        return sorted(selected, key=lambda rule: rule.position)
+
+    def plan(self, available, scopes=None, rule_ids=None):
+        """Return the applicable rules, their distinct evidence specs and one SelectorIndex per HTML input."""
+        key = (frozenset(available), tuple(scopes) if scopes else None, frozenset(rule_ids) if rule_ids else None)
+        if key not in self._plans:
+            rules = self.applicable(available, scopes, rule_ids)
+            self._plans[key] = (rules, *compile_evidence_plan(rules))
+        return self._plans[key]
+
+    def evaluate(self, inputs, scopes=None, rule_ids=None, stylesheet_loader=None, base_url=None):
+        """
+        Evaluate every rule applicable to `inputs`, a mapping of input field names to values.
+        `stylesheet_loader` and `base_url` let the hidden text check read the stylesheets the page links to.
+        """
+        available = {name for name, value in inputs.items() if value is not None}
+        rules, specs, indexes = self.plan(available, scopes, rule_ids)
+        results = evaluate_rules(rules, specs, indexes, inputs, stylesheet_loader, base_url)
+        return build_report(results, self.rules_total, available)
+
+
+def compile_evidence_plan(rules):
+    """Return the distinct evidence specs of `rules` and one SelectorIndex per HTML input they read."""
+    specs = list(dict.fromkeys(spec for rule in rules for spec in rule.evidence))
+
+    selectors = defaultdict(dict)
+    for spec in specs:
+        if spec.kind == "selector":
+            selectors[spec.source][spec.selector] = None
+        elif spec.kind == "json_path" and is_html_input(spec.source):
+            selectors[spec.source][JSON_LD_SELECTOR] = None
+    indexes = {source: SelectorIndex(list(names)) for source, names in selectors.items()}
+    return specs, indexes
+
+
+def evaluate_rules(rules, specs, indexes, inputs, stylesheet_loader=None, base_url=None):
+    """Gather the evidence of a plan once and evaluate each of its rules."""
+    evidence = Evidence(inputs, stylesheet_loader, base_url)
+    evidence.gather(specs, indexes)
+    return [evaluate_rule(rule, evidence) for rule in rules]
+
+
+def build_report(results, rules_total, available):
+    """Summarize rule results into the engine report."""
+    counts = defaultdict(int)
+    for result in results:
+        counts[result["status"]] += 1
+    failed = [result["id"] for result in results if result["status"] == "fail"]
+    errors = [result["id"] for result in results if result["status"] == "error"]
+    # Collected rules, rules missing their evidence and rules that need a rendered page were not decided, so they
+    # neither pass nor fail the page
+    verdicts = counts["pass"] + counts["fail"]
+    without_verdict = counts["collected"] + counts["insufficient_evidence"] + counts["needs_rendering"]
+
+    if failed:
+        message = f"{len(failed)} of {len(results)} applicable rule(s) failed."
+    elif errors:
+        message = f"{len(errors)} of {len(results)} applicable rule(s) could not be evaluated."
+    elif not verdicts:
+        message = f"None of the {len(results)} applicable rule(s) could be checked."
+    else:
+        message = f"No failures among the {verdicts} checked rule(s)."
+    if without_verdict:
+        message += f" {without_verdict} of {len(results)} applicable rule(s) got no verdict."
+
+    return {
+        "status": "success",
+        "passed": not failed and not errors and verdicts > 0,
+        "inputs": sorted(available),
+        "rules_total": rules_total,
+        "rules_applicable": len(results),
+        "rules_without_verdict": without_verdict,
+        "counts": {status: count for status, count in counts.items() if count},
+        "failed_rules": failed,
+        "results": results,
+        "message": message,
+    }
+
+
+@rule_check("KEYWORD_STUFFING_DETECTION", replaces_threshold=True)
+def check_keyword_stuffing(rule, evidence):
+    """Keyword density of the page body, from the keyword stuffing detector (html.parser text, as page_audit)."""
+    visible_text = re.sub(r"\s+", " ", evidence.document("html").body_text).strip()
+    result = analyze_text_for_keyword_stuffing(visible_text, rule.threshold.get("value") or 0.05)
+    return detector_status(result), result.get("violations_count"), result
+
+
+@rule_check("HIDDEN_TEXT_DETECTION")
+def check_hidden_text(rule, evidence):
+    """
+    Hidden text under the inline, embedded and linked styles, from the hidden text detector's static cascade.
+    A page the static analysis cannot decide needs rendering rather than passing.
+    """
+    soup = evidence.document("html").soup
+    result = analyze_soup_for_hidden_text(soup, evidence.stylesheet_loader, evidence.base_url)
+    status = detector_status(result)
+    if status == "pass" and result.get("needs_rendering"):
+        status = "needs_rendering"
+    return status, result.get("hidden_elements_count"), result
+
+
+@rule_check("CLOAKING_DETECTION", replaces_threshold=True)
+def check_cloaking(rule, evidence):
+    """
+    Similarity of the Googlebot and user views, from the cloaking detector. The catalog threshold is a word-set
+    Jaccard, so the views are compared with one-word shingles.
+    """
+    detector = CloakingDetector(similarity_threshold=rule.threshold.get("value") or 0.9, shingle_size=1)
+    try:
+        user_text = detector.extract_visible_text(as_text(evidence.inputs["html_user"]))
+        googlebot_text = detector.extract_visible_text(as_text(evidence.inputs["html_googlebot"]))
+        similarity, details = detector.calculate_similarity(user_text["words"], googlebot_text["words"])
+    finally:
+        detector.close()
+
+    details.pop("signatures", None)
+    status = "pass" if similarity >= detector.similarity_threshold else "fail"
+    return status, round(similarity, 4), details
+
+
+@rule_check("SNEAKY_REDIRECT_DETECTION")
+def check_sneaky_redirects(rule, evidence):
+    """Final URL and status of both crawlers, from the sneaky redirect detector."""
+    inputs = evidence.inputs
+    result = analyze_manual_redirect_data(
+        inputs["final_url_googlebot"],
+        inputs["final_url_user"],
+        inputs["http_status_googlebot"],
+        inputs["http_status_user"],
+    )
+    return detector_status(result), result.get("differences_count"), result
+
+
+@rule_check(
+    "META_DESCRIPTION_PRESENT",
+    "TITLE_ELEMENT_PRESENT",
+    "PAGE_TITLE_EXISTS",
+    "MAIN_HEADING_EXISTS",
+    "REL_CANONICAL_PRESENT",
+    "CHECK_REL_CANONICAL_PRESENT",
+    "CANONICAL_LINK_PRESENT",
+    "AMP_CANONICAL_LINK_PRESENT",
+    "SEARCH_CONSOLE_VERIFICATION_PRESENT",
+)
+def check_non_empty(rule, evidence):
+    """The rule's element exists with non-empty content."""
+    values = evidence.values.get(rule.evidence[0]) or []
+    content = next((value.strip() for value in values if value and value.strip()), None)
+    return ("pass" if content else "fail"), content, None
+
+
+@rule_check("IMAGE_ALT_TEXT", "IMAGE_ALT_ATTRIBUTES", "IMG_ALT_TEXT", "IMG_ALT_TEXT_PRESENT", "IMG_SRC_PRESENT")
+def check_every_element_has_attribute(rule, evidence):
+    """Every element the rule selects has a non-empty value for its attribute."""
+    spec = rule.evidence[0]
+    if spec not in evidence.missing_attributes:
+        # The selector could not be matched, the gather errors explain why
+        return "error", None, None
+    elements, missing = evidence.missing_attributes[spec]
+    details = {"elements": elements, "missing": [str(element)[:200] for element in missing[:MAX_REPORTED_VALUES]]}
+    return ("fail" if missing else "pass"), len(missing), details
+
+
+@rule_check("NO_URL_FRAGMENTS")
+def check_no_fragment_links(rule, evidence):
+    """No link URL carries a #fragment."""
+    values = evidence.values.get(rule.evidence[0]) or []
+    fragments = [value for value in values if value and "#" in value]
+    return ("fail" if fragments else "pass"), len(fragments), None
+
+
+STRUCTURED_DATA_TYPES = {
+    "BREADCRUMB_STRUCTURED_DATA_PRESENT": "BreadcrumbList",
+    "ORGANIZATION_STRUCTURED_DATA_PRESENT": "Organization",
+    "PRODUCT_STRUCTURED_DATA_PRESENT": "Product",
+}
+
+
+@rule_check(*STRUCTURED_DATA_TYPES)
+def check_structured_data_type(rule, evidence):
+    """A JSON-LD block declares an item of the rule's schema.org type."""
+    expected = STRUCTURED_DATA_TYPES[rule.id]
+    types = []
+    for document in evidence.json_ld("html"):
+        for declared in descendant_values(document, "@type"):
+            types.extend(declared if isinstance(declared, list) else [declared])
+    return ("pass" if expected in types else "fail"), sorted(set(map(str, types))), None
+
+
+def detector_status(result):
+    """Map a detector result dict to a rule status."""
+    if result.get("status") != "success":
+        return "error"
+    return "pass" if result.get("passed") else "fail"
+
+
+def run_test_cases(registry, rules):
+    """
+    Evaluate the test cases of the catalog `rules` the registry was built from. Reports how many executable rules
+    reach the expected outcome, and the cases where they do not, so generic threshold checks can be verified
+    against the catalog authors' intent.
+    """
+    summary = {"cases": 0, "agreed": 0, "disagreed": 0, "not_applicable": 0, "no_verdict": 0}
+    disagreements = []
+
+    for compiled, rule in zip(registry.rules, rules):
+        if not compiled.executable:
+            continue
+        specs, indexes = compile_evidence_plan([compiled])
+        for case in rule.get("test_cases") or []:
+            inputs = case.get("input_stub")
+            expected = case.get("expected_outcome")
+            if not isinstance(inputs, dict) or expected not in ("pass", "fail"):
+                continue
+
+            summary["cases"] += 1
+            if not compiled.required <= {name for name, value in inputs.items() if value is not None}:
+                summary["not_applicable"] += 1
+                continue
+
+            status = evaluate_rules([compiled], specs, indexes, inputs)[0]["status"]
+            if status not in ("pass", "fail"):
+                summary["no_verdict"] += 1
+            elif status == expected:
+                summary["agreed"] += 1
+            else:
+                summary["disagreed"] += 1
+                disagreements.append(
+                    {
+                        "rule": compiled.id,
+                        "category": compiled.category,
+                        "case": case.get("name"),
+                        "expected": expected,
+                        "status": status,
+                    }
+                )
+
+    return {
+        "status": "success",
+        "passed": summary["disagreed"] == 0,
+        "executable_rules": sum(rule.executable for rule in registry.rules),
+        "summary": summary,
+        "disagreements": disagreements,
+    }
+
+
+def fetch_inputs(url, user_agent=DEFAULT_USER_AGENT_REGULAR, timeout=30):
+    """Fetch a URL and return the page inputs it provides."""
+    response = requests.get(url, headers={"User-Agent": user_agent}, timeout=timeout)
+    return {
+        "url": url,
+        "final_url": response.url,
+        "html": response.text,
+        "http_status": response.status_code,
+        "http_headers": dict(response.headers),
+    }
+
+
+def read_text_file(path):
+    """Return the contents of a text file."""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the SEO rule catalog against a page")
+    parser.add_argument("--url", help="URL to fetch and evaluate")
+    parser.add_argument("--html", help="HTML content string to evaluate")
+    parser.add_argument("--html-file", help="Path to a local .html file to evaluate")
+    parser.add_argument("--robots-file", help="Path to a robots.txt file to add as the robots_txt input")
+    parser.add_argument("--sitemap-file", help="Path to a sitemap XML file to add as the sitemap_xml input")
+    parser.add_argument("--inputs-file", help="Path to a JSON object of additional input fields")
+    parser.add_argument("--scope", action="append", choices=SCOPES, help="Only evaluate rules of this scope")
+    parser.add_argument("--rule", action="append", help="Only evaluate this rule id (repeatable)")
+    parser.add_argument(
+        "--verdicts-only", action="store_true", help="Leave rules without an executable check out of the results"
+    )
+    parser.add_argument("--self-test", action="store_true", help="Evaluate the catalog's test cases instead of a page")
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="Path to the rule catalog")
+    parser.add_argument(
+        "--compiled-catalog", help="Path to the compiled catalog artifact (default: next to the catalog)"
+    )
+    parser.add_argument("--output", help="Output file for results", default="rule_engine_results.json")
+
+    args = parser.parse_args()
+
+    try:
+        catalog = CompiledCatalog(args.catalog, args.compiled_catalog)
+    except Exception as e:
+        print(f"Error reading rule catalog: {e}")
+        sys.exit(1)
+
+    if args.self_test:
+        rules = catalog.get_many(args.rule) if args.rule else catalog.rules()
+        result = run_test_cases(RuleRegistry(rules, len(catalog)), rules)
+    else:
+        inputs = {}
+        try:
+            if args.inputs_file:
+                with open(args.inputs_file, "r", encoding="utf-8") as f:
+                    inputs.update(json.load(f))
+            if args.url:
+                inputs.update(fetch_inputs(args.url))
+            if args.html:
+                inputs["html"] = args.html
+            if args.html_file:
+                inputs["html"] = read_text_file(args.html_file)
+            if args.robots_file:
+                inputs["robots_txt"] = read_text_file(args.robots_file)
+            if args.sitemap_file:
+                inputs["sitemap_xml"] = read_text_file(args.sitemap_file)
+        except Exception as e:
+            print(f"Error reading inputs: {e}")
+            sys.exit(1)
+
+        if not inputs:
+            print("Error: Must provide --url, --html, --html-file, --robots-file, --sitemap-file or --inputs-file")
+            sys.exit(1)
+
+        # Linked stylesheets are read from local paths for HTML input and fetched for a fetched page
+        session = None
+        if args.html_file:
+            stylesheet_loader, base_url = local_stylesheet_loader, os.path.abspath(args.html_file)
+        elif args.url and not args.html:
+            session = requests.Session()
+            session.headers["User-Agent"] = DEFAULT_USER_AGENT_REGULAR
+            stylesheet_loader, base_url = http_stylesheet_loader(session), inputs["final_url"]
+        else:
+            stylesheet_loader, base_url = local_stylesheet_loader, os.path.join(os.getcwd(), "")
+
+        # Only the rules these inputs can satisfy are loaded from the compiled catalog
+        available = {name for name, value in inputs.items() if value is not None}
+        registry = RuleRegistry.for_inputs(catalog, available, args.scope, args.rule)
+        try:
+            result = registry.evaluate(inputs, stylesheet_loader=stylesheet_loader, base_url=base_url)
+        finally:
+            if session is not None:
+                session.close()
+        if args.verdicts_only:
+            result["results"] = [r for r in result["results"] if r["status"] not in ("collected", "not_applicable")]
+
+    catalog.close()
+
+    # Output results
+    print(json.dumps(result, indent=2, default=str))
+
+    # Save to file if specified
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, default=str)
+
+    # Exit with appropriate code
+    sys.exit(0 if result.get("passed", False) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,16 +4,37 @@ Sneaky Redirect Detection Script
 Detects redirects that serve different content to users versus crawlers (Googlebot).
 """
 
+import os
 import sys
 import json
 import argparse
 import requests
 from urllib.parse import urlparse, urljoin
 import time
+import threading
 import logging
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+# The shared HTTP cache lives in the sibling http_cache script directory and is optional
+HTTP_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "http_cache")
+if HTTP_CACHE_DIR not in sys.path:
+    sys.path.append(HTTP_CACHE_DIR)
+try:
+    from http_cache import CachingAdapter, HttpCache
+except ImportError:
+    CachingAdapter = HttpCache = None
+
+# Per-phase timings and counters come from the sibling metrics script directory, put first on the path so that
+# no installed "metrics" module is picked up instead
+METRICS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "metrics")
+if METRICS_DIR not in sys.path:
+    sys.path.insert(0, METRICS_DIR)
+from metrics import EXPORT_FORMATS, NULL_METRICS, Metrics, add_timings, export_metrics  # noqa: E402
+
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -28,9 +49,30 @@ SUCCESS_CODES = {200, 201, 202, 204}
 CLIENT_ERROR_CODES = {400, 401, 403, 404, 405, 410, 429}
 SERVER_ERROR_CODES = {500, 501, 502, 503, 504, 505}
 
-
-def setup_session():
-    """Setup requests session with retry strategy."""
+REDIRECT_TYPES = {
+    301: "Permanent Redirect",
+    302: "Temporary Redirect",
+    303: "See Other",
+    307: "Temporary Redirect (Method Preserved)",
+    308: "Permanent Redirect (Method Preserved)",
+}
+
+# Response headers kept on each hop unless full header capture is requested.
+# Location and Content-Length are already stored as hop fields.
+HOP_HEADER_ALLOWLIST = (
+    "Content-Type",
+    "Server",
+    "Cache-Control",
+    "Vary",
+    "Refresh",
+    "Retry-After",
+    "X-Robots-Tag",
+    "Link",
+)
+
+
+def setup_session(http_cache=None):
+    """Setup requests session with retry strategy, going through the shared on-disk `http_cache` when given."""
     session = requests.Session()
 
     # Setup retry strategy
@@ -40,16 +82,201 @@ def setup_session():
         status_forcelist=[429, 500, 502, 503, 504],
     )
 
-    adapter = HTTPAdapter(max_retries=retry_strategy)
+    if http_cache is not None:
+        adapter = CachingAdapter(http_cache, max_retries=retry_strategy)
+    else:
+        adapter = HTTPAdapter(max_retries=retry_strategy)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
 
     return session
 
 
-def follow_redirects_with_details(session, url, user_agent, max_redirects=10, timeout=30):
+class Hop:
+    """Compact record of one request in a redirect chain."""
+
+    __slots__ = (
+        "step",
+        "url",
+        "status_code",
+        "redirect_type",
+        "location",
+        "content_length",
+        "headers",
+        "cache_hit",
+        "body_bytes_read",
+        "body_truncated",
+    )
+
+    def __init__(self, url, status_code, location="", content_length=None, headers=None, **fields):
+        self.step = None
+        self.url = url
+        self.status_code = status_code
+        self.redirect_type = REDIRECT_TYPES.get(status_code)
+        self.location = location
+        self.content_length = content_length
+        self.headers = headers or {}
+        self.cache_hit = None
+        self.body_bytes_read = None
+        self.body_truncated = None
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def get(self, key, default=None):
+        """Dict-style field access, so hops can be compared like the JSON records they serialize to."""
+        return getattr(self, key, default)
+
+    def copy(self):
+        hop = Hop(self.url, self.status_code)
+        for name in self.__slots__:
+            setattr(hop, name, getattr(self, name))
+        return hop
+
+    def to_dict(self):
+        """Serialize the hop, omitting unset optional fields."""
+        return {name: getattr(self, name) for name in self.__slots__ if getattr(self, name) is not None}
+
+
+def json_default(obj):
+    """json.dumps hook for Hop records."""
+    if isinstance(obj, Hop):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def deep_sizeof(obj):
+    """Approximate the memory retained by a result: containers, Hop records and their contents."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key) + deep_sizeof(value) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(deep_sizeof(item) for item in obj)
+    elif isinstance(obj, Hop):
+        size += sum(deep_sizeof(getattr(obj, name)) for name in Hop.__slots__)
+    return size
+
+
+class HopCache:
+    """
+    Thread-safe LRU cache of redirect hop results keyed on (URL, user agent), with entries expiring after `ttl` seconds.
+    Shared by all workers in a batch so common first hops (http->https, apex->www) are requested once.
+    """
+
+    def __init__(self, max_entries=10000, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url, user_agent):
+        """Return a copy of the cached hop for (url, user_agent), or None if missing or expired."""
+        key = (url, user_agent)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1].copy()
+
+    def put(self, url, user_agent, hop):
+        """Store a hop for (url, user_agent), evicting the least recently used entries beyond `max_entries`."""
+        key = (url, user_agent)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), hop.copy())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """Return hit/miss counters for reporting."""
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def read_body_within_budget(response, budget):
+    """
+    Read at most `budget` bytes of a streamed response body. Returns (bytes_read, truncated).
+    The body only counts as truncated once more than `budget` bytes arrive, so a body of exactly `budget` bytes is
+    read whole.
+    """
+    bytes_read = 0
+    for chunk in response.iter_content(chunk_size=min(8192, budget + 1)):
+        bytes_read += len(chunk)
+        if bytes_read > budget:
+            return budget, True
+    return bytes_read, False
+
+
+def fetch_hop(session, url, headers, timeout, body_budget=None, full_headers=False):
     """
-    Follow redirects and return detailed information about the redirect chain.
+    Request a single URL without following redirects and describe the response as a Hop.
+    With a `body_budget`, the response is streamed: redirect bodies are never read and the final body
+    is read up to `body_budget` bytes. Content-Length is reported from the header when the server sends one.
+    Only HOP_HEADER_ALLOWLIST headers are kept unless `full_headers` is set.
+    """
+    streaming = body_budget is not None
+    response = session.get(url, headers=headers, allow_redirects=False, timeout=timeout, verify=True, stream=streaming)
+
+    try:
+        if not streaming:
+            content_length = len(response.content)
+        else:
+            body_bytes_read, body_truncated = 0, False
+            if response.status_code not in REDIRECT_CODES and body_budget > 0:
+                body_bytes_read, body_truncated = read_body_within_budget(response, body_budget)
+
+            header_length = response.headers.get("Content-Length", "")
+            if header_length.isdigit():
+                content_length = int(header_length)
+            elif response.status_code not in REDIRECT_CODES and body_budget > 0 and not body_truncated:
+                content_length = body_bytes_read
+            else:
+                content_length = None
+    finally:
+        response.close()
+
+    if full_headers:
+        hop_headers = dict(response.headers)
+    else:
+        hop_headers = {name: response.headers[name] for name in HOP_HEADER_ALLOWLIST if name in response.headers}
+
+    hop = Hop(
+        url,
+        response.status_code,
+        location=response.headers.get("Location", ""),
+        content_length=content_length,
+        headers=hop_headers,
+    )
+
+    if streaming:
+        hop.body_bytes_read = body_bytes_read
+        hop.body_truncated = body_truncated
+
+    return hop
+
+
+def follow_redirects_with_details(
+    session,
+    url,
+    user_agent,
+    max_redirects=10,
+    timeout=30,
+    hop_cache=None,
+    body_budget=None,
+    full_headers=False,
+    metrics=NULL_METRICS,
+):
+    """
+    Follow redirects and return detailed information about the redirect chain as a list of Hop records.
+    Redirect hops are served from `hop_cache` when one is given; such hops are marked with cache_hit.
+    See fetch_hop for `body_budget` and `full_headers`.
 
     Returns:
         dict: Contains final URL, status code, redirect chain, and analysis
@@ -57,63 +284,56 @@ def follow_redirects_with_details(session, url, user_agent, max_redirects=10, ti
     redirect_chain = []
     current_url = url
 
-    session.headers.update({"User-Agent": user_agent})
+    headers = {"User-Agent": user_agent}
 
     try:
         for step in range(max_redirects + 1):
-            logger.info(f"Step {step}: Requesting {current_url}")
-
-            # Make request without following redirects
-            response = session.get(current_url, allow_redirects=False, timeout=timeout, verify=True)
-
-            step_info = {
-                "step": step,
-                "url": current_url,
-                "status_code": response.status_code,
-                "headers": dict(response.headers),
-                "content_length": len(response.content),
-                "content_type": response.headers.get("Content-Type", ""),
-                "server": response.headers.get("Server", ""),
-                "location": response.headers.get("Location", ""),
-                "redirect_type": None,
-            }
+            hop = hop_cache.get(current_url, user_agent) if hop_cache else None
+
+            if hop:
+                logger.info(f"Step {step}: Cached hop for {current_url}")
+                hop.cache_hit = True
+                metrics.count("hop_cache_hits")
+            else:
+                logger.info(f"Step {step}: Requesting {current_url}")
+
+                # Make request without following redirects
+                with metrics.span("fetch"):
+                    hop = fetch_hop(session, current_url, headers, timeout, body_budget, full_headers)
+                metrics.count("requests")
+                metrics.count(
+                    "bytes_fetched", hop.body_bytes_read if hop.body_bytes_read is not None else hop.content_length or 0
+                )
+                if hop_cache and hop.status_code in REDIRECT_CODES:
+                    hop_cache.put(current_url, user_agent, hop)
+                hop.cache_hit = False
 
-            # Determine redirect type
-            if response.status_code in REDIRECT_CODES:
-                if response.status_code == 301:
-                    step_info["redirect_type"] = "Permanent Redirect"
-                elif response.status_code == 302:
-                    step_info["redirect_type"] = "Temporary Redirect"
-                elif response.status_code == 303:
-                    step_info["redirect_type"] = "See Other"
-                elif response.status_code == 307:
-                    step_info["redirect_type"] = "Temporary Redirect (Method Preserved)"
-                elif response.status_code == 308:
-                    step_info["redirect_type"] = "Permanent Redirect (Method Preserved)"
-
-            redirect_chain.append(step_info)
+            hop.step = step
+            status_code = hop.status_code
+
+            redirect_chain.append(hop)
 
             # Check if this is a redirect
-            if response.status_code not in REDIRECT_CODES:
+            if status_code not in REDIRECT_CODES:
                 # Final destination reached
                 final_result = {
                     "final_url": current_url,
-                    "final_status_code": response.status_code,
+                    "final_status_code": status_code,
                     "redirect_count": step,
                     "redirect_chain": redirect_chain,
-                    "total_time": sum(r.get("response_time", 0) for r in redirect_chain),
+                    "total_time": sum(r.get("response_time", 0) or 0 for r in redirect_chain),
                     "user_agent": user_agent,
-                    "success": response.status_code in SUCCESS_CODES,
+                    "success": status_code in SUCCESS_CODES,
                 }
                 return final_result
 
             # Get next URL from Location header
-            location = response.headers.get("Location")
+            location = hop.location
             if not location:
                 # Redirect without location header - malformed
                 final_result = {
                     "final_url": current_url,
-                    "final_status_code": response.status_code,
+                    "final_status_code": status_code,
                     "redirect_count": step,
                     "redirect_chain": redirect_chain,
                     "error": "Redirect response missing Location header",
@@ -251,26 +471,55 @@ def analyze_redirect_differences(regular_result, googlebot_result):
     return differences
 
 
-def analyze_url_for_sneaky_redirects(url, max_redirects=10, timeout=30):
+def analyze_url_for_sneaky_redirects(
+    url,
+    max_redirects=10,
+    timeout=30,
+    session=None,
+    request_delay=1,
+    hop_cache=None,
+    body_budget=None,
+    full_headers=False,
+    http_cache=None,
+    metrics=NULL_METRICS,
+):
     """Analyze a URL for sneaky redirects by testing with different user agents."""
-    session = setup_session()
+    if session is None:
+        session = setup_session(http_cache)
 
     try:
         logger.info(f"Analyzing URL: {url}")
 
         # Test with regular user agent
         logger.info("Testing with regular browser user agent...")
-        regular_result = follow_redirects_with_details(session, url, USER_AGENT_REGULAR, max_redirects, timeout)
+        with metrics.span("follow_regular"):
+            regular_result = follow_redirects_with_details(
+                session, url, USER_AGENT_REGULAR, max_redirects, timeout, hop_cache, body_budget, full_headers, metrics
+            )
 
         # Wait between requests to be polite
-        time.sleep(1)
+        if request_delay:
+            with metrics.span("request_delay"):
+                time.sleep(request_delay)
 
         # Test with Googlebot user agent
         logger.info("Testing with Googlebot user agent...")
-        googlebot_result = follow_redirects_with_details(session, url, USER_AGENT_GOOGLEBOT, max_redirects, timeout)
+        with metrics.span("follow_googlebot"):
+            googlebot_result = follow_redirects_with_details(
+                session,
+                url,
+                USER_AGENT_GOOGLEBOT,
+                max_redirects,
+                timeout,
+                hop_cache,
+                body_budget,
+                full_headers,
+                metrics,
+            )
 
         # Analyze differences
-        differences = analyze_redirect_differences(regular_result, googlebot_result)
+        with metrics.span("compare"):
+            differences = analyze_redirect_differences(regular_result, googlebot_result)
 
         # Determine if sneaky redirect detected
         has_sneaky_redirects = len(differences) > 0
@@ -314,6 +563,80 @@ def analyze_url_for_sneaky_redirects(url, max_redirects=10, timeout=30):
         return {"status": "error", "message": f"Failed to analyze URL: {str(e)}", "url": url}
 
 
+def iter_urls(source):
+    """Yield URLs from a file path, or stdin for "-", skipping blank lines and # comments."""
+    f = sys.stdin if source == "-" else open(source, "r", encoding="utf-8")
+    try:
+        for line in f:
+            url = line.strip()
+            if url and not url.startswith("#"):
+                yield url
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def stream_sneaky_redirect_analysis(
+    urls,
+    workers=8,
+    max_redirects=10,
+    timeout=30,
+    request_delay=1,
+    hop_cache=None,
+    body_budget=None,
+    full_headers=False,
+    http_cache=None,
+    metrics=NULL_METRICS,
+):
+    """
+    Analyze URLs across a pool of worker threads, yielding each result as soon as it completes.
+    At most `workers * 2` URLs are queued at a time, so memory stays flat however long `urls` is.
+    All workers share `hop_cache` and `http_cache` when given. Each result gets the timings of its own URL, which
+    add up in `metrics`.
+    """
+    local = threading.local()
+    sessions = []
+    sessions_lock = threading.Lock()
+
+    def analyze(url):
+        # Each worker keeps its own session so connections are reused across the URLs it handles
+        if not hasattr(local, "session"):
+            local.session = setup_session(http_cache)
+            with sessions_lock:
+                sessions.append(local.session)
+        url_metrics = metrics.child()
+        result = analyze_url_for_sneaky_redirects(
+            url,
+            max_redirects,
+            timeout,
+            local.session,
+            request_delay,
+            hop_cache,
+            body_budget,
+            full_headers,
+            metrics=url_metrics,
+        )
+        return add_timings(result, url_metrics, metrics)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            for url in urls:
+                pending.add(executor.submit(analyze, url))
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+    finally:
+        for session in sessions:
+            session.close()
+
+
 def analyze_manual_redirect_data(final_url_googlebot, final_url_user, http_status_googlebot, http_status_user):
     """Analyze manually provided redirect data."""
     try:
@@ -379,11 +702,91 @@ def analyze_manual_redirect_data(final_url_googlebot, final_url_user, http_statu
         return {"status": "error", "message": f"Failed to analyze manual data: {str(e)}"}
 
 
+def run_batch(
+    source,
+    output,
+    workers,
+    max_redirects,
+    timeout,
+    request_delay,
+    hop_cache_size=10000,
+    hop_cache_ttl=300,
+    body_budget=None,
+    full_headers=False,
+    http_cache=None,
+    metrics=NULL_METRICS,
+):
+    """Stream batch results as JSON Lines to stdout and `output`. Returns the process exit code."""
+    counts = {"analyzed": 0, "failed": 0, "result_bytes": 0, "max_result_bytes": 0, "json_bytes": 0}
+    hop_cache = HopCache(hop_cache_size, hop_cache_ttl) if hop_cache_size > 0 else None
+    out = open(output, "w") if output else None
+
+    try:
+        for result in stream_sneaky_redirect_analysis(
+            iter_urls(source),
+            workers,
+            max_redirects,
+            timeout,
+            request_delay,
+            hop_cache,
+            body_budget,
+            full_headers,
+            http_cache,
+            metrics,
+        ):
+            line = json.dumps(result, default=json_default)
+            print(line, flush=True)
+            if out:
+                out.write(line + "\n")
+                out.flush()
+
+            counts["analyzed"] += 1
+            result_bytes = deep_sizeof(result)
+            counts["result_bytes"] += result_bytes
+            counts["max_result_bytes"] = max(counts["max_result_bytes"], result_bytes)
+            counts["json_bytes"] += len(line) + 1
+            if not result.get("passed", False):
+                counts["failed"] += 1
+    except OSError as e:
+        print(f"Error reading URLs: {e}")
+        return 1
+    finally:
+        if out:
+            out.close()
+
+    logger.info(f"Analyzed {counts['analyzed']} URL(s), {counts['failed']} failed")
+    if counts["analyzed"]:
+        logger.info(
+            f"Memory per audited URL: avg {counts['result_bytes'] // counts['analyzed']} bytes, "
+            f"max {counts['max_result_bytes']} bytes; "
+            f"JSON per URL: avg {counts['json_bytes'] // counts['analyzed']} bytes"
+        )
+    if hop_cache:
+        logger.info(f"Redirect hop cache: {hop_cache.stats()}")
+    if http_cache:
+        logger.info(f"HTTP cache: {http_cache.stats()}")
+    return 0 if counts["failed"] == 0 else 1
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Detect sneaky redirects that serve different content to users vs crawlers"
     )
     parser.add_argument("--url", help="URL to analyze for sneaky redirects")
+    parser.add_argument("--urls-file", help="File with one URL per line, or - for stdin; streams results as JSON Lines")
+    parser.add_argument("--workers", type=int, default=8, help="Parallel workers for --urls-file (default: 8)")
+    parser.add_argument(
+        "--hop-cache-size",
+        type=int,
+        default=10000,
+        help="Redirect hops cached across URLs in --urls-file mode, 0 to disable (default: 10000)",
+    )
+    parser.add_argument(
+        "--hop-cache-ttl", type=float, default=300, help="Seconds a cached redirect hop stays valid (default: 300)"
+    )
+    parser.add_argument(
+        "--request-delay", type=float, default=1, help="Delay in seconds between user agents per URL (default: 1)"
+    )
 
     # Manual input options (matching the original rule format)
     parser.add_argument("--final-url-googlebot", help="Final URL after redirect for Googlebot")
@@ -393,19 +796,120 @@ def main():
 
     parser.add_argument("--max-redirects", type=int, default=10, help="Maximum redirects to follow (default: 10)")
     parser.add_argument("--timeout", type=int, default=30, help="Request timeout in seconds (default: 30)")
-    parser.add_argument("--output", help="Output file for results", default="sneaky_redirect_results.json")
+    parser.add_argument(
+        "--full-headers", action="store_true", help="Keep every response header on each hop, not just the allow-list"
+    )
+    parser.add_argument(
+        "--body-budget",
+        type=int,
+        help="Stream responses: skip redirect bodies and read at most this many bytes of the final body",
+    )
+    parser.add_argument(
+        "--http-cache",
+        help="Shared on-disk HTTP cache file; cached responses are revalidated with conditional requests",
+    )
+    parser.add_argument(
+        "--http-cache-size-mb",
+        type=float,
+        default=512,
+        help="Size limit of the HTTP cache in MB of compressed bodies (default: 512)",
+    )
+    parser.add_argument(
+        "--offline", action="store_true", help="Replay responses from --http-cache without network access"
+    )
+    parser.add_argument(
+        "--output",
+        help="Output file for results (default: sneaky_redirect_results.json, or .jsonl with --urls-file)",
+    )
+    parser.add_argument(
+        "--timings", action="store_true", help="Add per-phase durations and counts to the results under timings"
+    )
+    parser.add_argument("--metrics-file", help="Export the timings of the run to this file (implies --timings)")
+    parser.add_argument(
+        "--metrics-format",
+        choices=EXPORT_FORMATS,
+        default="jsonl",
+        help="Format of --metrics-file: jsonl appends a record per run, prometheus replaces the file (default: jsonl)",
+    )
 
     args = parser.parse_args()
 
+    if args.body_budget is not None and args.body_budget < 0:
+        print("Error: --body-budget must be zero or greater")
+        sys.exit(1)
+
+    if args.offline and not args.http_cache:
+        print("Error: --offline requires --http-cache")
+        sys.exit(1)
+
+    if args.http_cache and HttpCache is None:
+        print("Error: --http-cache requires the http_cache script directory next to this one")
+        sys.exit(1)
+
     # Check input parameters
     manual_params = [args.final_url_googlebot, args.final_url_user, args.http_status_googlebot, args.http_status_user]
     has_manual_params = any(param is not None for param in manual_params)
     has_all_manual_params = all(param is not None for param in manual_params)
 
+    metrics = Metrics() if args.timings or args.metrics_file else NULL_METRICS
+
+    # Only fetching URLs goes through the cache
+    http_cache = None
+    if args.http_cache and (args.url or args.urls_file):
+        try:
+            http_cache = HttpCache(args.http_cache, args.http_cache_size_mb, offline=args.offline)
+        except Exception as e:
+            print(f"Error opening HTTP cache: {e}")
+            sys.exit(1)
+
+    if args.urls_file:
+        output = args.output if args.output is not None else "sneaky_redirect_results.jsonl"
+        try:
+            exit_code = run_batch(
+                args.urls_file,
+                output,
+                args.workers,
+                args.max_redirects,
+                args.timeout,
+                args.request_delay,
+                args.hop_cache_size,
+                args.hop_cache_ttl,
+                args.body_budget,
+                args.full_headers,
+                http_cache=http_cache,
+                metrics=metrics,
+            )
+        finally:
+            if http_cache is not None:
+                http_cache.close()
+        if args.metrics_file:
+            try:
+                export_metrics(
+                    metrics.snapshot(), args.metrics_file, args.metrics_format, {"detector": "sneaky_redirect"}
+                )
+            except OSError as e:
+                print(f"Error writing metrics file: {e}")
+                sys.exit(1)
+        sys.exit(exit_code)
+
     if args.url:
         if has_manual_params:
             print("Warning: Both URL and manual parameters provided. Using URL analysis.")
-        result = analyze_url_for_sneaky_redirects(args.url, args.max_redirects, args.timeout)
+        try:
+            result = analyze_url_for_sneaky_redirects(
+                args.url,
+                args.max_redirects,
+                args.timeout,
+                request_delay=args.request_delay,
+                body_budget=args.body_budget,
+                full_headers=args.full_headers,
+                http_cache=http_cache,
+                metrics=metrics,
+            )
+        finally:
+            if http_cache is not None:
+                logger.info(f"HTTP cache: {http_cache.stats()}")
+                http_cache.close()
     elif has_all_manual_params:
         result = analyze_manual_redirect_data(
             args.final_url_googlebot, args.final_url_user, args.http_status_googlebot, args.http_status_user
@@ -416,16 +920,26 @@ def main():
         )
         sys.exit(1)
     else:
-        print("Error: Must provide either --url or all manual parameters")
+        print("Error: Must provide either --url, --urls-file or all manual parameters")
         sys.exit(1)
 
+    add_timings(result, metrics)
+
     # Output results
-    print(json.dumps(result, indent=2))
+    print(json.dumps(result, indent=2, default=json_default))
 
     # Save to file if specified
-    if args.output:
-        with open(args.output, "w") as f:
-            json.dump(result, f, indent=2)
+    output = args.output if args.output is not None else "sneaky_redirect_results.json"
+    if output:
+        with open(output, "w") as f:
+            json.dump(result, f, indent=2, default=json_default)
+
+    if args.metrics_file:
+        try:
+            export_metrics(result["timings"], args.metrics_file, args.metrics_format, {"detector": "sneaky_redirect"})
+        except OSError as e:
+            print(f"Error writing metrics file: {e}")
+            sys.exit(1)
 
     # Exit with appropriate code
     sys.exit(0 if result.get("passed", False) else 1)
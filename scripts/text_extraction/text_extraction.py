@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Text Extraction
+Raw text of HTML pages for the keyword stuffing and cloaking detection scripts, with two parser backends.
+"lxml" parses with libxml2 and is several times faster than "html.parser", and is only used on markup both
+parsers read alike, so the extracted text never depends on the backend.
+"""
+
+import re
+import sys
+import random
+import argparse
+import logging
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+logger = logging.getLogger(__name__)
+
+PARSER_BACKENDS = ("lxml", "html.parser")
+DEFAULT_PARSER_BACKEND = "lxml" if etree is not None else "html.parser"
+
+# Markup the two parsers read differently (stray "<", CDATA, markup inside <title>/<textarea>, content
+# outside the html/head/body skeleton) is handed to html.parser. So are template contents and ruby annotations:
+# BeautifulSoup keeps their strings apart from the document text and get_text() leaves them out, while lxml nests
+# these elements differently when they are not closed where html.parser expects
+SCRIPT_STYLE_RE = re.compile(r"<(script|style)\b[^>]*>.*?</\1\s*>", re.I | re.S)
+RCDATA_MARKUP_RE = re.compile(r"<(?:title|textarea)\b[^>]*>[^<]*<(?!/(?:title|textarea)\s*>)", re.I)
+NON_TEXT_MARKUP_RE = re.compile(r"<(?:template|rt|rp)[\s>/]", re.I)
+# Character references (lxml resolves "&notin" as "&not" + "in", keeps "AT&T" and "&foo;" as written), NUL characters
+# and the elements lxml reads as raw text are decoded differently by the two parsers
+DECODING_MARKUP_RE = re.compile(r"&[a-zA-Z#]|\x00|<(?:xmp|plaintext|iframe|noembed|noframes)[\s>/]", re.I)
+AMBIGUOUS_MARKUP_RE = re.compile(
+    r"<(?![a-zA-Z][a-zA-Z0-9-]*(?:\s[^<>]*)?/?>|/[a-zA-Z][a-zA-Z0-9-]*\s*>|!--|!doctype|\?)|<!\[CDATA\[", re.I
+)
+STRUCTURE_OPEN_RE = re.compile(r"<(html|head|body)[\s>/]", re.I)
+BODY_OPEN_RE = re.compile(r"<body[\s>/]", re.I)
+HEAD_CLOSE_RE = re.compile(r"</head\s*>", re.I)
+BODY_CLOSE_RE = re.compile(r"</body\s*>", re.I)
+HTML_CLOSE_RE = re.compile(r"</html\s*>", re.I)
+TITLE_RE = re.compile(r"<title\b[^>]*>[^<]*</title\s*>", re.I)
+COMMENT_RE = re.compile(r"<!--.*?-->", re.S)
+TAG_RE = re.compile(r"<[^>]*>")
+TAG_NAME_RE = re.compile(r"</?([a-zA-Z][a-zA-Z0-9-]*)")
+HEAD_TAGS = {"html", "head", "title", "meta", "link", "base", "script", "style"}
+
+
+def is_head_markup(fragment, allowed_tags=HEAD_TAGS):
+    """Return True if `fragment` holds no text and only tags from `allowed_tags`."""
+    fragment = COMMENT_RE.sub("", TITLE_RE.sub("", fragment))
+    if TAG_RE.sub("", fragment).strip():
+        return False
+    return all(tag.lower() in allowed_tags for tag in TAG_NAME_RE.findall(fragment))
+
+
+def lxml_reads_like_html_parser(html_content):
+    """Return True if lxml and html.parser would extract the same text from this markup."""
+    if (
+        RCDATA_MARKUP_RE.search(html_content)
+        or NON_TEXT_MARKUP_RE.search(html_content)
+        or DECODING_MARKUP_RE.search(html_content)
+    ):
+        return False
+
+    scan = SCRIPT_STYLE_RE.sub("", html_content)
+    if AMBIGUOUS_MARKUP_RE.search(scan):
+        return False
+
+    # lxml rebuilds a single html/head/body skeleton and moves misplaced content into it, html.parser keeps
+    # the document order, so only documents whose skeleton is already in place are handed to lxml
+    structure = {}
+    for match in STRUCTURE_OPEN_RE.finditer(scan):
+        name = match.group(1).lower()
+        if name in structure:
+            return False
+        structure[name] = match
+
+    html_close = HTML_CLOSE_RE.search(scan)
+    if html_close and not is_head_markup(scan[html_close.end() :], set()):
+        return False
+
+    head, body = structure.get("head"), structure.get("body")
+    if head and not is_head_markup(scan[: head.start()], {"html"}):
+        return False
+
+    if body:
+        if not is_head_markup(scan[: body.start()]):
+            return False
+        body_close = BODY_CLOSE_RE.search(scan, body.end())
+        if body_close and not is_head_markup(scan[body_close.end() :], {"html"}):
+            return False
+    elif head:
+        head_close = HEAD_CLOSE_RE.search(scan, head.end())
+        if not is_head_markup(scan[: head_close.end() if head_close else len(scan)]):
+            return False
+
+    return True
+
+
+def extract_text_html_parser(html_content, drop_tags, body_only):
+    """Extract raw text with BeautifulSoup and html.parser."""
+    soup = BeautifulSoup(html_content, "html.parser")
+
+    for element in soup(drop_tags):
+        element.decompose()
+
+    body = soup.find("body") if body_only else None
+    return body.get_text() if body else soup.get_text()
+
+
+def extract_text_lxml(html_content, drop_tags, body_only):
+    """Extract raw text with lxml's HTML parser."""
+    if not html_content.strip():
+        return ""
+
+    root = etree.fromstring(html_content, etree.HTMLParser())
+    if root is None:
+        return ""
+
+    etree.strip_elements(root, *drop_tags, with_tail=False)
+
+    # lxml always creates a <body>; html.parser only has one when the markup does
+    body = None
+    if body_only and BODY_OPEN_RE.search(SCRIPT_STYLE_RE.sub("", html_content)):
+        body = root.find("body")
+
+    node = body if body is not None else root
+    return "".join(node.itertext())
+
+
+def extract_raw_text(html_content, drop_tags, body_only=True, parser_backend=DEFAULT_PARSER_BACKEND):
+    """
+    Return the text of `html_content` without `drop_tags` elements, before whitespace normalization: the text of
+    the <body> when `body_only` and the page has one, otherwise of the whole document.
+    The lxml backend falls back to html.parser when lxml is unavailable or would read the markup differently.
+    """
+    if parser_backend not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend: {parser_backend}")
+
+    if parser_backend == "lxml" and etree is not None and lxml_reads_like_html_parser(html_content):
+        try:
+            return extract_text_lxml(html_content, drop_tags, body_only)
+        except (ValueError, etree.LxmlError) as e:
+            logger.debug(f"lxml could not parse HTML, falling back to html.parser: {e}")
+
+    return extract_text_html_parser(html_content, drop_tags, body_only)
+
+
+# Building blocks of the generated documents of differential_check(): markup each guard in
+# lxml_reads_like_html_parser() exists for, alongside markup both parsers read alike
+FUZZ_TAGS = [
+    "p", "div", "span", "b", "a", "li", "td", "table", "pre", "br", "img", "form", "button", "select", "option",
+    "svg", "math", "object", "frameset", "listing", "noscript", "title", "textarea", "template", "rt", "rp",
+    "xmp", "plaintext", "iframe", "noembed", "noframes",
+]  # fmt: skip
+FUZZ_TEXTS = [
+    "word", "cheap flights", " x ", "a<b", "a > b", "\r\n", "\x0b", "\x0c", "\x01", "\x7f", "\ufffe", "\u00e9",
+    "AT&T", "&amp;", "&AMP", "&copy2024", "&notin", "&foo;", "&nbsp;", "&#65;", "&#x41;", "&#128;", "&#0;", "\x00",
+]  # fmt: skip
+FUZZ_SKELETONS = [
+    "<html><head><title>t</title></head><body>{}</body></html>",
+    "<body>{}</body>",
+    "<div>{}</div>",
+    "{}",
+]
+
+
+def generate_markup(rng, depth=0):
+    """Return a random fragment of nested FUZZ_TAGS and FUZZ_TEXTS, leaving some elements unclosed."""
+    parts = []
+    for _ in range(rng.randint(1, 4)):
+        if depth > 3 or rng.random() < 0.5:
+            parts.append(rng.choice(FUZZ_TEXTS))
+            continue
+        tag = rng.choice(FUZZ_TAGS)
+        parts.append(f"<{tag}>{generate_markup(rng, depth + 1)}" + (f"</{tag}>" if rng.random() < 0.85 else ""))
+    return "".join(parts)
+
+
+def differential_check(count, seed=0, drop_tags=("script", "style")):
+    """
+    Extract `count` generated documents with both backends, as a page would be with and without `body_only`, and
+    return how many took the lxml fast path and the documents whose whitespace-normalized text differed.
+    """
+    rng = random.Random(seed)
+    fast_path = 0
+    mismatches = []
+    for _ in range(count):
+        html_content = rng.choice(FUZZ_SKELETONS).format(generate_markup(rng))
+        fast_path += lxml_reads_like_html_parser(html_content)
+        for body_only in (True, False):
+            texts = [
+                " ".join(extract_raw_text(html_content, drop_tags, body_only, backend).split())
+                for backend in PARSER_BACKENDS
+            ]
+            if texts[0] != texts[1]:
+                mismatches.append(html_content)
+                break
+    return fast_path, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the text both parser backends extract from HTML files")
+    parser.add_argument("files", nargs="*", help="HTML files to extract")
+    parser.add_argument("--whole-document", action="store_true", help="Extract the whole document, not the body")
+    parser.add_argument(
+        "--fuzz", type=int, metavar="COUNT", help="Compare the backends on COUNT generated documents instead"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of --fuzz (default: 0)")
+
+    args = parser.parse_args()
+
+    if etree is None:
+        print("Error: lxml is not installed")
+        sys.exit(1)
+
+    if args.fuzz:
+        fast_path, mismatches = differential_check(args.fuzz, args.seed)
+        print(f"{args.fuzz} generated documents, lxml used for {fast_path}, {len(mismatches)} with different text")
+        for html_content in mismatches[:10]:
+            print(repr(html_content))
+        sys.exit(1 if mismatches else 0)
+
+    if not args.files:
+        parser.error("provide HTML files to extract, or --fuzz")
+
+    drop_tags = ["script", "style", "meta", "link", "noscript"]
+    mismatches = 0
+    for path in args.files:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            html_content = f.read()
+        fast_path = lxml_reads_like_html_parser(html_content)
+        texts = [
+            " ".join(extract_raw_text(html_content, drop_tags, not args.whole_document, backend).split())
+            for backend in PARSER_BACKENDS
+        ]
+        same = texts[0] == texts[1]
+        mismatches += not same
+        print(f"{path}: {'same' if same else 'DIFFERENT'} text, lxml {'used' if fast_path else 'skipped'}")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
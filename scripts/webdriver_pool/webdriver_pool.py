@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+WebDriver Pool
+Warm headless Chrome drivers shared across URLs by the Selenium-based detector scripts, and readiness-based page
+load detection. Selenium is only imported when a driver is started, so static analysis never loads the browser stack.
+"""
+
+import sys
+import time
+import queue
+import argparse
+import logging
+import threading
+from contextlib import nullcontext
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Driver memory limits measure the browser processes with psutil
+MEMORY_LIMIT_SUPPORTED = psutil is not None
+
+logger = logging.getLogger(__name__)
+
+
+def setup_driver():
+    """Setup headless Chrome driver."""
+    # Imported here so that static HTML analysis never loads the browser stack
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--window-size=1920,1080")
+
+    try:
+        driver = webdriver.Chrome(options=chrome_options)
+        return driver
+    except Exception as e:
+        logger.error(f"Failed to setup Chrome driver: {e}")
+        return None
+
+
+# Page readiness: the page counts as loaded once document.readyState is "complete", no new
+# resource entries have appeared and the DOM has not mutated for READY_IDLE_TIME seconds.
+READY_TIMEOUT = 15
+READY_IDLE_TIME = 0.5
+READY_POLL_INTERVAL = 0.1
+
+READINESS_SCRIPT = """
+if (!window.__seoReadiness) {
+    window.__seoReadiness = {lastMutation: performance.now()};
+    new MutationObserver(function () {
+        window.__seoReadiness.lastMutation = performance.now();
+    }).observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+return [
+    document.readyState,
+    performance.getEntriesByType("resource").length,
+    (performance.now() - window.__seoReadiness.lastMutation) / 1000
+];
+"""
+
+
+def wait_for_page_ready(driver, started_at, timeout=READY_TIMEOUT, idle_time=READY_IDLE_TIME, metrics=None):
+    """
+    Wait until the page is ready or `timeout` seconds have passed since `started_at`.
+    Returns page load details including the observed time-to-ready.
+    """
+    deadline = started_at + timeout
+    ready_state = None
+    resource_count = None
+    network_idle_since = time.monotonic()
+
+    while True:
+        now = time.monotonic()
+        if metrics is not None:
+            metrics.count("webdriver_calls")
+        try:
+            ready_state, current_resources, mutation_idle = driver.execute_script(READINESS_SCRIPT)
+        except Exception as e:
+            logger.warning(f"Error polling page readiness: {e}")
+            ready_state, current_resources, mutation_idle = None, resource_count, 0
+
+        if current_resources != resource_count:
+            resource_count = current_resources
+            network_idle_since = now
+
+        network_idle = now - network_idle_since >= idle_time
+        if ready_state == "complete" and network_idle and mutation_idle >= idle_time:
+            return {
+                "time_to_ready": round(now - started_at, 3),
+                "timed_out": False,
+                "ready_state": ready_state,
+                "resource_count": resource_count,
+            }
+
+        if now >= deadline:
+            logger.warning(f"Page not ready after {timeout}s, analyzing current state")
+            return {
+                "time_to_ready": round(now - started_at, 3),
+                "timed_out": True,
+                "ready_state": ready_state,
+                "resource_count": resource_count,
+            }
+
+        with metrics.span("ready_poll_sleep") if metrics is not None else nullcontext():
+            time.sleep(READY_POLL_INTERVAL)
+
+
+def browser_memory_mb(driver):
+    """
+    Return the resident memory in MB of the browser behind `driver`: the processes started by its chromedriver,
+    which include the renderers. Pages shared between processes are counted once per process.
+    """
+    service_process = psutil.Process(driver.service.process.pid)
+    rss = 0
+    for process in service_process.children(recursive=True):
+        try:
+            rss += process.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return rss / (1024 * 1024)
+
+
+class DriverPool:
+    """
+    Pool of warm headless Chrome drivers shared across URLs.
+    Drivers are recycled after a number of pages or when the browser's resident memory exceeds a limit.
+    """
+
+    def __init__(self, size=1, recycle_after=50, max_memory_mb=None):
+        if max_memory_mb and not MEMORY_LIMIT_SUPPORTED:
+            raise ValueError("A driver memory limit requires psutil")
+        self.size = max(1, size)
+        self.recycle_after = recycle_after
+        self.max_memory_mb = max_memory_mb
+        self._idle = queue.Queue()
+        self._page_counts = {}
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, metrics=None):
+        """Return an idle driver, starting a new one while the pool is below its size."""
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+
+            if can_create:
+                break
+
+            # Wait for a driver to come back; re-check capacity in case one was recycled instead
+            try:
+                return self._idle.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+        with metrics.span("driver_start") if metrics is not None else nullcontext():
+            driver = setup_driver()
+        if metrics is not None:
+            metrics.count("drivers_started")
+        with self._lock:
+            if not driver:
+                self._created -= 1
+                return None
+            self._page_counts[id(driver)] = 0
+        return driver
+
+    def release(self, driver, broken=False):
+        """Return a driver to the pool, quitting it if it is broken or due for recycling."""
+        with self._lock:
+            pages = self._page_counts.get(id(driver), 0) + 1
+            self._page_counts[id(driver)] = pages
+
+        if broken or self._needs_recycling(driver, pages):
+            self._discard(driver)
+        else:
+            self._idle.put(driver)
+
+    def close(self):
+        """Quit every idle driver in the pool."""
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+
+    def _needs_recycling(self, driver, pages):
+        if self.recycle_after and pages >= self.recycle_after:
+            return True
+
+        if self.max_memory_mb:
+            try:
+                memory_mb = browser_memory_mb(driver)
+            except Exception as e:
+                logger.warning(f"Error measuring Chrome memory: {e}")
+                return True
+            if memory_mb > self.max_memory_mb:
+                logger.info(f"Recycling Chrome driver using {memory_mb:.0f} MB")
+                return True
+
+        return False
+
+    def _discard(self, driver):
+        with self._lock:
+            self._page_counts.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"Error quitting Chrome driver: {e}")
+        with self._lock:
+            self._created -= 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Start a pooled Chrome driver and report its startup time and memory")
+    parser.add_argument("--url", help="Load this URL and wait for it to become ready")
+    parser.add_argument(
+        "--ready-timeout",
+        type=float,
+        default=READY_TIMEOUT,
+        help=f"Maximum seconds to wait for the page to become ready (default: {READY_TIMEOUT})",
+    )
+
+    args = parser.parse_args()
+
+    pool = DriverPool(size=1)
+    started_at = time.monotonic()
+    driver = pool.acquire()
+    if not driver:
+        print("Error: Failed to setup browser driver")
+        sys.exit(1)
+
+    print(f"Driver started in {time.monotonic() - started_at:.2f}s")
+    broken = False
+    try:
+        if args.url:
+            started_at = time.monotonic()
+            driver.get(args.url)
+            print(f"Page load: {wait_for_page_ready(driver, started_at, args.ready_timeout)}")
+        if psutil is not None:
+            print(f"Browser memory: {browser_memory_mb(driver):.0f} MB")
+    except Exception as e:
+        print(f"Error loading URL: {e}")
+        broken = True
+    finally:
+        pool.release(driver, broken=broken)
+        pool.close()
+
+    sys.exit(1 if broken else 0)
+
+
+if __name__ == "__main__":
+    main()